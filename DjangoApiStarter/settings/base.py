@@ -2,6 +2,7 @@ from datetime import timedelta
 from pathlib import Path
 
 import environ
+from corsheaders.defaults import default_headers
 from django.core.exceptions import ImproperlyConfigured
 
 BASE_DIR = Path(__file__).resolve().parents[2]
@@ -28,6 +29,10 @@ CORS_ALLOWED_ORIGINS = env.list(
     default=[FRONTEND_URL],
 )
 CORS_ALLOW_CREDENTIALS = True
+# Resumable uploads speak the tus protocol through these headers.
+TUS_HEADERS = ("tus-resumable", "upload-length", "upload-metadata", "upload-offset")
+CORS_ALLOW_HEADERS = (*default_headers, *TUS_HEADERS)
+CORS_EXPOSE_HEADERS = ["location", *TUS_HEADERS]
 CSRF_TRUSTED_ORIGINS = env.list(
     "CSRF_TRUSTED_ORIGINS",
     default=[FRONTEND_URL],
@@ -151,10 +156,18 @@ CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 CELERY_TASK_ROUTES = {
     "core.tasks.send_email_task": {"queue": "email"},
     "core.tasks.cleanup_expired_idempotency_records": {"queue": "maintenance"},
+    "core.tasks.drain_storage_deletions": {"queue": "maintenance"},
     "organizations.export_tasks.export_org_data_task": {"queue": "exports"},
     "organizations.export_tasks.recover_stale_exports": {"queue": "maintenance"},
     "organizations.export_tasks.cleanup_expired_exports": {"queue": "maintenance"},
     "accounts.tasks.cleanup_expired_tokens": {"queue": "maintenance"},
+    "images.tasks.finalize_image_upload_intent": {"queue": "media"},
+    "images.tasks.generate_image_variant": {"queue": "media"},
+    "images.tasks.generate_image_avif_variants": {"queue": "media"},
+    "images.tasks.backfill_image_variants_chunk": {"queue": "media"},
+    "images.tasks.cleanup_expired_upload_intents": {"queue": "maintenance"},
+    "images.tasks.cleanup_stale_sprite_sheets": {"queue": "maintenance"},
+    "images.tasks.rebalance_image_order": {"queue": "maintenance"},
 }
 
 CELERY_BEAT_SCHEDULE = {
@@ -174,6 +187,18 @@ CELERY_BEAT_SCHEDULE = {
         "task": "core.tasks.cleanup_expired_idempotency_records",
         "schedule": 24 * 60 * 60,
     },
+    "cleanup_expired_upload_intents": {
+        "task": "images.tasks.cleanup_expired_upload_intents",
+        "schedule": 60 * 60,
+    },
+    "cleanup_stale_sprite_sheets": {
+        "task": "images.tasks.cleanup_stale_sprite_sheets",
+        "schedule": 24 * 60 * 60,
+    },
+    "drain_storage_deletions": {
+        "task": "core.tasks.drain_storage_deletions",
+        "schedule": 60,
+    },
 }
 
 R2_ACCESS_KEY_ID = env.str("R2_ACCESS_KEY_ID", default="")
@@ -208,10 +233,27 @@ STORAGES = {
 
 IMAGE_PUBLIC_BASE_URL = env.str("IMAGE_PUBLIC_BASE_URL", default="") or None
 IMAGE_SIGNED_URL_TTL_SECONDS = env.int("IMAGE_SIGNED_URL_TTL_SECONDS", default=15 * 60)
+IMAGE_SIGNED_URL_CACHE_SECONDS = env.int(
+    "IMAGE_SIGNED_URL_CACHE_SECONDS", default=5 * 60
+)
 IMAGE_SHARE_LINK_DEFAULT_TTL_SECONDS = env.int(
     "IMAGE_SHARE_LINK_DEFAULT_TTL_SECONDS",
     default=7 * 24 * 60 * 60,
 )
+IMAGE_SHARE_LINK_CACHE_SECONDS = env.int(
+    "IMAGE_SHARE_LINK_CACHE_SECONDS", default=5 * 60
+)
+IMAGE_SHARE_LINK_NEGATIVE_CACHE_SECONDS = env.int(
+    "IMAGE_SHARE_LINK_NEGATIVE_CACHE_SECONDS", default=30
+)
+IMAGE_AVIF_VARIANTS = env.bool("IMAGE_AVIF_VARIANTS", default=True)
+IMAGE_UPLOAD_INTENT_TTL_SECONDS = env.int(
+    "IMAGE_UPLOAD_INTENT_TTL_SECONDS", default=15 * 60
+)
+IMAGE_SPRITE_RETENTION_DAYS = env.int("IMAGE_SPRITE_RETENTION_DAYS", default=7)
+RESUMABLE_UPLOAD_TTL_SECONDS = env.int(
+    "RESUMABLE_UPLOAD_TTL_SECONDS", default=24 * 60 * 60
+)
 UPLOAD_IMAGE_MAX_BYTES = env.int("UPLOAD_IMAGE_MAX_BYTES", default=10 * 1024 * 1024)
 UPLOAD_IMAGE_MAX_FILES_PER_REQUEST = env.int(
     "UPLOAD_IMAGE_MAX_FILES_PER_REQUEST", default=20
@@ -221,6 +263,19 @@ UPLOAD_IMAGE_MAX_TOTAL_BYTES = env.int(
 )
 UPLOAD_IMAGE_MAX_PIXELS = env.int("UPLOAD_IMAGE_MAX_PIXELS", default=40_000_000)
 UPLOAD_IMAGE_MAX_DIMENSION = env.int("UPLOAD_IMAGE_MAX_DIMENSION", default=12_000)
+IMAGE_ORIGINAL_PASSTHROUGH_MAX_BYTES = env.int(
+    "IMAGE_ORIGINAL_PASSTHROUGH_MAX_BYTES", default=5 * 1024 * 1024
+)
+IMAGE_POOL_WORKERS = env.int("IMAGE_POOL_WORKERS", default=2)
+IMAGE_POOL_MAX_QUEUE = env.int("IMAGE_POOL_MAX_QUEUE", default=8)
+IMAGE_POOL_TASK_TIMEOUT_SECONDS = env.int("IMAGE_POOL_TASK_TIMEOUT_SECONDS", default=30)
+IMAGE_POOL_MAX_TASKS_PER_CHILD = env.int("IMAGE_POOL_MAX_TASKS_PER_CHILD", default=200)
+IMAGE_POOL_MEMORY_LIMIT_MB = env.int("IMAGE_POOL_MEMORY_LIMIT_MB", default=1024)
+IMAGE_DECODE_BUDGET_MB = env.int("IMAGE_DECODE_BUDGET_MB", default=512)
+IMAGE_DECODE_HOST_BUDGET_MB = env.int("IMAGE_DECODE_HOST_BUDGET_MB", default=0)
+IMAGE_DECODE_BUDGET_WAIT_SECONDS = env.int(
+    "IMAGE_DECODE_BUDGET_WAIT_SECONDS", default=10
+)
 EXPORT_RETENTION_DAYS = env.int("EXPORT_RETENTION_DAYS", default=7)
 
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
@@ -279,6 +334,12 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 ALLOW_UNAUTHENTICATED_MEDIA_SERVE = False
+# "x-accel-redirect" or "x-sendfile" hands media_serve transfers to the front
+# proxy; empty streams them from the worker.
+MEDIA_SERVE_OFFLOAD = env.str("MEDIA_SERVE_OFFLOAD", default="")
+MEDIA_SERVE_ACCEL_PREFIX = env.str(
+    "MEDIA_SERVE_ACCEL_PREFIX", default="/protected-media/"
+)
 UPLOAD_ALLOWED_IMAGE_MIME_PREFIXES = tuple(
     prefix.strip()
     for prefix in env.str("UPLOAD_ALLOWED_IMAGE_MIME_PREFIXES", default="image/").split(
@@ -293,6 +354,14 @@ NINJA_NUM_PROXIES = env.int("NINJA_NUM_PROXIES", default=1)
 if NINJA_NUM_PROXIES < 0:
     raise ImproperlyConfigured("NINJA_NUM_PROXIES cannot be negative.")
 IMAGES_RATE_LIMIT_UPLOAD = env.str("IMAGES_RATE_LIMIT_UPLOAD", default="60/h")
+UPLOAD_QUOTA_USER_MB_PER_HOUR = env.int("UPLOAD_QUOTA_USER_MB_PER_HOUR", default=1024)
+UPLOAD_QUOTA_ORG_MB_PER_HOUR = env.int("UPLOAD_QUOTA_ORG_MB_PER_HOUR", default=4096)
+UPLOAD_QUOTA_USER_MEGAPIXELS_PER_HOUR = env.int(
+    "UPLOAD_QUOTA_USER_MEGAPIXELS_PER_HOUR", default=2000
+)
+UPLOAD_QUOTA_ORG_MEGAPIXELS_PER_HOUR = env.int(
+    "UPLOAD_QUOTA_ORG_MEGAPIXELS_PER_HOUR", default=8000
+)
 IMAGES_RATE_LIMIT_BULK_UPLOAD = env.str("IMAGES_RATE_LIMIT_BULK_UPLOAD", default="30/h")
 IMAGES_RATE_LIMIT_BULK_DELETE = env.str("IMAGES_RATE_LIMIT_BULK_DELETE", default="30/h")
 IMAGES_RATE_LIMIT_BULK_ATTACH = env.str("IMAGES_RATE_LIMIT_BULK_ATTACH", default="60/h")
@@ -1,16 +1,30 @@
-import uuid
+import hashlib
 
 from django.db import transaction
 from ninja import File, Router, Schema, UploadedFile
+from ninja.decorators import decorate_view
 from ninja.errors import HttpError
 
 from accounts.models import User
 from core.authentication import JWTAuth
 from core.utils.auth_utils import get_request_user
-from core.utils.avatar import schedule_avatar_file_deletion
+from core.utils.avatar import avatar_file_keys, schedule_avatar_file_deletion
+from core.utils.decode_budget import reserve_decode_budget
 from core.utils.image import InvalidImageContent, resize_avatar_images
-from core.utils.storage import delete_from_public_storage, upload_to_public_storage
-from core.utils.uploads import UploadTooLarge, read_uploaded_file_bounded
+from core.utils.image_pool import ImageWorkFailed, run_in_image_pool
+from core.utils.storage import (
+    delete_from_public_storage,
+    hashed_media_key,
+    upload_to_public_storage,
+)
+from core.utils.upload_quota import charge_upload_quota, upload_pixels
+from core.utils.uploads import (
+    UploadLimits,
+    UploadTooLarge,
+    raise_for_rejected_upload,
+    read_uploaded_file_bounded,
+    stream_image_uploads,
+)
 from organizations.models import Organization
 
 from .schemas import UsernameCheckResponse, UserProfileOut, UserProfileUpdate
@@ -24,6 +38,11 @@ users_router = Router()
 
 users_router.add_router("/", username_router, tags=["users"])
 
+AVATAR_MAX_BYTES = 10 * 1024 * 1024
+AVATAR_UPLOAD_LIMITS = UploadLimits(
+    max_file_bytes=AVATAR_MAX_BYTES, file_too_large="Avatar file too large (max 10MB)"
+)
+
 
 class AvatarUploadResponse(Schema):
     avatar_url: str
@@ -44,11 +63,12 @@ def serialize_profile_with_personal_org(user: User) -> UserProfileOut:
 
 
 @users_router.post("/avatar", response=AvatarUploadResponse, auth=JWTAuth())
+@decorate_view(stream_image_uploads(lambda: AVATAR_UPLOAD_LIMITS))
 def upload_avatar(request, file: UploadedFile = File(...)):
     """
     Handles avatar upload: validates, deletes old, resizes, uploads, updates DB.
     """
-    max_size = 10 * 1024 * 1024
+    max_size = AVATAR_MAX_BYTES
     if (file.size or 0) > max_size:
         raise HttpError(400, "Avatar file too large (max 10MB)")
     if not file.content_type or not file.content_type.startswith("image/"):
@@ -59,15 +79,27 @@ def upload_avatar(request, file: UploadedFile = File(...)):
         raise HttpError(400, "Avatar file too large (max 10MB)") from exc
 
     try:
-        small_bytes, large_bytes = resize_avatar_images(img_bytes)
+        raise_for_rejected_upload(file)
+        charge_upload_quota(
+            user_id=get_request_user(request).id,
+            nbytes=len(img_bytes),
+            pixels=upload_pixels(img_bytes),
+        )
+        with reserve_decode_budget(img_bytes):
+            small_bytes, large_bytes = run_in_image_pool(
+                resize_avatar_images, img_bytes
+            )
     except InvalidImageContent as exc:
         raise HttpError(400, str(exc)) from exc
+    except ImageWorkFailed as exc:
+        raise HttpError(503, "Avatar upload is temporarily unavailable.") from exc
 
     user = get_request_user(request)
     old_avatar_path = user.avatar_path
-    token = uuid.uuid4().hex
-    filename = f"public/avatars/users/{token}.webp"
-    large_filename = f"public/avatars/users/{token}_lg.webp"
+    filename = hashed_media_key(
+        "public/avatars/users", hashlib.sha256(small_bytes).hexdigest(), "webp"
+    )
+    _small_key, large_filename = avatar_file_keys(filename)
     uploaded: list[str] = []
     try:
         small_avatar_url = upload_to_public_storage(filename, small_bytes)
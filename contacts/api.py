@@ -1,10 +1,11 @@
-import uuid
+import hashlib
 from typing import Annotated, List, Literal
 
 from django.db import transaction
 from django.db.models import Case, IntegerField, Q, Value, When
 from django.shortcuts import get_object_or_404
 from ninja import File, Query, Router, Status, UploadedFile
+from ninja.decorators import decorate_view
 from ninja.errors import HttpError
 from ninja.pagination import LimitOffsetPagination, paginate
 
@@ -17,13 +18,28 @@ from contacts.services import (
 from contacts.throttles import contact_search_throttle
 from core.authentication import JWTAuth
 from core.schemas import DetailResponse
-from core.utils.avatar import schedule_avatar_file_deletion
+from core.utils.avatar import avatar_file_keys, schedule_avatar_file_deletion
+from core.utils.decode_budget import reserve_decode_budget
 from core.utils.image import (
     InvalidImageContent,
     resize_avatar_images,
 )
-from core.utils.storage import delete_from_public_storage, upload_to_public_storage
-from core.utils.uploads import UploadTooLarge, read_uploaded_file_bounded
+from core.utils.image_pool import run_in_image_pool
+from core.utils.pagination import SerializedPage
+from core.utils.storage import (
+    delete_from_public_storage,
+    hashed_media_key,
+    upload_to_public_storage,
+)
+from core.utils.upload_quota import charge_upload_quota, upload_pixels
+from core.utils.uploads import (
+    UploadLimits,
+    UploadTooLarge,
+    raise_for_rejected_upload,
+    read_uploaded_file_bounded,
+    stream_image_uploads,
+)
+from images.services import attach_image_summaries
 from organizations.scope import resolve_org_scope, resolve_write_org_scope
 
 from .models import Contact
@@ -38,6 +54,12 @@ from .validation import MAX_CONTACT_SEARCH_LENGTH, MAX_CONTACT_SEARCH_TERMS
 
 contacts_router = Router()
 
+AVATAR_MAX_BYTES = 10 * 1024 * 1024
+AVATAR_UPLOAD_LIMITS = UploadLimits(
+    max_file_bytes=AVATAR_MAX_BYTES,
+    file_too_large="File too large. Maximum allowed size is 10MB.",
+)
+
 # Define allowed sort fields and their corresponding model fields
 ALLOWED_SORT_FIELDS = {
     "display_name": "display_name",
@@ -69,6 +91,7 @@ def list_contacts(
         "updated_at",
     ] = "display_name",
     sort_order: Literal["asc", "desc"] = "asc",
+    include_images: bool = False,
 ):
     """
     List contacts with optional search and sorting.
@@ -77,6 +100,8 @@ def list_contacts(
     - search: Optional search term to filter contacts
     - sort_by: Field to sort by (display_name, first_name, last_name, email, created_at, updated_at)
     - sort_order: Sort order (asc or desc)
+    - include_images: Embed each contact's image count and cover image with a
+      signed thumb URL, batched per page
     """
     scope = resolve_org_scope(request, org_slug)
     qs = contact_response_queryset().filter(organization=scope.org)
@@ -127,6 +152,13 @@ def list_contacts(
             sort_field = f"-{sort_field}"
         qs = qs.order_by(sort_field)
 
+    if include_images:
+
+        def serialize_page(contacts: list[Contact]) -> list[Contact]:
+            attach_image_summaries(contacts)
+            return contacts
+
+        return SerializedPage(qs, serialize_page)
     return qs
 
 
@@ -181,6 +213,7 @@ def partial_update_contact(request, org_slug: str, slug: str, data: ContactUpdat
     response=ContactAvatarResponse,
     auth=JWTAuth(),
 )
+@decorate_view(stream_image_uploads(lambda: AVATAR_UPLOAD_LIMITS))
 def upload_contact_avatar(
     request, org_slug: str, slug: str, file: UploadedFile = File(...)
 ):
@@ -190,7 +223,7 @@ def upload_contact_avatar(
     scope = resolve_write_org_scope(request, org_slug)
     contact = get_object_or_404(Contact, organization=scope.org, slug=slug)
     # File validation: max size 10MB
-    MAX_SIZE = 10 * 1024 * 1024
+    MAX_SIZE = AVATAR_MAX_BYTES
     if (file.size or 0) > MAX_SIZE:
         raise HttpError(400, "File too large. Maximum allowed size is 10MB.")
     if not str(file.content_type or "").startswith("image/"):
@@ -200,10 +233,19 @@ def upload_contact_avatar(
     except UploadTooLarge as exc:
         raise HttpError(400, "File too large. Maximum allowed size is 10MB.") from exc
     try:
-        small_bytes, large_bytes = resize_avatar_images(data)
-        token = uuid.uuid4().hex
-        filename = f"public/avatars/contacts/{token}.webp"
-        large_filename = f"public/avatars/contacts/{token}_lg.webp"
+        raise_for_rejected_upload(file)
+        charge_upload_quota(
+            user_id=getattr(scope.user, "id", None),
+            organization_id=scope.org.pk,
+            nbytes=len(data),
+            pixels=upload_pixels(data),
+        )
+        with reserve_decode_budget(data):
+            small_bytes, large_bytes = run_in_image_pool(resize_avatar_images, data)
+        filename = hashed_media_key(
+            "public/avatars/contacts", hashlib.sha256(small_bytes).hexdigest(), "webp"
+        )
+        _small_key, large_filename = avatar_file_keys(filename)
         old_avatar_path = contact.avatar_path
         uploaded: list[str] = []
         try:
@@ -227,6 +269,8 @@ def upload_contact_avatar(
         )
     except InvalidImageContent as exc:
         raise HttpError(400, str(exc)) from exc
+    except HttpError:
+        raise
     except Exception as exc:
         raise HttpError(503, "Avatar upload is temporarily unavailable.") from exc
 
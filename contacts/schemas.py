@@ -5,6 +5,7 @@ from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 from contacts.validation import ContactEmail, ContactNotes, ContactPhone, ContactText
 from core.schemas import DetailResponse as CoreDetailResponse
+from images.schemas import ImageCoverOut
 from tags.schemas import TagOut
 
 DetailResponse = CoreDetailResponse
@@ -62,6 +63,9 @@ class ContactOut(BaseModel):
     organization: str = Field(validation_alias="organization_slug")
     creator: Optional[str] = Field(default=None, validation_alias="creator_slug")
     tags: list[TagOut]
+    # Only filled when a listing asks for include_images.
+    image_count: Optional[int] = None
+    cover_image: Optional[ImageCoverOut] = None
     created_at: datetime
     updated_at: datetime
 
@@ -4,6 +4,7 @@ from urllib.parse import urlencode
 
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.db import IntegrityError
 from django.utils.datastructures import MultiValueDict
@@ -12,6 +13,8 @@ from PIL import Image
 from accounts.tests.utils import create_test_user
 from contacts.models import Contact
 from contacts.throttles import contact_search_throttle
+from images.models import Image as ImageModel
+from images.models import PolymorphicImageRelation
 from organizations.models import Membership, Organization
 from organizations.tests.utils import create_test_group
 
@@ -243,14 +246,17 @@ def test_delete_contact(
         avatar_path="public/avatars/contacts/z.webp",
     )
     headers = make_auth_headers(api_client, user, password="pw")
-    with patch("core.utils.avatar.delete_avatar_files") as delete_avatar_files:
+    with patch("core.tasks.delete_storage_objects", return_value={}) as delete:
         with django_capture_on_commit_callbacks(execute=True):
             resp = api_client.delete(
                 f"/orgs/{org.slug}/contacts/{contact.slug}/", headers=headers
             )
     assert resp.status_code == 200
     assert not Contact.objects.filter(slug="z").exists()
-    delete_avatar_files.assert_called_once_with("public/avatars/contacts/z.webp")
+    delete.assert_called_once_with(
+        ["public/avatars/contacts/z.webp", "public/avatars/contacts/z_lg.webp"],
+        target="public",
+    )
 
 
 @pytest.mark.django_db
@@ -606,6 +612,40 @@ def test_update_contact_rejects_organization_in_body(make_auth_headers, api_clie
     assert contact.organization == org1
 
 
+@pytest.mark.django_db
+def test_upload_contact_avatar_over_quota_is_throttled(
+    settings, make_auth_headers, api_client
+):
+    cache.clear()
+    settings.UPLOAD_QUOTA_ORG_MEGAPIXELS_PER_HOUR = 1
+    user = create_test_user(email="quota@example.com", password="pw")
+    org = create_test_group(name="Quota Org", slug="quota-org", owner=user)
+    contact = Contact.objects.create(
+        display_name="Quota", slug="quota", organization=org, creator=user
+    )
+    headers = make_auth_headers(api_client, user, password="pw")
+
+    def upload():
+        buffer = io.BytesIO()
+        Image.new("RGB", (800, 800), color="red").save(buffer, format="PNG")
+        uploaded = SimpleUploadedFile(
+            "avatar.png", buffer.getvalue(), content_type="image/png"
+        )
+        return api_client.post(
+            f"/orgs/{org.slug}/contacts/{contact.slug}/avatar/",
+            data={},
+            FILES=MultiValueDict({"file": [uploaded]}),
+            headers=headers,
+        )
+
+    first = upload()
+    refused = upload()
+
+    assert first.status_code == 200, first.content
+    assert refused.status_code == 429, refused.content
+    assert int(refused["Retry-After"]) > 0
+
+
 @pytest.mark.django_db
 def test_upload_contact_avatar_error(monkeypatch, make_auth_headers, api_client):
     user = create_test_user(
@@ -853,3 +893,54 @@ def test_contact_search_has_a_dedicated_user_throttle(
 
     assert first_search.status_code == 200
     assert limited_search.status_code == 429
+
+
+@pytest.mark.django_db
+def test_list_contacts_embeds_cover_and_image_count(
+    monkeypatch, make_auth_headers, api_client
+):
+    monkeypatch.setattr(
+        "images.services.generate_private_presigned_storage_url",
+        lambda key, **kwargs: f"https://r2.example/{key}?signed=1",
+    )
+    user = create_test_user(email="covers@example.com", password="pw")
+    org = create_test_group(name="Covers", slug="covers-org", owner=user)
+    covered = Contact.objects.create(
+        display_name="Covered", slug="covered", organization=org, creator=user
+    )
+    Contact.objects.create(display_name="Bare", slug="bare", organization=org)
+    cover = ImageModel.objects.create(
+        file="private/images/cover.jpg",
+        organization=org,
+        alt_text="Portrait",
+        blurhash="LEHV6nWB2yk8",
+        variant_metadata={"original": {"width": 800, "height": 600}},
+    )
+    other = ImageModel.objects.create(file="private/images/other.jpg", organization=org)
+    PolymorphicImageRelation.objects.create(
+        image=cover, content_object=covered, is_cover=True
+    )
+    PolymorphicImageRelation.objects.create(image=other, content_object=covered)
+    headers = make_auth_headers(api_client, user, password="pw")
+
+    plain = api_client.get(f"/orgs/{org.slug}/contacts/", headers=headers).json()
+    resp = api_client.get(
+        f"/orgs/{org.slug}/contacts/?include_images=true", headers=headers
+    )
+
+    assert {item["cover_image"] for item in plain["items"]} == {None}
+    assert resp.status_code == 200
+    items = {item["slug"]: item for item in resp.json()["items"]}
+    assert items["bare"]["image_count"] == 0
+    assert items["bare"]["cover_image"] is None
+    assert items["covered"]["image_count"] == 2
+    embedded = items["covered"]["cover_image"]
+    assert embedded["image_id"] == cover.id
+    assert embedded["alt_text"] == "Portrait"
+    assert (embedded["width"], embedded["height"]) == (800, 600)
+    assert embedded["blurhash"] == "LEHV6nWB2yk8"
+    assert (
+        embedded["thumb_url"]
+        == "https://r2.example/private/images/cover_thumb.webp?signed=1"
+    )
+    assert embedded["expires_at"]
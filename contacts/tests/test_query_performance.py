@@ -10,6 +10,7 @@ from contacts.services import (
     create_contact_record,
     update_contact_record,
 )
+from images.models import Image, PolymorphicImageRelation
 from organizations.models import Membership, Organization
 from tags.models import Tag, TaggedItem
 
@@ -59,3 +60,45 @@ def test_updated_contact_response_serialization_uses_prefetched_relations():
 
     assert [item.name for item in result.tags] == ["VIP"]
     assert len(queries) == 0, [query["sql"] for query in queries.captured_queries]
+
+
+@pytest.mark.django_db
+def test_contact_listing_image_summaries_do_not_scale_with_page_size(
+    monkeypatch, make_auth_headers, api_client
+):
+    monkeypatch.setattr(
+        "images.services.generate_private_presigned_storage_url",
+        lambda key, **kwargs: f"https://r2.example/{key}",
+    )
+    user = User.objects.create_user(email="covers-query@example.com", password="pw")
+    organization = Organization.objects.create(
+        name="Covers query", slug="covers-query", type="group"
+    )
+    Membership.objects.create(user=user, organization=organization, role="owner")
+    headers = make_auth_headers(api_client, user, password="pw")
+    url = f"/orgs/{organization.slug}/contacts/?include_images=true"
+
+    def add_contacts(start, count):
+        for index in range(start, start + count):
+            contact = Contact.objects.create(
+                display_name=f"Contact {index}",
+                slug=f"contact-{index}",
+                organization=organization,
+            )
+            image = Image.objects.create(
+                file=f"private/images/{index}.jpg", organization=organization
+            )
+            PolymorphicImageRelation.objects.create(
+                image=image, content_object=contact, is_cover=True
+            )
+
+    add_contacts(0, 2)
+    api_client.get(url, headers=headers)
+    with CaptureQueriesContext(connection) as small:
+        assert api_client.get(url, headers=headers).status_code == 200
+    add_contacts(2, 8)
+    with CaptureQueriesContext(connection) as large:
+        response = api_client.get(url, headers=headers)
+
+    assert len(response.json()["items"]) == 10
+    assert len(large) == len(small), [query["sql"] for query in large]
@@ -1,4 +1,5 @@
 import logging
+import math
 
 from django.http import HttpRequest, HttpResponse, JsonResponse
 from ninja.errors import HttpError, ValidationError
@@ -28,10 +29,15 @@ def validation_error_response(
 def http_error_response(
     request: HttpRequest, exc: HttpError | type[HttpError]
 ) -> HttpResponse:
-    return JsonResponse(
+    response = JsonResponse(
         {"detail": str(exc)},
         status=getattr(exc, "status_code", 400),
     )
+    # Throttled (ninja's request throttles and the upload quotas) knows the wait.
+    wait = getattr(exc, "wait", None)
+    if wait:
+        response["Retry-After"] = str(math.ceil(wait))
+    return response
 
 
 def unhandled_error_response(
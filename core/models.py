@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class IdempotencyRecord(models.Model):
@@ -16,3 +17,35 @@ class IdempotencyRecord(models.Model):
 
     def __str__(self) -> str:
         return f"{self.method} {self.path} ({self.status_code})"
+
+
+class StorageDeletion(models.Model):
+    """Outbox row for an object key to delete once its owning change commits."""
+
+    class Target(models.TextChoices):
+        PRIVATE = "private", "Private bucket"
+        PUBLIC = "public", "Public bucket"
+
+    target = models.CharField(
+        max_length=16, choices=Target.choices, default=Target.PRIVATE
+    )
+    key = models.CharField(max_length=1024)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=("target", "key"), name="core_storage_deletion_uniq"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=("next_attempt_at", "id"), name="core_storage_del_due_idx"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.target}:{self.key}"
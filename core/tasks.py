@@ -1,11 +1,20 @@
+import logging
+from datetime import timedelta
 from smtplib import SMTPConnectError, SMTPServerDisconnected
 
 from celery import shared_task
 from django.conf import settings
 from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Min
 from django.utils import timezone
 
-from core.models import IdempotencyRecord
+from core.models import IdempotencyRecord, StorageDeletion
+from core.utils.storage import STORAGE_DELETION_BATCH_SIZE, delete_storage_objects
+
+logger = logging.getLogger(__name__)
+
+STORAGE_DELETION_MAX_BACKOFF = timedelta(hours=6)
 
 
 def _send_email_task(
@@ -61,3 +70,84 @@ def cleanup_expired_idempotency_records() -> int:
     count = queryset.count()
     queryset.delete()
     return count
+
+
+def _storage_deletion_backoff(attempts: int) -> timedelta:
+    return min(
+        timedelta(seconds=30 * 2 ** (attempts - 1)), STORAGE_DELETION_MAX_BACKOFF
+    )
+
+
+def _drain_storage_deletion_batch() -> tuple[int, int]:
+    with transaction.atomic():
+        rows = list(
+            StorageDeletion.objects.select_for_update(skip_locked=True)
+            .filter(next_attempt_at__lte=timezone.now())
+            .order_by("next_attempt_at", "id")[:STORAGE_DELETION_BATCH_SIZE]
+        )
+        if not rows:
+            return 0, 0
+        failed: dict[tuple[str, str], str] = {}
+        for target in {row.target for row in rows}:
+            keys = [row.key for row in rows if row.target == target]
+            try:
+                errors = delete_storage_objects(keys, target=target)
+            except Exception as exc:
+                logger.exception("storage:delete_batch_failed target=%s", target)
+                errors = {key: str(exc) or exc.__class__.__name__ for key in keys}
+            failed.update({(target, key): error for key, error in errors.items()})
+
+        now = timezone.now()
+        retry = []
+        for row in rows:
+            error = failed.get((row.target, row.key))
+            if error is None:
+                continue
+            row.attempts += 1
+            row.last_error = error[:1000]
+            row.next_attempt_at = now + _storage_deletion_backoff(row.attempts)
+            retry.append(row)
+        StorageDeletion.objects.filter(
+            pk__in=[row.pk for row in rows if (row.target, row.key) not in failed]
+        ).delete()
+        StorageDeletion.objects.bulk_update(
+            retry, ["attempts", "last_error", "next_attempt_at"]
+        )
+    return len(rows) - len(retry), len(retry)
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def drain_storage_deletions(max_batches: int = 50) -> dict[str, int]:
+    """
+    Delete queued storage objects in DeleteObjects-sized batches.
+    Rows are claimed with SKIP LOCKED so concurrent drains split the backlog;
+    failed keys are retried with exponential backoff.
+    """
+    deleted = failed = 0
+    for _ in range(max_batches):
+        batch_deleted, batch_failed = _drain_storage_deletion_batch()
+        deleted += batch_deleted
+        failed += batch_failed
+        if batch_deleted + batch_failed < STORAGE_DELETION_BATCH_SIZE:
+            break
+
+    backlog = StorageDeletion.objects.aggregate(oldest=Min("created_at"))
+    pending = StorageDeletion.objects.count()
+    oldest_age = (
+        int((timezone.now() - backlog["oldest"]).total_seconds())
+        if backlog["oldest"]
+        else 0
+    )
+    logger.info(
+        "storage:deletions_drained deleted=%s failed=%s pending=%s oldest_age=%s",
+        deleted,
+        failed,
+        pending,
+        oldest_age,
+    )
+    return {
+        "deleted": deleted,
+        "failed": failed,
+        "pending": pending,
+        "oldest_age": oldest_age,
+    }
@@ -6,6 +6,7 @@ from django.db import transaction
 from accounts.services import delete_user_account
 from accounts.tests.utils import create_test_user
 from contacts.models import Contact
+from core.models import StorageDeletion
 from organizations.tests.utils import create_test_group
 
 
@@ -25,11 +26,18 @@ def test_contact_avatar_is_deleted_after_organization_cascade(
         avatar_path="public/avatars/contacts/contact.webp",
     )
 
-    with patch("core.utils.avatar.delete_avatar_files") as delete_avatar_files:
+    with patch("core.tasks.delete_storage_objects", return_value={}) as delete:
         with django_capture_on_commit_callbacks(execute=True):
             organization.delete()
 
-    delete_avatar_files.assert_called_once_with("public/avatars/contacts/contact.webp")
+    delete.assert_called_once_with(
+        [
+            "public/avatars/contacts/contact.webp",
+            "public/avatars/contacts/contact_lg.webp",
+        ],
+        target="public",
+    )
+    assert not StorageDeletion.objects.exists()
 
 
 @pytest.mark.django_db
@@ -47,13 +55,12 @@ def test_contact_avatar_is_preserved_when_delete_rolls_back():
     )
     contact_id = contact.pk
 
-    with patch("core.utils.avatar.delete_avatar_files") as delete_avatar_files:
-        with pytest.raises(RuntimeError, match="roll back"):
-            with transaction.atomic():
-                contact.delete()
-                raise RuntimeError("roll back")
+    with pytest.raises(RuntimeError, match="roll back"):
+        with transaction.atomic():
+            contact.delete()
+            raise RuntimeError("roll back")
 
-    delete_avatar_files.assert_not_called()
+    assert not StorageDeletion.objects.exists()
     assert Contact.objects.filter(pk=contact_id).exists()
 
 
@@ -65,11 +72,14 @@ def test_user_avatar_is_deleted_after_account_deletion(
     user.avatar_path = "public/avatars/users/user.webp"
     user.save(update_fields=["avatar_path", "updated_at"])
 
-    with patch("core.utils.avatar.delete_avatar_files") as delete_avatar_files:
+    with patch("core.tasks.delete_storage_objects", return_value={}) as delete:
         with django_capture_on_commit_callbacks(execute=True):
             delete_user_account(user)
 
-    delete_avatar_files.assert_called_once_with("public/avatars/users/user.webp")
+    delete.assert_called_once_with(
+        ["public/avatars/users/user.webp", "public/avatars/users/user_lg.webp"],
+        target="public",
+    )
 
 
 @pytest.mark.django_db
@@ -90,10 +100,17 @@ def test_storage_failure_does_not_undo_committed_contact_deletion(
     contact_id = contact.pk
 
     with patch(
-        "core.utils.avatar.delete_avatar_files",
+        "core.tasks.delete_storage_objects",
         side_effect=RuntimeError("storage unavailable"),
     ):
         with django_capture_on_commit_callbacks(execute=True):
             contact.delete()
 
     assert not Contact.objects.filter(pk=contact_id).exists()
+    # The keys stay queued for a later retry instead of leaking.
+    assert sorted(
+        StorageDeletion.objects.values_list("key", "attempts", "last_error")
+    ) == [
+        ("public/avatars/contacts/failure.webp", 1, "storage unavailable"),
+        ("public/avatars/contacts/failure_lg.webp", 1, "storage unavailable"),
+    ]
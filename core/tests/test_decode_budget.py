@@ -0,0 +1,156 @@
+import io
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+from PIL import Image as PilImage
+
+from core.utils import decode_budget as decode_budget_module
+from core.utils.decode_budget import (
+    DecodeBudgetExhausted,
+    decode_budget,
+    decode_cost,
+    host_budget_key,
+    host_leases,
+    reserve_decode_budget,
+)
+
+MB = 1024 * 1024
+
+
+def png_bytes(size) -> bytes:
+    buf = io.BytesIO()
+    PilImage.new("RGB", size, (0, 0, 0)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_decode_cost_uses_header_dimensions():
+    assert decode_cost(png_bytes((100, 50))) == 100 * 50 * 8
+    assert decode_cost(b"not an image") == len(b"not an image")
+
+
+def test_reservation_is_released_after_the_block(settings):
+    settings.IMAGE_DECODE_BUDGET_MB = 1
+    data = png_bytes((100, 100))
+
+    with reserve_decode_budget(data) as cost:
+        assert cost == 80_000
+        assert decode_budget().reserved == 80_000
+
+    assert decode_budget().reserved == 0
+
+
+def test_decode_that_does_not_fit_is_rejected_after_waiting(settings):
+    settings.IMAGE_DECODE_BUDGET_MB = 1
+    settings.IMAGE_DECODE_BUDGET_WAIT_SECONDS = 0
+    big = png_bytes((400, 300))
+
+    with reserve_decode_budget(big):
+        with pytest.raises(DecodeBudgetExhausted):
+            with reserve_decode_budget(big):
+                pass
+        assert decode_budget().reserved == 400 * 300 * 8
+
+    assert decode_budget().reserved == 0
+
+
+def test_oversized_decode_runs_alone(settings):
+    settings.IMAGE_DECODE_BUDGET_MB = 1
+    huge = png_bytes((1000, 1000))
+
+    with reserve_decode_budget(huge):
+        assert decode_budget().reserved == MB
+
+
+def test_waiting_decode_is_admitted_once_budget_frees(settings):
+    settings.IMAGE_DECODE_BUDGET_MB = 1
+    settings.IMAGE_DECODE_BUDGET_WAIT_SECONDS = 5
+    big = png_bytes((400, 300))
+    admitted = threading.Event()
+
+    def second_decode():
+        with reserve_decode_budget(big):
+            admitted.set()
+
+    with reserve_decode_budget(big):
+        worker = threading.Thread(target=second_decode)
+        worker.start()
+        assert not admitted.wait(0.2)
+    worker.join(5)
+
+    assert admitted.is_set()
+    assert decode_budget().reserved == 0
+
+
+def test_host_budget_is_shared_through_the_cache(settings):
+    settings.IMAGE_DECODE_BUDGET_MB = 0
+    settings.IMAGE_DECODE_HOST_BUDGET_MB = 1
+    settings.IMAGE_DECODE_BUDGET_WAIT_SECONDS = 0
+    big = png_bytes((400, 300))
+    other = {"other:1047576": (MB - 1000, time.time() + 60)}
+    cache.set(host_budget_key(), other, timeout=60)
+
+    with pytest.raises(DecodeBudgetExhausted):
+        with reserve_decode_budget(big):
+            pass
+    assert host_leases() == other
+
+    cache.delete(host_budget_key())
+    with reserve_decode_budget(big):
+        [(cost, _expiry)] = host_leases().values()
+        assert cost == 400 * 300 * 8
+    assert host_leases() == {}
+
+
+def test_leaked_host_lease_expires_on_its_own(settings):
+    settings.IMAGE_DECODE_BUDGET_MB = 0
+    settings.IMAGE_DECODE_HOST_BUDGET_MB = 1
+    settings.IMAGE_DECODE_BUDGET_WAIT_SECONDS = 0
+    leaked = {"killed:1047576": (MB - 1000, time.time() - 1)}
+    cache.set(host_budget_key(), leaked, timeout=60)
+
+    with reserve_decode_budget(png_bytes((400, 300))):
+        assert "killed:1047576" not in host_leases()
+
+
+class FakeRedis:
+    def __init__(self, admitted):
+        self.admitted = admitted
+        self.calls = []
+        self.removed = []
+
+    def register_script(self, source):
+        def run(*, keys, args, client):
+            self.calls.append((keys, args))
+            return self.admitted
+
+        return run
+
+    def zrem(self, key, member):
+        self.removed.append((key, member))
+
+
+def test_host_leases_go_through_one_redis_script(settings, monkeypatch):
+    settings.IMAGE_DECODE_BUDGET_MB = 0
+    settings.IMAGE_DECODE_HOST_BUDGET_MB = 1
+    settings.IMAGE_DECODE_BUDGET_WAIT_SECONDS = 0
+    client = FakeRedis(admitted=1)
+    monkeypatch.setattr(decode_budget_module, "redis_client", lambda: client)
+    monkeypatch.setattr(decode_budget_module, "_admit_script", None)
+    key = str(cache.make_key(host_budget_key()))
+
+    with reserve_decode_budget(png_bytes((400, 300))):
+        pass
+
+    [(keys, [lease, cost, limit, lease_ms])] = client.calls
+    assert keys == [key]
+    assert lease.endswith(f":{400 * 300 * 8}")
+    assert (cost, limit, lease_ms) == (400 * 300 * 8, MB, 600_000)
+    assert client.removed == [(key, lease)]
+
+    client.admitted = 0
+    with pytest.raises(DecodeBudgetExhausted):
+        with reserve_decode_budget(png_bytes((400, 300))):
+            pass
+    assert len(client.removed) == 1
@@ -1,9 +1,27 @@
+import struct
+import zlib
 from io import BytesIO
 
 import pytest
-from PIL import Image
+from PIL import ExifTags, Image, ImageCms
 
-from core.utils.image import InvalidImageContent, resize_avatar_images, resize_images
+from core.utils.image import (
+    AVIF_SIBLINGS,
+    InvalidImageContent,
+    accepts_avif,
+    blurhash_encode,
+    difference_hash,
+    dominant_color,
+    image_dimensions,
+    image_placeholder,
+    normalize_image_bytes,
+    resize_avatar_images,
+    resize_images,
+    sniff_image_header,
+    stored_image_format,
+)
+
+BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
 
 
 def test_resize_avatar_images_basic():
@@ -133,3 +151,172 @@ def test_validation_does_not_mutate_pillow_global_limit(settings):
         resize_avatar_images(data.getvalue())
 
     assert Image.MAX_IMAGE_PIXELS == previous
+
+
+def _gradient_image(size, fmt="PNG", quality=None, mirror=False):
+    image = Image.new("RGB", size)
+    image.putdata(
+        [
+            ((x * 255) // size[0], (y * 255) // size[1], ((x + y) * 97) % 256)
+            for y in range(size[1])
+            for x in range(size[0])
+        ]
+    )
+    if mirror:
+        image = image.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+    buffer = BytesIO()
+    image.save(buffer, format=fmt, **({"quality": quality} if quality else {}))
+    return buffer.getvalue()
+
+
+def test_difference_hash_survives_rescaling_and_recompression():
+    original = difference_hash(_gradient_image((320, 240)))
+    rescaled = difference_hash(_gradient_image((160, 120), fmt="JPEG", quality=60))
+    other = difference_hash(_gradient_image((320, 240), mirror=True))
+
+    assert 0 <= original < 1 << 64
+    assert (original ^ rescaled).bit_count() <= 6
+    assert (original ^ other).bit_count() > 10
+
+
+def test_difference_hash_rejects_non_images():
+    with pytest.raises(InvalidImageContent):
+        difference_hash(b"not an image")
+
+
+def decode_base83(value: str) -> int:
+    result = 0
+    for char in value:
+        result = result * 83 + BASE83.index(char)
+    return result
+
+
+def test_blurhash_encodes_component_count_and_average_colour():
+    value = blurhash_encode(Image.new("RGB", (20, 10), (255, 0, 0)))
+
+    assert len(value) == 4 + 2 * (4 * 3)
+    assert decode_base83(value[0]) == (4 - 1) + (3 - 1) * 9
+    assert decode_base83(value[2:6]) == 0xFF0000
+
+
+def test_placeholder_reports_dominant_colour():
+    image = Image.new("RGB", (300, 200), (0, 0, 255))
+    image.paste((255, 0, 0), (0, 0, 60, 40))
+    buf = BytesIO()
+    image.save(buf, format="WEBP", quality=90)
+
+    blurhash, color = image_placeholder(buf.getvalue())
+
+    assert len(blurhash) == 28
+    assert color == "#0000ff"
+    assert dominant_color(Image.new("RGB", (4, 4), (16, 32, 48))) == "#102030"
+    with pytest.raises(InvalidImageContent):
+        image_placeholder(b"not an image")
+
+
+def test_accepts_avif_requires_explicit_nonzero_media_range():
+    assert accepts_avif("image/avif,image/webp,image/apng,*/*;q=0.8")
+    assert accepts_avif("image/webp, IMAGE/AVIF ; q=0.5")
+    assert not accepts_avif("image/avif;q=0, image/webp")
+    assert not accepts_avif("image/webp,*/*;q=0.8")
+    assert not accepts_avif(None)
+
+
+def test_avif_siblings_mirror_their_webp_variant():
+    assert set(AVIF_SIBLINGS) == {"md", "lg"}
+    sibling = AVIF_SIBLINGS["md"]
+    assert sibling.key_for("private/images/1/a.webp") == "private/images/1/a_md.avif"
+    assert sibling.content_type == "image/avif"
+    assert sibling.fallback == "md"
+
+
+def _png_declaring(width: int, height: int) -> bytes:
+    buf = BytesIO()
+    Image.new("RGB", (8, 8)).save(buf, format="PNG")
+    data = bytearray(buf.getvalue())
+    header = b"IHDR" + struct.pack(">II", width, height) + bytes(data[24:29])
+    data[16:29] = header[4:]
+    data[29:33] = struct.pack(">I", zlib.crc32(header))
+    return bytes(data)
+
+
+def test_sniff_image_header_reads_dimensions_from_a_prefix():
+    data = _png_declaring(8, 8)
+
+    assert sniff_image_header(data[:64], complete=False) == (8, 8)
+
+
+def test_sniff_image_header_rejects_oversized_headers_and_non_images():
+    with pytest.raises(InvalidImageContent, match="dimensions"):
+        sniff_image_header(_png_declaring(20_000, 20_000)[:64], complete=False)
+    with pytest.raises(InvalidImageContent, match="not a valid image"):
+        sniff_image_header(b"%PDF-1.7 " * 100, complete=False)
+
+
+def test_sniff_image_header_defers_recognized_formats_with_late_headers():
+    # A JPEG whose size marker lies past the prefix (e.g. behind EXIF).
+    prefix = b"\xff\xd8\xff\xe1" + b"\x00" * 200
+
+    assert sniff_image_header(prefix, complete=False) is None
+    with pytest.raises(InvalidImageContent):
+        sniff_image_header(prefix, complete=True)
+
+
+def _tagged(fmt: str, *, orientation: int = 1, size=(48, 32)) -> bytes:
+    exif = Image.Exif()
+    exif[ExifTags.Base.Make] = "Camera"
+    exif[ExifTags.Base.Orientation] = orientation
+    icc = ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB")).tobytes()
+    buffer = BytesIO()
+    Image.new("RGB", size, (30, 140, 220)).save(
+        buffer, format=fmt, quality=80, exif=exif, icc_profile=icc
+    )
+    return buffer.getvalue()
+
+
+def test_normalize_strips_jpeg_metadata_without_recompressing(settings):
+    settings.IMAGE_ORIGINAL_PASSTHROUGH_MAX_BYTES = 1024 * 1024
+    data = _tagged("JPEG", orientation=6)
+
+    normalized = normalize_image_bytes(data)
+
+    scan = data.index(b"\xff\xda")
+    assert normalized.endswith(data[scan:])
+    assert stored_image_format(normalized) == ("jpg", "image/jpeg")
+    with Image.open(BytesIO(normalized)) as image:
+        assert "icc_profile" not in image.info
+        assert dict(image.getexif()) == {ExifTags.Base.Orientation: 6}
+    assert image_dimensions(normalized) == (32, 48)
+
+
+def test_normalize_strips_webp_metadata_chunks(settings):
+    settings.IMAGE_ORIGINAL_PASSTHROUGH_MAX_BYTES = 1024 * 1024
+    data = _tagged("WEBP")
+
+    normalized = normalize_image_bytes(data)
+
+    assert b"ICCP" in data and b"EXIF" in data
+    assert b"ICCP" not in normalized and b"EXIF" not in normalized
+    assert len(normalized) < len(data)
+    with Image.open(BytesIO(data)) as source, Image.open(BytesIO(normalized)) as out:
+        assert out.tobytes() == source.tobytes()
+        assert "icc_profile" not in out.info
+
+
+@pytest.mark.parametrize(
+    "fmt, orientation, limit",
+    [("WEBP", 6, 1024 * 1024), ("PNG", 1, 1024 * 1024), ("JPEG", 1, 10)],
+)
+def test_normalize_reencodes_when_passthrough_does_not_apply(
+    settings, fmt, orientation, limit
+):
+    settings.IMAGE_ORIGINAL_PASSTHROUGH_MAX_BYTES = limit
+    data = _tagged(fmt, orientation=orientation)
+
+    normalized = normalize_image_bytes(data)
+
+    assert stored_image_format(normalized) == ("webp", "image/webp")
+    with Image.open(BytesIO(normalized)) as image:
+        assert image.format == "WEBP"
+        assert not image.getexif()
+    assert image_dimensions(normalized) == ((32, 48) if orientation == 6 else (48, 32))
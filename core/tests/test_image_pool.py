@@ -0,0 +1,76 @@
+import io
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+from PIL import Image as PilImage
+
+from core.utils.image import render_upload
+from core.utils.image_pool import (
+    ImagePool,
+    ImagePoolBusy,
+    ImageWorkFailed,
+    run_in_image_pool,
+)
+
+
+def make_pool(**overrides) -> ImagePool:
+    options = {
+        "workers": 1,
+        "max_queue": 4,
+        "task_timeout": 30,
+        "max_tasks_per_child": 10,
+        "memory_limit_bytes": 0,
+    }
+    options.update(overrides)
+    return ImagePool(**options)
+
+
+def png_bytes() -> bytes:
+    buf = io.BytesIO()
+    PilImage.new("RGB", (40, 30), (10, 120, 200)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_run_in_image_pool_runs_inline_without_workers(settings):
+    settings.IMAGE_POOL_WORKERS = 0
+
+    with patch("core.utils.image_pool.image_pool") as pool:
+        assert run_in_image_pool(pow, 2, 10) == 1024
+
+    pool.assert_not_called()
+
+
+def test_pool_refuses_work_once_the_queue_is_full():
+    pool = make_pool(max_queue=0)
+
+    with pytest.raises(ImagePoolBusy):
+        pool.run(pow, 2, 3)
+
+    assert pool.depth == 0
+
+
+def test_pool_runs_image_work_in_a_worker_process():
+    pool = make_pool()
+    try:
+        rendered = pool.run(render_upload, png_bytes())
+        assert pool.run(pow, 3, 3) == 27
+    finally:
+        pool.shutdown()
+
+    assert set(rendered.variants) >= {"thumb"}
+    assert rendered.intrinsics["variant_metadata"]["original"]["width"] == 40
+    assert pool.depth == 0
+
+
+@pytest.mark.skipif(sys.version_info < (3, 14), reason="kill_workers needs Python 3.14")
+def test_pool_kills_workers_on_timeout_and_recovers():
+    pool = make_pool(task_timeout=0.5)
+    try:
+        with pytest.raises(ImageWorkFailed):
+            pool.run(time.sleep, 10)
+        pool.task_timeout = 30
+        assert pool.run(pow, 2, 5) == 32
+    finally:
+        pool.shutdown()
@@ -0,0 +1,111 @@
+from datetime import UTC, datetime
+
+import boto3
+import pytest
+from botocore.config import Config
+
+from core.utils.sigv4 import derive_signing_key, presign_get_object_url
+
+SIGNED_AT = datetime(2026, 10, 19, 12, 30, 5, tzinfo=UTC)
+
+
+def botocore_presign(monkeypatch, endpoint_url, region, bucket, key, params):
+    monkeypatch.setattr(
+        "botocore.auth.get_current_datetime",
+        lambda *args, **kwargs: SIGNED_AT.replace(tzinfo=None),
+    )
+    client = boto3.client(
+        "s3",
+        endpoint_url=endpoint_url,
+        aws_access_key_id="access-key",
+        aws_secret_access_key="secret/key+value",
+        region_name=region,
+        config=Config(signature_version="s3v4"),
+    )
+    return client.generate_presigned_url(
+        "get_object",
+        Params={"Bucket": bucket, "Key": key, **params},
+        ExpiresIn=900,
+    )
+
+
+@pytest.mark.parametrize(
+    ("endpoint_url", "region", "key", "params"),
+    [
+        (
+            "https://account.r2.cloudflarestorage.com",
+            "auto",
+            "private/images/1/0f4c_thumb.webp",
+            {
+                "ResponseContentType": "image/webp",
+                "ResponseCacheControl": "private, max-age=900",
+            },
+        ),
+        (
+            "http://127.0.0.1:9000/",
+            "us-east-1",
+            "dir/a b+c~ü(1)&x=y.jpg",
+            {
+                "ResponseCacheControl": "private, no-store",
+                "ResponseContentType": "application/zip",
+            },
+        ),
+        ("https://minio.example:8443", "eu-west-1", "/leading//slashes.png", {}),
+    ],
+)
+def test_presigned_url_is_byte_identical_to_botocore(
+    monkeypatch, endpoint_url, region, key, params
+):
+    expected = botocore_presign(
+        monkeypatch, endpoint_url, region, "media-bucket", key, params
+    )
+    query_names = {
+        "ResponseContentType": "response-content-type",
+        "ResponseCacheControl": "response-cache-control",
+    }
+
+    url = presign_get_object_url(
+        endpoint_url=endpoint_url,
+        bucket="media-bucket",
+        key=key,
+        access_key="access-key",
+        secret_key="secret/key+value",
+        region=region,
+        expires_in=900,
+        params={query_names[name]: value for name, value in params.items()},
+        signed_at=SIGNED_AT,
+    )
+
+    assert url == expected
+
+
+def test_signing_key_is_derived_once_per_day_and_region():
+    derive_signing_key.cache_clear()
+    for second in range(3):
+        presign_get_object_url(
+            endpoint_url="https://r2.example",
+            bucket="bucket",
+            key=f"images/{second}.webp",
+            access_key="access",
+            secret_key="secret",
+            region="auto",
+            expires_in=60,
+            signed_at=SIGNED_AT.replace(second=second),
+        )
+
+    info = derive_signing_key.cache_info()
+    assert (info.misses, info.hits) == (1, 2)
+
+
+@pytest.mark.parametrize("expires_in", [0, 7 * 24 * 60 * 60 + 1])
+def test_presign_rejects_out_of_range_expiry(expires_in):
+    with pytest.raises(ValueError):
+        presign_get_object_url(
+            endpoint_url="https://r2.example",
+            bucket="bucket",
+            key="images/a.webp",
+            access_key="access",
+            secret_key="secret",
+            region="auto",
+            expires_in=expires_in,
+        )
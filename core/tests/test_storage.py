@@ -1,9 +1,18 @@
 import types
 from unittest.mock import MagicMock, patch
 
+import pytest
+
 from core.utils.avatar import delete_existing_avatar
 from core.utils.storage import (
+    PRIVATE_IMMUTABLE_CACHE_CONTROL,
+    PUBLIC_IMMUTABLE_CACHE_CONTROL,
+    StoredObject,
     generate_presigned_storage_url,
+    hashed_media_key,
+    is_hashed_media_key,
+    list_storage_objects,
+    media_cache_control,
     public_storage_url,
     upload_to_public_storage,
     upload_to_storage,
@@ -57,26 +66,19 @@ def test_delete_existing_avatar_no_avatar():
         mock_delete.assert_not_called()
 
 
-def test_generate_presigned_storage_url_builds_s3_request(monkeypatch):
-    from core.utils.storage import _s3_client
-
-    _s3_client.cache_clear()
+def test_generate_presigned_storage_url_uses_fast_presigner(monkeypatch):
     called = {}
 
-    class DummyClient:
-        def generate_presigned_url(self, operation, Params, ExpiresIn):
-            called["operation"] = operation
-            called["params"] = Params
-            called["expires_in"] = ExpiresIn
-            return "https://signed.example/avatar.webp"
+    def fake_presign(**kwargs):
+        called.update(kwargs)
+        return "https://signed.example/avatar.webp"
 
-    def fake_client(service, **kwargs):
-        called["service"] = service
-        called["kwargs"] = kwargs
-        return DummyClient()
-
-    monkeypatch.setattr("core.utils.storage.boto3.client", fake_client)
-    generate_presigned_storage_url(
+    monkeypatch.setattr("core.utils.storage.presign_get_object_url", fake_presign)
+    monkeypatch.setattr(
+        "core.utils.storage.boto3.client",
+        lambda *args, **kwargs: pytest.fail("botocore should not be used"),
+    )
+    url = generate_presigned_storage_url(
         "avatars/avatar.webp",
         expires_in=120,
         content_type="image/webp",
@@ -90,15 +92,20 @@ def test_generate_presigned_storage_url_builds_s3_request(monkeypatch):
         },
     )
 
-    assert called["service"] == "s3"
-    assert called["kwargs"]["endpoint_url"] == "https://r2.example"
-    assert called["params"] == {
-        "Bucket": "bucket",
-        "Key": "avatars/avatar.webp",
-        "ResponseContentType": "image/webp",
-        "ResponseCacheControl": "public, max-age=120",
+    assert url == "https://signed.example/avatar.webp"
+    assert called == {
+        "endpoint_url": "https://r2.example",
+        "bucket": "bucket",
+        "key": "avatars/avatar.webp",
+        "access_key": "access",
+        "secret_key": "secret",
+        "region": "auto",
+        "expires_in": 120,
+        "params": {
+            "response-content-type": "image/webp",
+            "response-cache-control": "public, max-age=120",
+        },
     }
-    assert called["expires_in"] == 120
 
 
 def test_public_storage_url_quotes_key(settings):
@@ -148,3 +155,62 @@ def test_upload_to_public_storage_writes_public_bucket(monkeypatch, settings):
         "Body": b"image-bytes",
         "ContentType": "image/webp",
     }
+
+
+def test_list_storage_objects_pages_through_list_objects_v2():
+    client = MagicMock()
+    client.get_paginator.return_value.paginate.return_value = [
+        {"Contents": [{"Key": "a", "LastModified": "t1"}]},
+        {"Contents": [{"Key": "b", "LastModified": "t2"}]},
+        {},
+    ]
+    options = {
+        "bucket_name": "media",
+        "endpoint_url": "https://r2.example",
+        "access_key": "access",
+        "secret_key": "secret",
+        "region_name": "auto",
+    }
+
+    with patch("core.utils.storage._s3_client", return_value=client):
+        listed = list(list_storage_objects("private/", storage_options=options))
+
+    assert listed == [StoredObject("a", "t1"), StoredObject("b", "t2")]
+    client.get_paginator.assert_called_once_with("list_objects_v2")
+    client.get_paginator.return_value.paginate.assert_called_once_with(
+        Bucket="media", Prefix="private/"
+    )
+
+
+def test_hashed_media_keys_carry_a_digest_and_immutable_caching():
+    key = hashed_media_key("public/avatars/users/", "0123abcd" * 8, "webp", stem="t")
+
+    assert key == "public/avatars/users/t.0123abcd0123abcd.webp"
+    assert is_hashed_media_key(key)
+    assert is_hashed_media_key("private/images/1/u.0123abcd0123abcd_thumb.webp")
+    assert not is_hashed_media_key("private/images/1/u_thumb.webp")
+    assert not is_hashed_media_key("0123abcd0123abcd.webp")
+    assert media_cache_control(key) == PUBLIC_IMMUTABLE_CACHE_CONTROL
+    assert (
+        media_cache_control("private/sprites/1/a.webp")
+        == PRIVATE_IMMUTABLE_CACHE_CONTROL
+    )
+    assert media_cache_control("exports/1/archive.zip") is None
+
+
+def test_upload_to_storage_puts_bucket_objects_with_cache_control(monkeypatch):
+    client = MagicMock()
+    monkeypatch.setattr(
+        "core.utils.storage.private_bucket_client", lambda: (client, "private")
+    )
+
+    with patch("django.core.files.storage.default_storage.url", return_value="u"):
+        upload_to_storage("private/images/1/a.webp", b"x", content_type="image/jpeg")
+
+    client.put_object.assert_called_once_with(
+        Bucket="private",
+        Key="private/images/1/a.webp",
+        Body=b"x",
+        ContentType="image/jpeg",
+        CacheControl=PRIVATE_IMMUTABLE_CACHE_CONTROL,
+    )
@@ -0,0 +1,100 @@
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+from botocore.exceptions import ClientError
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import StorageDeletion
+from core.tasks import drain_storage_deletions
+from core.utils.storage import delete_storage_objects, enqueue_storage_deletions
+
+BUCKET_OPTIONS = {
+    "bucket_name": "media",
+    "endpoint_url": "https://r2.example",
+    "access_key": "access",
+    "secret_key": "secret",
+    "region_name": "auto",
+}
+
+
+def test_delete_storage_objects_batches_delete_objects_calls():
+    client = MagicMock()
+    client.delete_objects.side_effect = [
+        {"Errors": [{"Key": "k3", "Code": "AccessDenied"}]},
+        {"Errors": [{"Key": "k1000", "Code": "NoSuchKey"}]},
+    ]
+    keys = [f"k{i}" for i in range(1001)]
+
+    with patch("core.utils.storage._s3_client", return_value=client):
+        failed = delete_storage_objects(keys, storage_options=BUCKET_OPTIONS)
+
+    assert failed == {"k3": "AccessDenied"}
+    first, second = client.delete_objects.call_args_list
+    assert len(first.kwargs["Delete"]["Objects"]) == 1000
+    assert second.kwargs["Delete"] == {"Objects": [{"Key": "k1000"}], "Quiet": True}
+    assert first.kwargs["Bucket"] == "media"
+
+
+def test_delete_storage_objects_marks_whole_batch_failed_on_client_error():
+    client = MagicMock()
+    client.delete_objects.side_effect = ClientError(
+        {"Error": {"Code": "SlowDown"}}, "DeleteObjects"
+    )
+
+    with patch("core.utils.storage._s3_client", return_value=client):
+        failed = delete_storage_objects(["a", "b"], storage_options=BUCKET_OPTIONS)
+
+    assert failed == {"a": "SlowDown", "b": "SlowDown"}
+
+
+@pytest.mark.django_db
+def test_enqueued_deletions_roll_back_with_the_transaction():
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            enqueue_storage_deletions(["private/images/1/a.webp"])
+            raise RuntimeError("roll back")
+
+    assert not StorageDeletion.objects.exists()
+
+
+@pytest.mark.django_db
+def test_enqueue_is_idempotent_and_drains_after_commit(
+    django_capture_on_commit_callbacks,
+):
+    with patch("core.tasks.delete_storage_objects", return_value={}) as delete:
+        with django_capture_on_commit_callbacks(execute=True):
+            enqueue_storage_deletions(["a", "b", "a", ""])
+            enqueue_storage_deletions(["b"])
+
+    assert StorageDeletion.objects.count() == 0
+    assert delete.call_args_list[0].args == (["a", "b"],)
+
+
+@pytest.mark.django_db
+def test_drain_retries_failed_keys_with_backoff():
+    StorageDeletion.objects.create(key="ok")
+    StorageDeletion.objects.create(key="stuck")
+    StorageDeletion.objects.create(
+        key="later", next_attempt_at=timezone.now() + timedelta(hours=1)
+    )
+
+    with patch(
+        "core.tasks.delete_storage_objects", return_value={"stuck": "AccessDenied"}
+    ) as delete:
+        result = drain_storage_deletions()
+
+    delete.assert_called_once_with(["ok", "stuck"], target="private")
+    assert result["deleted"] == 1
+    assert result["failed"] == 1
+    assert result["pending"] == 2
+    stuck = StorageDeletion.objects.get(key="stuck")
+    assert stuck.attempts == 1
+    assert stuck.last_error == "AccessDenied"
+    assert stuck.next_attempt_at > timezone.now() + timedelta(seconds=20)
+
+    # Not due yet: nothing is retried on the next run.
+    with patch("core.tasks.delete_storage_objects") as delete:
+        drain_storage_deletions()
+    delete.assert_not_called()
@@ -0,0 +1,62 @@
+import pytest
+from django.core.cache import cache
+
+from core.utils import token_bucket
+from core.utils.token_bucket import TokenBucket, take_tokens
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+def test_take_tokens_spends_until_empty_then_reports_refill_time():
+    bucket = TokenBucket("tests:bucket", capacity=10, period_seconds=10)
+
+    assert take_tokens([(bucket, 6)]) == 0
+    wait = take_tokens([(bucket, 6)])
+
+    assert wait == pytest.approx(2, abs=0.1)
+    # An oversized cost is clamped to the capacity.
+    assert take_tokens([(bucket, 500)]) == pytest.approx(6, abs=0.1)
+
+
+def test_take_tokens_is_all_or_nothing_across_buckets():
+    roomy = TokenBucket("tests:roomy", capacity=100, period_seconds=100)
+    tight = TokenBucket("tests:tight", capacity=5, period_seconds=100)
+
+    assert take_tokens([(tight, 3)]) == 0
+    assert take_tokens([(roomy, 10), (tight, 3)]) > 0
+    assert take_tokens([(roomy, 100)]) == 0
+    assert take_tokens([(tight, 0), (TokenBucket("off", 0, 60), 10)]) == 0
+
+
+class FakeRedis:
+    def __init__(self):
+        self.calls = []
+
+    def register_script(self, source):
+        def run(*, keys, args, client):
+            self.calls.append((keys, args, client))
+            return b"1.5"
+
+        return run
+
+
+def test_take_tokens_runs_one_script_against_redis(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(token_bucket, "redis_client", lambda: client)
+    monkeypatch.setattr(token_bucket, "_take_script", None)
+    bytes_bucket = TokenBucket("quota:bytes", capacity=3600, period_seconds=3600)
+    pixel_bucket = TokenBucket("quota:pixels", capacity=7200, period_seconds=3600)
+
+    wait = take_tokens([(bytes_bucket, 10), (pixel_bucket, 20)])
+
+    assert wait == 1.5
+    [(keys, args, used_client)] = client.calls
+    assert keys == [
+        str(cache.make_key("quota:bytes")),
+        str(cache.make_key("quota:pixels")),
+    ]
+    assert args == [3600, 1.0, 10.0, 7200, 2.0, 20.0]
+    assert used_client is client
@@ -1,6 +1,25 @@
+import hashlib
+from io import BytesIO
+
 import pytest
+from django.http.multipartparser import MultiPartParser
+from django.test.client import (
+    BOUNDARY,
+    MULTIPART_CONTENT,
+    RequestFactory,
+    encode_multipart,
+)
+from ninja.errors import HttpError
+from PIL import Image
 
-from core.utils.uploads import UploadTooLarge, read_uploaded_file_bounded
+from core.utils.uploads import (
+    SNIFF_BYTES,
+    StreamedUploadedFile,
+    StreamingImageUploadHandler,
+    UploadLimits,
+    UploadTooLarge,
+    read_uploaded_file_bounded,
+)
 
 
 class NeverReadOversizedUpload:
@@ -27,3 +46,93 @@ def test_declared_oversized_upload_is_not_read():
 def test_bounded_read_rejects_when_declared_size_is_missing():
     with pytest.raises(UploadTooLarge):
         read_uploaded_file_bounded(UndeclaredOversizedUpload(), max_bytes=10)
+
+
+class CountingStream(BytesIO):
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.consumed = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.consumed += len(chunk)
+        return chunk
+
+
+def png_bytes(size=(32, 32)) -> bytes:
+    buf = BytesIO()
+    Image.effect_noise(size, 64).convert("RGB").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def parse_streamed(files: dict, limits: UploadLimits):
+    body = encode_multipart(BOUNDARY, files)
+    stream = CountingStream(body)
+    meta = {"CONTENT_TYPE": MULTIPART_CONTENT, "CONTENT_LENGTH": str(len(body))}
+    handler = StreamingImageUploadHandler(RequestFactory().post("/"), limits)
+    parser = MultiPartParser(meta, stream, [handler])
+    return parser, stream, len(body)
+
+
+def test_streaming_handler_hashes_and_hands_over_received_bytes():
+    data = png_bytes((400, 400))
+    assert len(data) > SNIFF_BYTES
+    parser, _stream, _size = parse_streamed(
+        {"file": BytesIO(data)},
+        UploadLimits(max_file_bytes=len(data), file_too_large="too large"),
+    )
+
+    _post, files = parser.parse()
+    uploaded = files["file"]
+
+    assert isinstance(uploaded, StreamedUploadedFile)
+    assert uploaded.rejection is None
+    assert uploaded.sha256 == hashlib.sha256(data).hexdigest()
+    assert read_uploaded_file_bounded(uploaded, max_bytes=len(data)) is uploaded.data
+    assert uploaded.data == data
+
+
+def test_streaming_handler_stops_reading_an_oversized_body():
+    data = b"\x89PNG" + b"\x00" * (4 * SNIFF_BYTES)
+    parser, stream, size = parse_streamed(
+        {"file": BytesIO(data)},
+        UploadLimits(max_file_bytes=SNIFF_BYTES, file_too_large="too large"),
+    )
+
+    with pytest.raises(HttpError, match="too large"):
+        parser.parse()
+    assert stream.consumed < size
+
+
+def test_streaming_handler_enforces_file_count_and_aggregate_limits():
+    limits = UploadLimits(
+        max_file_bytes=10_000,
+        file_too_large="too large",
+        max_total_bytes=10_000,
+        total_too_large="aggregate",
+        max_files=2,
+        too_many_files="too many",
+    )
+    three = [BytesIO(png_bytes()) for _ in range(3)]
+    heavy = [BytesIO(b"x" * 6000) for _ in range(2)]
+
+    with pytest.raises(HttpError, match="too many"):
+        parse_streamed({"files": three}, limits)[0].parse()
+    with pytest.raises(HttpError, match="aggregate"):
+        parse_streamed({"files": heavy}, limits)[0].parse()
+
+
+def test_streaming_handler_drops_bodies_that_are_not_images():
+    data = b"%PDF-1.7\n" * (SNIFF_BYTES // 4)
+    parser, _stream, _size = parse_streamed(
+        {"file": BytesIO(data)},
+        UploadLimits(max_file_bytes=len(data), file_too_large="too large"),
+    )
+
+    uploaded = parser.parse()[1]["file"]
+
+    assert uploaded.rejection is not None
+    assert "not a valid image" in str(uploaded.rejection)
+    assert uploaded.data == b""
+    assert uploaded.size == len(data)
+    assert uploaded.sha256 == hashlib.sha256(data).hexdigest()
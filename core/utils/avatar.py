@@ -1,11 +1,6 @@
-import logging
 import os
 
-from django.db import transaction
-
-from core.utils.storage import delete_from_public_storage
-
-logger = logging.getLogger(__name__)
+from core.utils.storage import delete_from_public_storage, enqueue_storage_deletions
 
 
 def delete_existing_avatar(obj):
@@ -20,24 +15,17 @@ def delete_existing_avatar(obj):
     delete_avatar_files(avatar_filename)
 
 
-def delete_avatar_files(avatar_filename: str) -> None:
+def avatar_file_keys(avatar_filename: str) -> tuple[str, str]:
     base, ext = os.path.splitext(avatar_filename)
-    large_filename = f"{base}_lg{ext}"
-    delete_from_public_storage(avatar_filename)
-    delete_from_public_storage(large_filename)
+    return avatar_filename, f"{base}_lg{ext}"
+
+
+def delete_avatar_files(avatar_filename: str) -> None:
+    for key in avatar_file_keys(avatar_filename):
+        delete_from_public_storage(key)
 
 
 def schedule_avatar_file_deletion(avatar_filename: str | None) -> None:
     if not avatar_filename:
         return
-
-    def delete_after_commit() -> None:
-        try:
-            delete_avatar_files(avatar_filename)
-        except Exception:
-            logger.exception(
-                "avatar:delete_failed path=%s",
-                avatar_filename,
-            )
-
-    transaction.on_commit(delete_after_commit)
+    enqueue_storage_deletions(avatar_file_keys(avatar_filename), target="public")
@@ -0,0 +1,232 @@
+"""
+Memory admission control for image decoding.
+
+A 40 MP upload decodes to well over 100 MB of pixels, and a bulk request can
+carry twenty of them. Before anything is decoded, its cost is estimated from
+the header dimensions and reserved against a per-process budget (and, when
+configured, a per-host budget shared through the cache). Work that does not
+fit waits for earlier reservations to be released and is refused once
+IMAGE_DECODE_BUDGET_WAIT_SECONDS pass.
+
+Each host reservation is a lease with its own expiry, so one leaked by a
+process killed mid-decode frees itself instead of sitting in a shared counter.
+With django-redis the leases live in a sorted set scored by deadline and are
+admitted by one Lua script; other caches keep them in a dict via get/set.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.utils.image import image_dimensions
+from core.utils.image_pool import ImageWorkFailed
+from core.utils.token_bucket import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Decoded RGBA pixels, plus the working copy normalization makes of them.
+DECODE_BYTES_PER_PIXEL = 4 * 2
+HOST_BUDGET_POLL_SECONDS = 0.05
+# Outlives any decode; a lease leaked by a killed process expires on its own.
+HOST_BUDGET_LEASE_SECONDS = 10 * 60
+
+_ADMIT_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local cost = tonumber(ARGV[2])
+local lease_ms = tonumber(ARGV[4])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+local reserved = 0
+for _, lease in ipairs(redis.call('ZRANGE', KEYS[1], 0, -1)) do
+  reserved = reserved + tonumber(string.match(lease, ':(%d+)$'))
+end
+if reserved > 0 and reserved + cost > tonumber(ARGV[3]) then
+  return 0
+end
+redis.call('ZADD', KEYS[1], now + lease_ms, ARGV[1])
+redis.call('PEXPIRE', KEYS[1], lease_ms)
+return 1
+"""
+_admit_script = None
+
+
+class DecodeBudgetExhausted(ImageWorkFailed):
+    """The decode could not be admitted within the wait limit."""
+
+
+def decode_cost(data: bytes) -> int:
+    """Estimated peak bytes to decode ``data``, from its header alone."""
+    size = image_dimensions(data)
+    if size is None:
+        return len(data)
+    width, height = size
+    return width * height * DECODE_BYTES_PER_PIXEL
+
+
+class DecodeBudget:
+    """Bytes reserved by in-flight decodes in this process."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self.reserved = 0
+        self.waiting = 0
+
+    def acquire(self, cost: int, *, limit: int, deadline: float) -> bool:
+        # A decode larger than the whole budget is admitted on its own.
+        cost = min(cost, limit)
+        with self._condition:
+            self.waiting += 1
+            try:
+                while self.reserved + cost > limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+                self.reserved += cost
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self, cost: int, *, limit: int) -> None:
+        with self._condition:
+            self.reserved -= min(cost, limit)
+            self._condition.notify_all()
+
+
+_budget: DecodeBudget | None = None
+_budget_pid: int | None = None
+_budget_lock = threading.Lock()
+
+
+def decode_budget() -> DecodeBudget:
+    global _budget, _budget_pid
+    with _budget_lock:
+        if _budget is None or _budget_pid != os.getpid():
+            _budget = DecodeBudget()
+            _budget_pid = os.getpid()
+        return _budget
+
+
+def _megabytes_setting(name: str, default: int) -> int:
+    return max(0, int(getattr(settings, name, default))) * 1024 * 1024
+
+
+def host_budget_key() -> str:
+    return f"images:decode-budget:{socket.gethostname()}"
+
+
+def _admit_in_redis(client, lease: str, cost: int, *, limit: int) -> bool:
+    global _admit_script
+    if _admit_script is None:
+        _admit_script = client.register_script(_ADMIT_SCRIPT)
+    admitted = _admit_script(
+        keys=[str(cache.make_key(host_budget_key()))],
+        args=[lease, cost, limit, HOST_BUDGET_LEASE_SECONDS * 1000],
+        client=client,
+    )
+    return bool(int(admitted))
+
+
+def host_leases() -> dict[str, tuple[int, float]]:
+    """Unexpired host leases in a non-Redis cache, as ``{id: (cost, expiry)}``."""
+    now = time.time()
+    leases = cache.get(host_budget_key()) or {}
+    return {lease: held for lease, held in leases.items() if held[1] > now}
+
+
+def _admit_in_cache(lease: str, cost: int, *, limit: int) -> bool:
+    leases = host_leases()
+    reserved = sum(held_cost for held_cost, _expiry in leases.values())
+    if reserved and reserved + cost > limit:
+        return False
+    leases[lease] = (cost, time.time() + HOST_BUDGET_LEASE_SECONDS)
+    cache.set(host_budget_key(), leases, timeout=HOST_BUDGET_LEASE_SECONDS)
+    return True
+
+
+def _acquire_host(cost: int, *, limit: int, deadline: float) -> str | None:
+    """Take a lease on the host budget; returns its id, or None on timeout."""
+    cost = min(cost, limit)
+    # The cost rides in the id so the script can total leases from the set.
+    lease = f"{uuid.uuid4().hex}:{cost}"
+    client = redis_client()
+    while True:
+        if client is not None:
+            admitted = _admit_in_redis(client, lease, cost, limit=limit)
+        else:
+            admitted = _admit_in_cache(lease, cost, limit=limit)
+        if admitted:
+            return lease
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(HOST_BUDGET_POLL_SECONDS)
+
+
+def _release_host(lease: str) -> None:
+    client = redis_client()
+    if client is not None:
+        client.zrem(str(cache.make_key(host_budget_key())), lease)
+        return
+    leases = host_leases()
+    if leases.pop(lease, None) is not None:
+        cache.set(host_budget_key(), leases, timeout=HOST_BUDGET_LEASE_SECONDS)
+
+
+@contextmanager
+def reserve_decode_budget(data: bytes) -> Iterator[int]:
+    """
+    Hold a reservation for decoding ``data`` for the duration of the block.
+    Raises DecodeBudgetExhausted when it cannot be admitted in time.
+    """
+    limit = _megabytes_setting("IMAGE_DECODE_BUDGET_MB", 512)
+    host_limit = _megabytes_setting("IMAGE_DECODE_HOST_BUDGET_MB", 0)
+    if not limit and not host_limit:
+        yield 0
+        return
+    cost = decode_cost(data)
+    wait = float(getattr(settings, "IMAGE_DECODE_BUDGET_WAIT_SECONDS", 10))
+    started = time.monotonic()
+    deadline = started + wait
+    budget = decode_budget()
+    if limit and not budget.acquire(cost, limit=limit, deadline=deadline):
+        _reject(cost, budget, scope="process")
+    try:
+        lease = None
+        if host_limit:
+            lease = _acquire_host(cost, limit=host_limit, deadline=deadline)
+            if lease is None:
+                _reject(cost, budget, scope="host")
+        try:
+            logger.info(
+                "images:decode_admitted cost=%d reserved=%d waiting=%d wait_ms=%.0f",
+                cost,
+                budget.reserved,
+                budget.waiting,
+                (time.monotonic() - started) * 1000,
+            )
+            yield cost
+        finally:
+            if lease is not None:
+                _release_host(lease)
+    finally:
+        if limit:
+            budget.release(cost, limit=limit)
+
+
+def _reject(cost: int, budget: DecodeBudget, *, scope: str) -> None:
+    logger.warning(
+        "images:decode_rejected scope=%s cost=%d reserved=%d waiting=%d",
+        scope,
+        cost,
+        budget.reserved,
+        budget.waiting,
+    )
+    raise DecodeBudgetExhausted("Image processing is at its memory budget.")
@@ -1,9 +1,12 @@
+import math
+import os
 import warnings
+from dataclasses import dataclass, replace
 from io import BytesIO
-from typing import Dict, Tuple, Union
+from typing import Dict, Tuple, Union, cast
 
 from django.conf import settings
-from PIL import Image, ImageOps, UnidentifiedImageError
+from PIL import ExifTags, Image, ImageOps, UnidentifiedImageError, features
 
 
 class InvalidImageContent(ValueError):
@@ -52,6 +55,34 @@ def validate_image_content(data: bytes) -> None:
         raise InvalidImageContent("Uploaded file is not a valid image.") from exc
 
 
+def sniff_image_header(prefix: bytes, *, complete: bool) -> tuple[int, int] | None:
+    """
+    Vet the leading bytes of an upload before the rest arrives.
+    Raises InvalidImageContent for data no image format claims and for headers
+    declaring dimensions over the limits. Returns the size when the header
+    could be read, or None when a recognized format keeps it past ``prefix``
+    (e.g. JPEG behind large EXIF segments); full validation still follows.
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+            with Image.open(BytesIO(prefix)) as image:
+                _validate_image_dimensions(image)
+                return image.size
+    except InvalidImageContent:
+        raise
+    except Image.DecompressionBombError as exc:
+        raise InvalidImageContent("Image dimensions exceed the allowed limit.") from exc
+    except (UnidentifiedImageError, OSError, SyntaxError) as exc:
+        Image.init()
+        magic = prefix[:16]
+        if not complete and any(
+            accept(magic) for _factory, accept in Image.OPEN.values() if accept
+        ):
+            return None
+        raise InvalidImageContent("Uploaded file is not a valid image.") from exc
+
+
 def _coerce_validated_image(
     image_input: Union[bytes, BytesIO, Image.Image],
 ) -> tuple[Image.Image, bool]:
@@ -75,14 +106,114 @@ def _coerce_validated_image(
     raise TypeError("Unsupported image_input type")
 
 
-def resize_and_save(img, size, quality, format="WEBP"):
+def resize_and_save(img, size, quality, format="WEBP", **save_options):
     img_copy = img.copy()
     img_copy.thumbnail(size, Image.Resampling.LANCZOS)
     buf = BytesIO()
-    img_copy.save(buf, format=format, quality=quality)
+    img_copy.save(buf, format=format, quality=quality, **save_options)
     return buf.getvalue()
 
 
+_FORMAT_EXTENSIONS = {"WEBP": "webp", "AVIF": "avif", "JPEG": "jpg"}
+
+
+@dataclass(frozen=True)
+class VariantProfile:
+    """
+    One derived rendition of an uploaded image.
+    ``method`` is the WebP encoder effort (0 fast .. 6 smallest) and ``speed``
+    the AVIF one (0 smallest .. 10 fast). Lazy profiles are rendered on first
+    request; until then ``fallback`` is served. Profiles with ``avif_quality``
+    also get an AVIF sibling, rendered in the background after upload.
+    """
+
+    name: str
+    max_size: Tuple[int, int]
+    quality: int
+    format: str = "WEBP"
+    method: int = 4
+    speed: int = 8
+    lazy: bool = False
+    fallback: str | None = None
+    avif_quality: int | None = None
+
+    @property
+    def extension(self) -> str:
+        return _FORMAT_EXTENSIONS[self.format]
+
+    @property
+    def content_type(self) -> str:
+        return f"image/{'jpeg' if self.format == 'JPEG' else self.extension}"
+
+    def key_for(self, original_key: str) -> str:
+        base, _ext = os.path.splitext(original_key)
+        return f"{base}_{self.name}.{self.extension}"
+
+    def render(self, image: Image.Image) -> bytes:
+        options = (
+            {"speed": self.speed} if self.format == "AVIF" else {"method": self.method}
+        )
+        return resize_and_save(
+            image, self.max_size, self.quality, format=self.format, **options
+        )
+
+    def avif_sibling(self) -> "VariantProfile":
+        return replace(
+            self,
+            format="AVIF",
+            quality=self.avif_quality or self.quality,
+            avif_quality=None,
+            lazy=True,
+            fallback=self.name,
+        )
+
+
+VARIANT_PROFILES: Dict[str, VariantProfile] = {
+    profile.name: profile
+    for profile in (
+        VariantProfile("thumb", (160, 160), 65),
+        VariantProfile("sm", (640, 640), 80),
+        VariantProfile("md", (1024, 1024), 85, avif_quality=60),
+        VariantProfile("lg", (2048, 2048), 85, avif_quality=60),
+        VariantProfile("xl", (3072, 3072), 85, method=6, lazy=True, fallback="lg"),
+    )
+}
+EAGER_VARIANTS = tuple(
+    name for name, profile in VARIANT_PROFILES.items() if not profile.lazy
+)
+AVIF_SIBLINGS: Dict[str, VariantProfile] = {
+    name: profile.avif_sibling()
+    for name, profile in VARIANT_PROFILES.items()
+    if profile.avif_quality is not None
+}
+
+
+def avif_metadata_key(name: str) -> str:
+    """``variant_metadata`` entry recording that a variant's AVIF sibling exists."""
+    return f"{name}.avif"
+
+
+def avif_supported() -> bool:
+    return bool(features.check("avif"))
+
+
+def accepts_avif(accept: str | None) -> bool:
+    """Whether an Accept header explicitly lists image/avif with a nonzero q."""
+    for media_range in (accept or "").split(","):
+        media_type, *params = (part.strip() for part in media_range.split(";"))
+        if media_type.lower() != "image/avif":
+            continue
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
 def resize_avatar_images(
     image_input: Union[bytes, BytesIO, Image.Image],
     small_size: Tuple[int, int] = (160, 160),
@@ -107,9 +238,132 @@ def resize_avatar_images(
             source.close()
 
 
+_ORIENTATION = ExifTags.Base.Orientation
+# Formats every browser displays, stored as uploaded: content type by format.
+PASSTHROUGH_FORMATS = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+# APP0 (JFIF) and APP14 (Adobe colour transform) affect decoding; other APPn
+# segments carry EXIF, XMP, ICC, IPTC or vendor data.
+_JPEG_KEPT_APP_MARKERS = {0xE0, 0xEE}
+_JPEG_COMMENT_MARKER = 0xFE
+_JPEG_SOS_MARKER = 0xDA
+_WEBP_METADATA_CHUNKS = {b"EXIF", b"XMP ", b"ICCP"}
+_VP8X_ICC, _VP8X_EXIF, _VP8X_XMP, _VP8X_ANIMATION = 0x20, 0x08, 0x04, 0x02
+
+
+def _orientation_segment(orientation: int) -> bytes:
+    exif = Image.Exif()
+    exif[_ORIENTATION] = orientation
+    payload = exif.tobytes()
+    return b"\xff\xe1" + (len(payload) + 2).to_bytes(2, "big") + payload
+
+
+def strip_jpeg_metadata(data: bytes, *, orientation: int = 1) -> bytes | None:
+    """
+    Drop metadata segments from a JPEG without touching the compressed scan.
+    A non-default ``orientation`` is kept as a one-tag EXIF segment so
+    viewers still rotate the image. Returns None for malformed streams.
+    """
+    if data[:2] != b"\xff\xd8":
+        return None
+    kept = [data[:2]]
+    pending = _orientation_segment(orientation) if orientation != 1 else b""
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker != 0xE0 and pending:
+            kept.append(pending)
+            pending = b""
+        if marker == _JPEG_SOS_MARKER:
+            kept.append(data[pos:])
+            return b"".join(kept)
+        end = pos + 2 + int.from_bytes(data[pos + 2 : pos + 4], "big")
+        if end > len(data):
+            return None
+        is_metadata = marker == _JPEG_COMMENT_MARKER or (
+            0xE0 <= marker <= 0xEF and marker not in _JPEG_KEPT_APP_MARKERS
+        )
+        if not is_metadata:
+            kept.append(data[pos:end])
+        pos = end
+    return None
+
+
+def strip_webp_metadata(data: bytes) -> bytes | None:
+    """
+    Drop EXIF, XMP and ICC chunks from a still WebP and clear their VP8X
+    flags, leaving the bitstream as is. Returns None for malformed or
+    animated files.
+    """
+    if data[:4] != b"RIFF" or data[8:12] != b"WEBP":
+        return None
+    kept = []
+    pos = 12
+    while pos + 8 <= len(data):
+        fourcc = data[pos : pos + 4]
+        size = int.from_bytes(data[pos + 4 : pos + 8], "little")
+        end = pos + 8 + size + (size & 1)
+        if pos + 8 + size > len(data):
+            return None
+        chunk = data[pos:end]
+        if fourcc == b"VP8X":
+            flags = chunk[8]
+            if flags & _VP8X_ANIMATION:
+                return None
+            flags &= ~(_VP8X_ICC | _VP8X_EXIF | _VP8X_XMP)
+            chunk = chunk[:8] + bytes([flags]) + chunk[9:]
+        if fourcc not in _WEBP_METADATA_CHUNKS:
+            kept.append(chunk)
+        pos = end
+    body = b"WEBP" + b"".join(kept)
+    return b"RIFF" + len(body).to_bytes(4, "little") + body
+
+
+def passthrough_original(data: bytes) -> bytes | None:
+    """
+    The upload with its metadata stripped at the container level, when it
+    can be stored in its source format: a still RGB or greyscale JPEG or
+    WebP of at most IMAGE_ORIGINAL_PASSTHROUGH_MAX_BYTES (``0`` disables).
+    Returns None when the upload has to be re-encoded instead.
+    """
+    limit = int(getattr(settings, "IMAGE_ORIGINAL_PASSTHROUGH_MAX_BYTES", 0))
+    if len(data) > limit:
+        return None
+    with Image.open(BytesIO(data)) as image:
+        if (
+            image.format not in PASSTHROUGH_FORMATS
+            or image.mode not in ("RGB", "L")
+            or getattr(image, "is_animated", False)
+        ):
+            return None
+        orientation = image.getexif().get(_ORIENTATION, 1)
+        if image.format == "JPEG":
+            return strip_jpeg_metadata(data, orientation=orientation)
+    # WebP orientation is not honoured by browsers; re-encode rotated ones.
+    return strip_webp_metadata(data) if orientation == 1 else None
+
+
+def stored_image_format(data: bytes) -> tuple[str, str]:
+    """(extension, content type) of a normalized original."""
+    if data[:2] == b"\xff\xd8":
+        return "jpg", PASSTHROUGH_FORMATS["JPEG"]
+    return "webp", PASSTHROUGH_FORMATS["WEBP"]
+
+
 def normalize_image_bytes(data: bytes) -> bytes:
-    """Decode, orient, strip metadata, and encode an upload as WebP."""
+    """
+    Validate an upload and strip its metadata. Web-friendly uploads keep
+    their encoding (see passthrough_original); anything else is decoded,
+    oriented and encoded as WebP.
+    """
     validate_image_content(data)
+    passthrough = passthrough_original(data)
+    if passthrough is not None:
+        return passthrough
     with Image.open(BytesIO(data)) as image:
         normalized = ImageOps.exif_transpose(image).convert("RGB")
         max_dimension = int(getattr(settings, "UPLOAD_IMAGE_MAX_DIMENSION", 12_000))
@@ -121,34 +375,287 @@ def normalize_image_bytes(data: bytes) -> bytes:
         )
 
 
+def difference_hash(data: bytes, hash_size: int = 8) -> int:
+    """
+    Return a ``hash_size**2``-bit dHash of an encoded image.
+    Each bit records whether a pixel is darker than its right neighbour on a
+    tiny grayscale copy, so rescaling and recompression barely move it.
+    """
+    try:
+        with Image.open(BytesIO(data)) as image:
+            _validate_image_dimensions(image)
+            image.draft("L", (hash_size * 8, hash_size * 8))
+            gray = image.convert("L").resize(
+                (hash_size + 1, hash_size), Image.Resampling.BILINEAR
+            )
+    except InvalidImageContent:
+        raise
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as exc:
+        raise InvalidImageContent("Uploaded file is not a valid image.") from exc
+    pixels = gray.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] < pixels[offset + col + 1])
+    return value
+
+
+def image_dimensions(data: bytes) -> tuple[int, int] | None:
+    """
+    Read the displayed (width, height) from the image header without
+    decoding pixels, swapping the axes for EXIF orientations that rotate.
+    """
+    try:
+        with Image.open(BytesIO(data)) as image:
+            width, height = image.size
+            if image.getexif().get(_ORIENTATION, 1) in (5, 6, 7, 8):
+                return height, width
+            return width, height
+    except UnidentifiedImageError, OSError, Image.DecompressionBombError:
+        return None
+
+
+def perceptual_hash(data: bytes) -> int | None:
+    try:
+        return difference_hash(data)
+    except InvalidImageContent:
+        return None
+
+
+def image_intrinsics(original: bytes, variants: dict[str, bytes]) -> dict:
+    """
+    Layout metadata for an encoded original and its variants, as model fields.
+    Dimensions come from the encoded headers; the placeholder and dominant
+    colour are computed from the thumbnail, so the full image is not decoded
+    again.
+    """
+    variant_metadata = {}
+    for name, content in {"original": original, **variants}.items():
+        size = image_dimensions(content)
+        if size is not None:
+            variant_metadata[name] = {
+                "width": size[0],
+                "height": size[1],
+                "bytes": len(content),
+            }
+    try:
+        blurhash, color = image_placeholder(variants.get("thumb") or original)
+    except InvalidImageContent:
+        blurhash, color = "", ""
+    return {
+        "variant_metadata": variant_metadata,
+        "blurhash": blurhash,
+        "dominant_color": color,
+    }
+
+
+_BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+
+def _base83(value: int, length: int) -> str:
+    return "".join(
+        _BASE83[(value // 83 ** (length - digit - 1)) % 83] for digit in range(length)
+    )
+
+
+def _srgb_to_linear(value: int) -> float:
+    v = value / 255
+    return v / 12.92 if v <= 0.04045 else ((v + 0.055) / 1.055) ** 2.4
+
+
+_SRGB_TO_LINEAR = [_srgb_to_linear(value) for value in range(256)]
+
+
+def _linear_to_srgb(value: float) -> int:
+    v = min(max(value, 0.0), 1.0)
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def blurhash_encode(
+    image: Image.Image, x_components: int = 4, y_components: int = 3
+) -> str:
+    """
+    Encode an RGB image as a BlurHash string (https://blurha.sh).
+    Callers should pass a small image; every pixel contributes to every
+    component.
+    """
+    width, height = image.size
+    linear = [_SRGB_TO_LINEAR[value] for value in image.convert("RGB").tobytes()]
+    cos_x = [
+        [math.cos(math.pi * i * x / width) for x in range(width)]
+        for i in range(x_components)
+    ]
+    cos_y = [
+        [math.cos(math.pi * j * y / height) for y in range(height)]
+        for j in range(y_components)
+    ]
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            scale = (1 if i == j == 0 else 2) / (width * height)
+            r = g = b = 0.0
+            for y in range(height):
+                offset = y * width * 3
+                for x in range(width):
+                    basis = cos_x[i][x] * cos_y[j][y]
+                    pixel = offset + x * 3
+                    r += basis * linear[pixel]
+                    g += basis * linear[pixel + 1]
+                    b += basis * linear[pixel + 2]
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = _base83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        actual_max = max(abs(value) for factor in ac for value in factor)
+        quantised_max = max(0, min(82, int(actual_max * 166 - 0.5)))
+        maximum = (quantised_max + 1) / 166
+        result += _base83(quantised_max, 1)
+    else:
+        maximum = 1.0
+        result += _base83(0, 1)
+    result += _base83(
+        (_linear_to_srgb(dc[0]) << 16)
+        + (_linear_to_srgb(dc[1]) << 8)
+        + _linear_to_srgb(dc[2]),
+        4,
+    )
+    for factor in ac:
+        quantised = [
+            max(
+                0,
+                min(
+                    18,
+                    math.floor(
+                        math.copysign(abs(value / maximum) ** 0.5, value) * 9 + 9.5
+                    ),
+                ),
+            )
+            for value in factor
+        ]
+        result += _base83(quantised[0] * 19 * 19 + quantised[1] * 19 + quantised[2], 2)
+    return result
+
+
+def dominant_color(image: Image.Image) -> str:
+    """Return the most common colour of a small median-cut palette as #rrggbb."""
+    palette_image = image.convert("RGB").quantize(
+        colors=8, method=Image.Quantize.MEDIANCUT
+    )
+    palette = palette_image.getpalette() or []
+    counts = palette_image.getcolors() or [(1, 0)]
+    _count, index = max(counts)
+    offset = cast(int, index) * 3
+    r, g, b = palette[offset : offset + 3]
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def image_placeholder(data: bytes, size: int = 32) -> tuple[str, str]:
+    """Return (blurhash, dominant colour) for an encoded image."""
+    try:
+        with Image.open(BytesIO(data)) as image:
+            _validate_image_dimensions(image)
+            image.draft("RGB", (size * 4, size * 4))
+            small = ImageOps.exif_transpose(image).convert("RGB")
+    except InvalidImageContent:
+        raise
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as exc:
+        raise InvalidImageContent("Uploaded file is not a valid image.") from exc
+    small.thumbnail((size, size), Image.Resampling.BILINEAR)
+    return blurhash_encode(small), dominant_color(small)
+
+
 def resize_images(
     image_input: Union[bytes, BytesIO, Image.Image],
 ) -> Dict[str, bytes]:
     """
-    Resize an image to four versions according to project specs:
-      - Thumbnail: 160x160, 65% quality
-      - Small: 640x640, 80% quality
-      - Medium: 1024x1024, 85% quality
-      - Large: 2048x2048, 85% quality
-    Returns a dict with keys: 'thumb', 'sm', 'md', 'lg', each value is bytes (webp).
+    Render every eager profile in VARIANT_PROFILES (thumb, sm, md, lg).
+    Returns a dict of profile name to encoded bytes.
     Accepts bytes, BytesIO, or PIL.Image.Image as input.
     """
-    SIZES = {
-        "thumb": ((160, 160), 65),
-        "sm": ((640, 640), 80),
-        "md": ((1024, 1024), 85),
-        "lg": ((2048, 2048), 85),
-    }
+    return render_variants(image_input, EAGER_VARIANTS)
+
+
+@dataclass(frozen=True)
+class RenderedUpload:
+    variants: Dict[str, bytes]
+    phash: int | None
+    intrinsics: dict
+
+
+def render_upload(normalized: bytes) -> RenderedUpload:
+    """
+    Everything an upload derives from its normalized bytes, in one call so
+    the web tier can hand it to the image pool as a single task.
+    """
+    variants = resize_images(normalized)
+    return RenderedUpload(
+        variants=variants,
+        phash=perceptual_hash(variants.get("thumb") or normalized),
+        intrinsics=image_intrinsics(normalized, variants),
+    )
+
+
+def render_variants(
+    image_input: Union[bytes, BytesIO, Image.Image],
+    names: Tuple[str, ...],
+    profiles: Dict[str, VariantProfile] = VARIANT_PROFILES,
+) -> Dict[str, bytes]:
+    """Render the named profiles from one decode of ``image_input``."""
     try:
         source, should_close = _coerce_validated_image(image_input)
     except TypeError as exc:
         raise ValueError("Unsupported image input type") from exc
     try:
         image = ImageOps.exif_transpose(source).convert("RGB")
-        results = {}
-        for key, (size, quality) in SIZES.items():
-            results[key] = resize_and_save(image, size, quality, format="WEBP")
-        return results
+        return {name: profiles[name].render(image) for name in names}
     finally:
         if should_close:
             source.close()
+
+
+@dataclass(frozen=True)
+class SpriteSheet:
+    content: bytes
+    width: int
+    height: int
+    # (x, y, width, height) per tile, or None for a tile that could not be read.
+    boxes: list[tuple[int, int, int, int] | None]
+
+
+def compose_sprite_sheet(
+    tiles: list[bytes | None],
+    cell: Tuple[int, int],
+    columns: int,
+    quality: int = 80,
+) -> SpriteSheet:
+    """
+    Paste ``tiles`` (already-encoded thumbnails) row-major into a grid of
+    ``cell``-sized slots and encode the sheet as WebP. Tiles keep their own
+    size, anchored at the top-left of their slot.
+    """
+    columns = max(1, min(columns, len(tiles) or 1))
+    rows = max(1, math.ceil(len(tiles) / columns))
+    width, height = cell[0] * columns, cell[1] * rows
+    sheet = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    boxes: list[tuple[int, int, int, int] | None] = []
+    for index, tile in enumerate(tiles):
+        box = None
+        if tile is not None:
+            try:
+                with Image.open(BytesIO(tile)) as source:
+                    _load_validated_image(source)
+                    source.thumbnail(cell)
+                    x = (index % columns) * cell[0]
+                    y = (index // columns) * cell[1]
+                    sheet.paste(source.convert("RGBA"), (x, y))
+                    box = (x, y, source.width, source.height)
+            except InvalidImageContent, UnidentifiedImageError, OSError:
+                box = None
+        boxes.append(box)
+    buffer = BytesIO()
+    sheet.save(buffer, format="WEBP", quality=quality, method=4)
+    return SpriteSheet(buffer.getvalue(), width, height, boxes)
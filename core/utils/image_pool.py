@@ -0,0 +1,211 @@
+"""
+A process pool for CPU-bound image work in the web tier.
+
+Decoding and encoding on gunicorn's request threads holds the GIL and the
+worker's memory for every other route it serves. Upload and avatar endpoints
+submit that work here instead. Each gunicorn process owns a small forkserver
+pool (Pillow preloaded) whose workers run under an address-space limit and
+are replaced after a fixed number of tasks. A task that overruns its timeout
+kills the pool, which is rebuilt for the next one. When the queue is full,
+callers fail fast rather than pile up.
+"""
+
+import logging
+import multiprocessing
+import os
+import resource
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, TypeVar
+
+from django.conf import settings
+
+Result = TypeVar("Result")
+logger = logging.getLogger(__name__)
+
+PRELOAD_MODULES = ["PIL.Image", "PIL.ImageOps", "core.utils.image"]
+DEFAULT_IMAGE_POOL_WORKERS = 2
+DEFAULT_IMAGE_POOL_MAX_QUEUE = 8
+DEFAULT_IMAGE_POOL_TASK_TIMEOUT_SECONDS = 30
+DEFAULT_IMAGE_POOL_MAX_TASKS_PER_CHILD = 200
+DEFAULT_IMAGE_POOL_MEMORY_LIMIT_MB = 1024
+
+
+class ImageWorkFailed(RuntimeError):
+    """The pool could not finish a task: timeout, memory limit or dead worker."""
+
+
+class ImagePoolBusy(ImageWorkFailed):
+    """Too many tasks are already queued for this process's pool."""
+
+
+def _limit_worker_memory(memory_limit_bytes: int) -> None:
+    if memory_limit_bytes > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+
+
+def _timed_call(fn: Callable[..., Result], args: tuple) -> tuple[float, Result]:
+    return time.monotonic(), fn(*args)
+
+
+class ImagePool:
+    def __init__(
+        self,
+        *,
+        workers: int,
+        max_queue: int,
+        task_timeout: float,
+        max_tasks_per_child: int,
+        memory_limit_bytes: int,
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.task_timeout = task_timeout
+        self.max_tasks_per_child = max_tasks_per_child
+        self.memory_limit_bytes = memory_limit_bytes
+        self._lock = threading.Lock()
+        self._executor: ProcessPoolExecutor | None = None
+        self._pending = 0
+
+    @property
+    def depth(self) -> int:
+        """Tasks submitted by this process and not yet finished."""
+        return self._pending
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(PRELOAD_MODULES)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_limit_worker_memory,
+                initargs=(self.memory_limit_bytes,),
+                max_tasks_per_child=self.max_tasks_per_child,
+            )
+        return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        # Any task still running on it is lost; its callers see ImageWorkFailed.
+        executor.kill_workers()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, fn: Callable[..., Result], *args: Any) -> Result:
+        """Run ``fn(*args)`` in a pool worker and return its result."""
+        with self._lock:
+            if self._pending >= self.max_queue:
+                logger.warning(
+                    "images:pool_busy depth=%d max_queue=%d",
+                    self._pending,
+                    self.max_queue,
+                )
+                raise ImagePoolBusy("Image processing is at capacity.")
+            self._pending += 1
+            depth = self._pending
+            executor = self._get_executor()
+        submitted = time.monotonic()
+        name = getattr(fn, "__name__", repr(fn))
+        future: Future | None = None
+        try:
+            future = executor.submit(_timed_call, fn, args)
+            started, result = future.result(timeout=self.task_timeout)
+        except FutureTimeoutError as exc:
+            if future is not None and not future.cancel():
+                self._discard(executor)
+            logger.error(
+                "images:pool_timeout fn=%s depth=%d timeout=%s",
+                name,
+                depth,
+                self.task_timeout,
+            )
+            raise ImageWorkFailed("Image processing timed out.") from exc
+        except (BrokenProcessPool, CancelledError) as exc:
+            self._discard(executor)
+            logger.error("images:pool_broken fn=%s depth=%d", name, depth)
+            raise ImageWorkFailed("Image processing worker died.") from exc
+        except MemoryError as exc:
+            logger.error("images:pool_memory fn=%s depth=%d", name, depth)
+            raise ImageWorkFailed("Image processing ran out of memory.") from exc
+        finally:
+            with self._lock:
+                self._pending -= 1
+        finished = time.monotonic()
+        logger.info(
+            "images:pool_task fn=%s depth=%d wait_ms=%.0f run_ms=%.0f",
+            name,
+            depth,
+            (started - submitted) * 1000,
+            (finished - started) * 1000,
+        )
+        return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+_pool: ImagePool | None = None
+_pool_pid: int | None = None
+_pool_lock = threading.Lock()
+
+
+def _int_setting(name: str, default: int) -> int:
+    return int(getattr(settings, name, default))
+
+
+def image_pool_workers() -> int:
+    return max(0, _int_setting("IMAGE_POOL_WORKERS", DEFAULT_IMAGE_POOL_WORKERS))
+
+
+def image_pool() -> ImagePool:
+    """This process's pool, created on first use and never shared across forks."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            memory_limit_mb = _int_setting(
+                "IMAGE_POOL_MEMORY_LIMIT_MB", DEFAULT_IMAGE_POOL_MEMORY_LIMIT_MB
+            )
+            _pool = ImagePool(
+                workers=max(1, image_pool_workers()),
+                max_queue=max(
+                    1,
+                    _int_setting("IMAGE_POOL_MAX_QUEUE", DEFAULT_IMAGE_POOL_MAX_QUEUE),
+                ),
+                task_timeout=_int_setting(
+                    "IMAGE_POOL_TASK_TIMEOUT_SECONDS",
+                    DEFAULT_IMAGE_POOL_TASK_TIMEOUT_SECONDS,
+                ),
+                max_tasks_per_child=max(
+                    1,
+                    _int_setting(
+                        "IMAGE_POOL_MAX_TASKS_PER_CHILD",
+                        DEFAULT_IMAGE_POOL_MAX_TASKS_PER_CHILD,
+                    ),
+                ),
+                memory_limit_bytes=max(0, memory_limit_mb) * 1024 * 1024,
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def run_inline(fn: Callable[..., Result], *args: Any) -> Result:
+    return fn(*args)
+
+
+def run_in_image_pool(fn: Callable[..., Result], *args: Any) -> Result:
+    """
+    Run module-level ``fn(*args)`` in the image pool, or inline when
+    IMAGE_POOL_WORKERS is 0. ``fn`` must not touch the database.
+    """
+    if image_pool_workers() == 0:
+        return fn(*args)
+    return image_pool().run(fn, *args)
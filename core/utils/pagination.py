@@ -0,0 +1,17 @@
+from collections.abc import Callable
+
+from django.db.models import QuerySet
+
+
+class SerializedPage:
+    """Queryset stand-in for @paginate that only serializes the sliced page."""
+
+    def __init__(self, queryset: QuerySet, serialize_page: Callable[[list], list]):
+        self.queryset = queryset
+        self.serialize_page = serialize_page
+
+    def all(self) -> QuerySet:
+        return self.queryset
+
+    def __getitem__(self, item: slice) -> list:
+        return self.serialize_page(list(self.queryset[item]))
@@ -45,6 +45,23 @@ def resolve_content_type(app_label: str, model: str) -> ContentType:
         raise HttpError(404, "Object type not found") from exc
 
 
+@dataclass(frozen=True)
+class OrgScopedContentObjects:
+    scope: OrgScope
+    organization: Organization
+    content_type: ContentType
+    model_class: type[models.Model]
+    objs: list[models.Model]
+
+
+def _object_organization_id(obj: models.Model) -> int | None:
+    return (
+        obj.pk
+        if isinstance(obj, Organization)
+        else getattr(obj, "organization_id", None)
+    )
+
+
 def resolve_org_scoped_content_object(
     request: HttpRequest,
     org_slug: str,
@@ -62,12 +79,7 @@ def resolve_org_scoped_content_object(
         obj = cast(models.Model, get_object_or_404(model_class, pk=obj_id))
     except Http404 as exc:
         raise HttpError(404, "Object not found") from exc
-    object_org_id = (
-        obj.pk
-        if isinstance(obj, Organization)
-        else getattr(obj, "organization_id", None)
-    )
-    if object_org_id != org.pk:
+    if _object_organization_id(obj) != org.pk:
         raise HttpError(404, "Object not found")
     return OrgScopedContentObject(
         scope=scope,
@@ -76,3 +88,31 @@ def resolve_org_scoped_content_object(
         model_class=model_class,
         obj=obj,
     )
+
+
+def resolve_org_scoped_content_objects(
+    request: HttpRequest,
+    org_slug: str,
+    app_label: str,
+    model: str,
+    obj_ids: list[int],
+) -> OrgScopedContentObjects:
+    """Resolve several objects of one type; any missing or foreign id is a 404."""
+    scope = resolve_org_scope(request, org_slug)
+    org = scope.org
+    content_type = resolve_content_type(app_label, model)
+    model_class = apps.get_model(app_label, model)
+    if model_class is None:
+        raise HttpError(404, "Object type not found")
+    requested_ids = list(dict.fromkeys(obj_ids))
+    objs_by_id = model_class._default_manager.in_bulk(requested_ids)
+    objs = [objs_by_id.get(obj_id) for obj_id in requested_ids]
+    if any(obj is None or _object_organization_id(obj) != org.pk for obj in objs):
+        raise HttpError(404, "Object not found")
+    return OrgScopedContentObjects(
+        scope=scope,
+        organization=org,
+        content_type=content_type,
+        model_class=model_class,
+        objs=cast(list[models.Model], objs),
+    )
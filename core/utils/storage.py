@@ -1,5 +1,9 @@
+import logging
+import mimetypes
+import uuid
+from datetime import datetime
 from functools import lru_cache
-from typing import Any, cast
+from typing import Any, NamedTuple, cast
 from urllib.parse import quote
 
 import boto3
@@ -8,6 +12,57 @@ from botocore.exceptions import ClientError
 from django.conf import settings
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
+from django.db import transaction
+
+from core.models import StorageDeletion
+from core.utils.sigv4 import presign_get_object_url
+
+logger = logging.getLogger(__name__)
+
+
+# Media under these prefixes is written once and never overwritten: new
+# content always gets a new key (see hashed_media_key), so caches may keep it.
+IMMUTABLE_MEDIA_PREFIXES = ("public/avatars/", "private/images/", "private/sprites/")
+IMMUTABLE_MAX_AGE_SECONDS = 365 * 24 * 60 * 60
+PUBLIC_IMMUTABLE_CACHE_CONTROL = (
+    f"public, max-age={IMMUTABLE_MAX_AGE_SECONDS}, immutable"
+)
+PRIVATE_IMMUTABLE_CACHE_CONTROL = (
+    f"private, max-age={IMMUTABLE_MAX_AGE_SECONDS}, immutable"
+)
+MEDIA_KEY_DIGEST_LENGTH = 16
+
+
+def hashed_media_key(directory, content_hash, extension, *, stem=None):
+    """
+    ``{directory}/{stem}.{digest}.{extension}`` for a write-once media object.
+    ``content_hash`` is the hex SHA-256 of the bytes the object holds (or was
+    rendered from); the random ``stem`` keeps identical content uploaded by
+    different owners in separate objects, so deleting one never breaks another.
+    """
+    stem = stem or uuid.uuid4().hex
+    digest = content_hash[:MEDIA_KEY_DIGEST_LENGTH]
+    return f"{directory.rstrip('/')}/{stem}.{digest}.{extension}"
+
+
+def is_hashed_media_key(key):
+    """True for keys from hashed_media_key and the variants derived from them."""
+    name = key.rsplit("/", 1)[-1].rsplit(".", 1)[0].split("_", 1)[0]
+    stem, _dot, digest = name.rpartition(".")
+    return (
+        bool(stem)
+        and len(digest) == MEDIA_KEY_DIGEST_LENGTH
+        and all(char in "0123456789abcdef" for char in digest)
+    )
+
+
+def media_cache_control(key):
+    """Cache-Control for a write-once media key, or None for anything else."""
+    if not key.startswith(IMMUTABLE_MEDIA_PREFIXES):
+        return None
+    if key.startswith("public/"):
+        return PUBLIC_IMMUTABLE_CACHE_CONTROL
+    return PRIVATE_IMMUTABLE_CACHE_CONTROL
 
 
 def upload_to_storage(filename, content, content_type="image/webp", storage=None):
@@ -16,8 +71,21 @@ def upload_to_storage(filename, content, content_type="image/webp", storage=None
     - filename: the key/path in storage (e.g. 'avatars/avatar_xxx.webp')
     - content: bytes or file-like object
     - content_type: MIME type (default: image/webp)
+    Write-once media keys are stored with media_cache_control's header.
     Returns the storage URL for the uploaded file.
     """
+    bucket = private_bucket_client() if storage is None else None
+    if bucket is not None:
+        client, bucket_name = bucket
+        cache_control = media_cache_control(filename)
+        client.put_object(
+            Bucket=bucket_name,
+            Key=filename,
+            Body=content,
+            ContentType=content_type,
+            **({"CacheControl": cache_control} if cache_control else {}),
+        )
+        return default_storage.url(filename)
     storage = storage or default_storage
     file = ContentFile(content)
     saved_name = storage.save(filename, file)
@@ -60,6 +128,21 @@ def _s3_client(endpoint_url, access_key, secret_key, region_name):
     )
 
 
+def private_bucket_client():
+    """(client, bucket) for the private bucket, or None for local/test storage."""
+    options = private_storage_options()
+    bucket_name = options.get("bucket_name")
+    if not bucket_name:
+        return None
+    client = _s3_client(
+        options["endpoint_url"],
+        options["access_key"],
+        options["secret_key"],
+        options["region_name"],
+    )
+    return client, bucket_name
+
+
 def generate_presigned_storage_url(
     key,
     *,
@@ -70,24 +153,84 @@ def generate_presigned_storage_url(
     bucket_name=None,
 ):
     options = storage_options or _default_storage_options()
+    bucket = bucket_name or options["bucket_name"]
+    params = {}
+    if content_type:
+        params["response-content-type"] = content_type
+    if cache_control:
+        params["response-cache-control"] = cache_control
+    if options.get("endpoint_url"):
+        return presign_get_object_url(
+            endpoint_url=options["endpoint_url"],
+            bucket=bucket,
+            key=key,
+            access_key=options["access_key"],
+            secret_key=options["secret_key"],
+            region=options["region_name"],
+            expires_in=expires_in,
+            params=params,
+        )
+    # Without an explicit endpoint botocore picks AWS virtual-host addressing.
     client = _s3_client(
         options["endpoint_url"],
         options["access_key"],
         options["secret_key"],
         options["region_name"],
     )
-    params = {"Bucket": bucket_name or options["bucket_name"], "Key": key}
+    botocore_params = {"Bucket": bucket, "Key": key}
     if content_type:
-        params["ResponseContentType"] = content_type
+        botocore_params["ResponseContentType"] = content_type
     if cache_control:
-        params["ResponseCacheControl"] = cache_control
+        botocore_params["ResponseCacheControl"] = cache_control
     return client.generate_presigned_url(
         "get_object",
-        Params=params,
+        Params=botocore_params,
+        ExpiresIn=expires_in,
+    )
+
+
+def generate_presigned_upload(
+    key,
+    *,
+    content_type,
+    max_bytes,
+    expires_in=900,
+    storage_options=None,
+    bucket_name=None,
+):
+    """
+    Presign a browser POST upload of exactly one object.
+    The policy pins the key and content type and bounds the body size, so the
+    bucket rejects oversized or retyped uploads before any server sees them.
+    Returns {"url": ..., "fields": {...}} as produced by botocore.
+    """
+    options = storage_options or _default_storage_options()
+    client = _s3_client(
+        options["endpoint_url"],
+        options["access_key"],
+        options["secret_key"],
+        options["region_name"],
+    )
+    return client.generate_presigned_post(
+        Bucket=bucket_name or options["bucket_name"],
+        Key=key,
+        Fields={"Content-Type": content_type},
+        Conditions=[
+            {"Content-Type": content_type},
+            ["content-length-range", 1, max_bytes],
+        ],
         ExpiresIn=expires_in,
     )
 
 
+def generate_private_presigned_upload(key, **kwargs):
+    return generate_presigned_upload(
+        key,
+        storage_options=private_storage_options(),
+        **kwargs,
+    )
+
+
 def generate_private_presigned_storage_url(key, **kwargs):
     return generate_presigned_storage_url(
         key,
@@ -118,15 +261,67 @@ def upload_to_public_storage(
         options["secret_key"],
         options["region_name"],
     )
+    cache_control = media_cache_control(filename)
     client.put_object(
         Bucket=bucket_name,
         Key=filename,
         Body=content,
         ContentType=content_type,
+        **({"CacheControl": cache_control} if cache_control else {}),
     )
     return public_storage_url(filename)
 
 
+def copy_storage_object(source, destination, *, target="private"):
+    """
+    Copy ``source`` to ``destination`` in the private or public bucket,
+    setting the destination's content type and media_cache_control header.
+    Buckets copy server-side; local/test storage reads and rewrites the file.
+    """
+    options = (
+        public_storage_options() if target == "public" else private_storage_options()
+    )
+    content_type = mimetypes.guess_type(destination)[0] or "application/octet-stream"
+    bucket_name = options.get("bucket_name")
+    if not bucket_name:
+        with default_storage.open(source, "rb") as stored:
+            upload_to_storage(destination, stored.read(), content_type=content_type)
+        return
+    client = _s3_client(
+        options["endpoint_url"],
+        options["access_key"],
+        options["secret_key"],
+        options["region_name"],
+    )
+    cache_control = media_cache_control(destination)
+    client.copy_object(
+        Bucket=bucket_name,
+        Key=destination,
+        CopySource={"Bucket": bucket_name, "Key": source},
+        MetadataDirective="REPLACE",
+        ContentType=content_type,
+        **({"CacheControl": cache_control} if cache_control else {}),
+    )
+
+
+def read_storage_object(key, *, target="private"):
+    """Return the bytes stored at ``key`` in the private or public bucket."""
+    options = (
+        public_storage_options() if target == "public" else private_storage_options()
+    )
+    bucket_name = options.get("bucket_name")
+    if not bucket_name:
+        with default_storage.open(key, "rb") as stored:
+            return stored.read()
+    client = _s3_client(
+        options["endpoint_url"],
+        options["access_key"],
+        options["secret_key"],
+        options["region_name"],
+    )
+    return client.get_object(Bucket=bucket_name, Key=key)["Body"].read()
+
+
 def delete_from_public_storage(filename, storage_options=None):
     options = storage_options or public_storage_options()
     bucket_name = options.get("bucket_name")
@@ -164,3 +359,135 @@ def public_storage_exists(filename, storage_options=None) -> bool:
             return False
         raise
     return True
+
+
+class StoredObject(NamedTuple):
+    key: str
+    # None where the backend's listing carries no timestamp (local storage).
+    last_modified: datetime | None = None
+
+
+def list_storage_objects(prefix, *, storage_options=None):
+    """
+    Yield every object under ``prefix`` in key (UTF-8 byte) order.
+    A configured bucket is listed with ListObjectsV2 (1000 keys per request),
+    which returns keys in that order already; local/test storage is walked
+    through default_storage.listdir and sorted.
+    """
+    storage_options = storage_options or private_storage_options()
+    bucket_name = storage_options.get("bucket_name")
+    if not bucket_name:
+        # Like a bucket listing, a prefix may end partway through a name.
+        directory = prefix if prefix.endswith("/") else prefix.rpartition("/")[0]
+        for key in sorted(_walk_default_storage(directory.rstrip("/"))):
+            if key.startswith(prefix):
+                yield StoredObject(key)
+        return
+    client = _s3_client(
+        storage_options["endpoint_url"],
+        storage_options["access_key"],
+        storage_options["secret_key"],
+        storage_options["region_name"],
+    )
+    paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+        for item in page.get("Contents", []):
+            yield StoredObject(item["Key"], item.get("LastModified"))
+
+
+def list_storage_keys(prefix, *, storage_options=None):
+    """Yield every private storage key under ``prefix``, in key order."""
+    for stored in list_storage_objects(prefix, storage_options=storage_options):
+        yield stored.key
+
+
+def _walk_default_storage(prefix):
+    try:
+        directories, files = default_storage.listdir(prefix)
+    except FileNotFoundError, NotImplementedError:
+        return
+    for filename in files:
+        yield f"{prefix}/{filename}" if prefix else filename
+    for directory in directories:
+        yield from _walk_default_storage(
+            f"{prefix}/{directory}" if prefix else directory
+        )
+
+
+# S3 DeleteObjects accepts at most 1000 keys per request.
+STORAGE_DELETION_BATCH_SIZE = 1000
+
+
+def delete_storage_objects(keys, *, target="private", storage_options=None):
+    """
+    Delete ``keys`` from the private or public bucket in DeleteObjects batches.
+    Returns {key: error} for the keys that could not be deleted; a missing key
+    counts as deleted. Without a configured bucket (local/test storage) the
+    keys are deleted one by one through default_storage.
+    """
+    if storage_options is None:
+        storage_options = (
+            public_storage_options()
+            if target == "public"
+            else private_storage_options()
+        )
+    keys = [key for key in dict.fromkeys(keys) if key]
+    failed: dict[str, str] = {}
+    bucket_name = storage_options.get("bucket_name")
+    if not bucket_name:
+        for key in keys:
+            try:
+                default_storage.delete(key)
+            except Exception as exc:
+                failed[key] = str(exc) or exc.__class__.__name__
+        return failed
+
+    client = _s3_client(
+        storage_options["endpoint_url"],
+        storage_options["access_key"],
+        storage_options["secret_key"],
+        storage_options["region_name"],
+    )
+    for start in range(0, len(keys), STORAGE_DELETION_BATCH_SIZE):
+        batch = keys[start : start + STORAGE_DELETION_BATCH_SIZE]
+        try:
+            response = client.delete_objects(
+                Bucket=bucket_name,
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+            )
+        except ClientError as exc:
+            error = exc.response.get("Error", {}).get("Code") or str(exc)
+            failed.update({key: error for key in batch})
+            continue
+        for error in response.get("Errors", []):
+            if error.get("Code") == "NoSuchKey":
+                continue
+            failed[error["Key"]] = error.get("Code") or error.get("Message", "")
+    return failed
+
+
+def enqueue_storage_deletions(keys, *, target="private"):
+    """
+    Record ``keys`` for deletion in the caller's transaction.
+    The rows commit or roll back with the change that orphaned the objects, so
+    a crash after commit can no longer leak them; the drainer is kicked once
+    the transaction commits and the beat schedule picks up anything missed.
+    """
+    keys = [key for key in dict.fromkeys(keys) if key]
+    if not keys:
+        return
+    StorageDeletion.objects.bulk_create(
+        [StorageDeletion(target=target, key=key) for key in keys],
+        ignore_conflicts=True,
+    )
+
+    def kick_drainer() -> None:
+        from core.tasks import drain_storage_deletions
+
+        try:
+            drain_storage_deletions.delay()
+        except Exception:
+            # Rows stay queued; the periodic drain will process them.
+            logger.exception("storage:drain_enqueue_failed keys=%s", len(keys))
+
+    transaction.on_commit(kick_drainer)
@@ -0,0 +1,119 @@
+"""
+Token buckets in the shared cache.
+
+A bucket holds up to ``capacity`` tokens and refills continuously, reaching
+capacity again after ``period_seconds``. take_tokens spends from several
+buckets at once, all or nothing, and otherwise reports how long until the
+emptiest of them has refilled enough. A cost above a bucket's capacity is
+clamped to it, so one oversized request still runs once the bucket is full.
+
+With django-redis the take is a single Lua script: atomic across processes
+and timed by the Redis clock. Other caches (LocMem in tests) use get/set,
+which is not atomic but enough for one development process.
+"""
+
+import math
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from django.core.cache import cache
+
+_TAKE_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local wait = 0
+local levels = {}
+for i, key in ipairs(KEYS) do
+  local capacity = tonumber(ARGV[i * 3 - 2])
+  local rate = tonumber(ARGV[i * 3 - 1])
+  local cost = math.min(tonumber(ARGV[i * 3]), capacity)
+  local state = redis.call('HMGET', key, 'tokens', 'at')
+  local tokens = tonumber(state[1]) or capacity
+  local elapsed = math.max(0, now - (tonumber(state[2]) or now))
+  tokens = math.min(capacity, tokens + elapsed * rate)
+  levels[i] = tokens - cost
+  if tokens < cost then
+    wait = math.max(wait, (cost - tokens) / rate)
+  end
+end
+if wait == 0 then
+  for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 3 - 2])
+    local rate = tonumber(ARGV[i * 3 - 1])
+    redis.call('HSET', key, 'tokens', tostring(levels[i]), 'at', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000))
+  end
+end
+return tostring(wait)
+"""
+_take_script = None
+
+
+@dataclass(frozen=True)
+class TokenBucket:
+    key: str
+    capacity: float
+    period_seconds: float
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.capacity / self.period_seconds
+
+
+def redis_client():
+    """The raw client behind a django-redis cache, or None for other caches."""
+    get_client = getattr(getattr(cache, "client", None), "get_client", None)
+    return get_client(write=True) if get_client is not None else None
+
+
+def _take_in_redis(client, charges: list[tuple[TokenBucket, float]]) -> float:
+    global _take_script
+    if _take_script is None:
+        _take_script = client.register_script(_TAKE_SCRIPT)
+    keys = [str(cache.make_key(bucket.key)) for bucket, _cost in charges]
+    args: list[float] = []
+    for bucket, cost in charges:
+        args.extend((bucket.capacity, bucket.refill_per_second, cost))
+    return float(_take_script(keys=keys, args=args, client=client))
+
+
+def _take_in_cache(charges: list[tuple[TokenBucket, float]]) -> float:
+    now = time.time()
+    states = cache.get_many([bucket.key for bucket, _cost in charges])
+    wait = 0.0
+    levels = []
+    for bucket, cost in charges:
+        cost = min(cost, bucket.capacity)
+        tokens, at = states.get(bucket.key, (bucket.capacity, now))
+        tokens = min(
+            bucket.capacity, tokens + max(0.0, now - at) * bucket.refill_per_second
+        )
+        levels.append(tokens - cost)
+        if tokens < cost:
+            wait = max(wait, (cost - tokens) / bucket.refill_per_second)
+    if wait == 0:
+        for (bucket, _cost), level in zip(charges, levels, strict=True):
+            cache.set(
+                bucket.key, (level, now), timeout=math.ceil(bucket.period_seconds)
+            )
+    return wait
+
+
+def take_tokens(charges: Sequence[tuple[TokenBucket, float]]) -> float:
+    """
+    Spend ``cost`` from every ``(bucket, cost)`` pair, or from none of them.
+    Returns 0.0 when spent, else the seconds until the same take would
+    succeed. Buckets with no capacity and zero costs are ignored.
+    """
+    charges = [
+        (bucket, float(cost))
+        for bucket, cost in charges
+        if bucket.capacity > 0 and bucket.period_seconds > 0 and cost > 0
+    ]
+    if not charges:
+        return 0.0
+    client = redis_client()
+    if client is not None:
+        return _take_in_redis(client, charges)
+    return _take_in_cache(charges)
@@ -0,0 +1,74 @@
+"""
+Byte- and pixel-weighted upload quotas.
+
+Request-count throttles let a 50 MB upload cost the same as a 5 KB one.
+Upload endpoints therefore also spend from token buckets per user and per
+organization: one counts bytes received (or declared, for uploads that go
+straight to the bucket), the other decoded pixels, which is what the image
+work costs in CPU and memory. Each bucket refills its hourly allowance over
+an hour; a setting of 0 disables it. A refused upload gets 429 with a
+Retry-After of the refill time.
+"""
+
+import logging
+import math
+
+from django.conf import settings
+from ninja.errors import Throttled
+
+from core.utils.image import image_dimensions
+from core.utils.token_bucket import TokenBucket, take_tokens
+
+logger = logging.getLogger(__name__)
+
+QUOTA_PERIOD_SECONDS = 60 * 60
+_ALLOWANCES = {
+    # (scope, resource): (setting, default per hour, unit)
+    ("user", "bytes"): ("UPLOAD_QUOTA_USER_MB_PER_HOUR", 1024, 1024 * 1024),
+    ("org", "bytes"): ("UPLOAD_QUOTA_ORG_MB_PER_HOUR", 4096, 1024 * 1024),
+    ("user", "pixels"): ("UPLOAD_QUOTA_USER_MEGAPIXELS_PER_HOUR", 2000, 1_000_000),
+    ("org", "pixels"): ("UPLOAD_QUOTA_ORG_MEGAPIXELS_PER_HOUR", 8000, 1_000_000),
+}
+
+
+def upload_pixels(data: bytes) -> int:
+    """Pixels an encoded image decodes to, read from its header (0 if unknown)."""
+    size = image_dimensions(data)
+    return size[0] * size[1] if size else 0
+
+
+def _bucket(scope: str, owner_id, resource: str) -> TokenBucket:
+    setting, default, unit = _ALLOWANCES[(scope, resource)]
+    allowance = int(getattr(settings, setting, default)) * unit
+    return TokenBucket(
+        f"uploads:quota:{scope}:{owner_id}:{resource}",
+        capacity=allowance,
+        period_seconds=QUOTA_PERIOD_SECONDS,
+    )
+
+
+def charge_upload_quota(
+    *, user_id, organization_id=None, nbytes: int = 0, pixels: int = 0
+) -> None:
+    """
+    Spend ``nbytes`` and ``pixels`` from the user's and organization's
+    buckets, all or nothing. Raises Throttled with the wait in seconds when
+    any bucket is short.
+    """
+    charges = []
+    for scope, owner_id in (("user", user_id), ("org", organization_id)):
+        if owner_id is None:
+            continue
+        charges.append((_bucket(scope, owner_id, "bytes"), nbytes))
+        charges.append((_bucket(scope, owner_id, "pixels"), pixels))
+    wait = take_tokens(charges)
+    if wait:
+        logger.warning(
+            "uploads:quota_exceeded user=%s org=%s bytes=%d pixels=%d wait=%.1f",
+            user_id,
+            organization_id,
+            nbytes,
+            pixels,
+            wait,
+        )
+        raise Throttled(wait=math.ceil(wait))
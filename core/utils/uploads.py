@@ -1,12 +1,162 @@
+import hashlib
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import wraps
+from io import BytesIO
+
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from ninja.errors import HttpError
+
+from core.utils.image import InvalidImageContent, sniff_image_header
+
+# Enough for the headers of common formats; see sniff_image_header.
+SNIFF_BYTES = 64 * 1024
+
+
 class UploadTooLarge(ValueError):
     pass
 
 
+@dataclass(frozen=True)
+class UploadLimits:
+    max_file_bytes: int
+    file_too_large: str
+    max_total_bytes: int | None = None
+    total_too_large: str = "Upload exceeds the aggregate size limit."
+    max_files: int | None = None
+    too_many_files: str = "Too many files in one request."
+
+
+class StreamedUploadedFile(InMemoryUploadedFile):
+    """
+    An upload received by StreamingImageUploadHandler. ``data`` is the buffer
+    the body was streamed into, ``sha256`` its digest, and ``rejection`` the
+    reason the header sniff refused it (its bytes are then discarded).
+    """
+
+    def __init__(
+        self,
+        data: bytes,
+        *,
+        sha256: str,
+        rejection: InvalidImageContent | None,
+        field_name,
+        name,
+        content_type,
+        size,
+        charset,
+        content_type_extra=None,
+    ):
+        super().__init__(
+            BytesIO(data),
+            field_name,
+            name,
+            content_type,
+            size,
+            charset,
+            content_type_extra,
+        )
+        self.data = data
+        self.sha256 = sha256
+        self.rejection = rejection
+
+
+class StreamingImageUploadHandler(FileUploadHandler):
+    """
+    Receive multipart image files straight into memory while enforcing
+    ``limits`` chunk by chunk, hashing incrementally and sniffing the header,
+    so an oversized or non-image body is refused as soon as it shows.
+    """
+
+    def __init__(self, request, limits: UploadLimits):
+        super().__init__(request)
+        self.limits = limits
+        self.file_count = 0
+        self.total_bytes = 0
+
+    def new_file(self, field_name, file_name, content_type, content_length, *args):
+        super().new_file(field_name, file_name, content_type, content_length, *args)
+        self.file_count += 1
+        limits = self.limits
+        if limits.max_files is not None and self.file_count > limits.max_files:
+            raise HttpError(400, limits.too_many_files)
+        if content_length is not None and content_length > limits.max_file_bytes:
+            raise HttpError(400, limits.file_too_large)
+        self.buffer = BytesIO()
+        self.digest = hashlib.sha256()
+        self.received = 0
+        self.sniffed = False
+        self.rejection: InvalidImageContent | None = None
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        self.total_bytes += len(raw_data)
+        limits = self.limits
+        if self.received > limits.max_file_bytes:
+            raise HttpError(400, limits.file_too_large)
+        if limits.max_total_bytes is not None and (
+            self.total_bytes > limits.max_total_bytes
+        ):
+            raise HttpError(400, limits.total_too_large)
+        self.digest.update(raw_data)
+        if self.rejection is None:
+            self.buffer.write(raw_data)
+            if not self.sniffed and self.received >= SNIFF_BYTES:
+                self._sniff(complete=False)
+        return None
+
+    def _sniff(self, *, complete: bool) -> None:
+        self.sniffed = True
+        with self.buffer.getbuffer() as view:
+            head = bytes(view if complete else view[:SNIFF_BYTES])
+        try:
+            sniff_image_header(head, complete=complete)
+        except InvalidImageContent as exc:
+            self.rejection = exc
+            self.buffer = BytesIO()
+
+    def file_complete(self, file_size):
+        if not self.sniffed:
+            self._sniff(complete=True)
+        return StreamedUploadedFile(
+            # getvalue hands over the buffer itself rather than a copy.
+            self.buffer.getvalue(),
+            sha256=self.digest.hexdigest(),
+            rejection=self.rejection,
+            field_name=self.field_name,
+            name=self.file_name,
+            content_type=self.content_type,
+            size=file_size,
+            charset=self.charset,
+            content_type_extra=self.content_type_extra,
+        )
+
+
+def stream_image_uploads(limits: Callable[[], UploadLimits]):
+    """
+    Operation decorator, applied with ninja's ``decorate_view``, that makes
+    the request parse its multipart body with StreamingImageUploadHandler.
+    """
+
+    def decorator(run):
+        @wraps(run)
+        def wrapped(request, *args, **kwargs):
+            request.upload_handlers = [StreamingImageUploadHandler(request, limits())]
+            return run(request, *args, **kwargs)
+
+        return wrapped
+
+    return decorator
+
+
 def read_uploaded_file_bounded(uploaded_file, *, max_bytes: int) -> bytes:
     """Read at most max_bytes without copying an oversized upload into memory."""
     declared_size = getattr(uploaded_file, "size", None)
     if declared_size is not None and declared_size > max_bytes:
         raise UploadTooLarge
+    if isinstance(uploaded_file, StreamedUploadedFile):
+        return uploaded_file.data
     underlying = getattr(uploaded_file, "file", None)
     if underlying is not None:
         underlying.seek(0)
@@ -14,3 +164,17 @@ def read_uploaded_file_bounded(uploaded_file, *, max_bytes: int) -> bytes:
     if len(data) > max_bytes:
         raise UploadTooLarge
     return data
+
+
+def raise_for_rejected_upload(uploaded_file) -> None:
+    """Raise the InvalidImageContent the streaming header sniff recorded."""
+    rejection = getattr(uploaded_file, "rejection", None)
+    if rejection is not None:
+        raise rejection
+
+
+def uploaded_file_sha256(uploaded_file, data: bytes) -> str:
+    """The digest computed while streaming, or a fresh hash of ``data``."""
+    if isinstance(uploaded_file, StreamedUploadedFile):
+        return uploaded_file.sha256
+    return hashlib.sha256(data).hexdigest()
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 
-from .models import Image, ImageShareLink, PolymorphicImageRelation
+from .models import Image, ImageShareLink, ImageUploadIntent, PolymorphicImageRelation
 
 
 # Register your models here.
@@ -72,3 +72,19 @@ class ImageShareLinkAdmin(admin.ModelAdmin):
     )
     search_fields = ("image__title", "image__file")
     list_filter = ("revoked_at", "expires_at")
+
+
+@admin.register(ImageUploadIntent)
+class ImageUploadIntentAdmin(admin.ModelAdmin):
+    readonly_fields = ("object_key", "created_at", "finalized_at")
+    list_display = (
+        "id",
+        "organization",
+        "status",
+        "created_at",
+        "expires_at",
+        "finalized_at",
+    )
+    list_filter = ("status",)
+    search_fields = ("id", "organization__name", "organization__slug")
+    raw_id_fields = ("organization", "creator", "image")
@@ -1,22 +1,32 @@
 import secrets
 from datetime import timedelta
+from typing import List
 
 from django.conf import settings
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
 from ninja.errors import HttpError
 
 from core.authentication import JWTAuth
 from images.api.common import router
 from images.models import Image, ImageShareLink, hash_share_token
 from images.schemas import (
+    BatchSignImagesIn,
     CreateImageShareIn,
     DetailResponse,
     ImageShareOut,
     ImageSignedUrlsOut,
+    ImageSignedVariantsOut,
     ResolveImageShareIn,
 )
-from images.services import sign_image_variant_urls
+from images.services import (
+    SIGNABLE_VARIANTS,
+    resolve_share_link,
+    sign_image_variant_urls,
+    sign_images,
+)
 from images.throttles import share_link_throttle
 from organizations.scope import resolve_org_scope
 
@@ -37,10 +47,36 @@ def serialize_share_link(share_link: ImageShareLink, raw_token: str) -> ImageSha
     response=ImageSignedUrlsOut,
     auth=JWTAuth(),
 )
-def get_image_signed_urls(request, org_slug: str, image_id: int):
+def get_image_signed_urls(
+    request, response: HttpResponse, org_slug: str, image_id: int
+):
     scope = resolve_org_scope(request, org_slug)
     image = get_object_or_404(Image, id=image_id, organization=scope.org)
-    return sign_image_variant_urls(image)
+    patch_vary_headers(response, ("Accept",))
+    return sign_image_variant_urls(image, accept=request.headers.get("Accept"))
+
+
+@router.post(
+    "/orgs/{org_slug}/image-urls/",
+    response=List[ImageSignedVariantsOut],
+    auth=JWTAuth(),
+)
+def batch_sign_image_urls(
+    request, response: HttpResponse, org_slug: str, data: BatchSignImagesIn
+):
+    scope = resolve_org_scope(request, org_slug)
+    images = Image.objects.filter(id__in=data.image_ids, organization=scope.org)
+    patch_vary_headers(response, ("Accept",))
+    signed = sign_images(
+        images,
+        variants=data.variants or SIGNABLE_VARIANTS,
+        accept=request.headers.get("Accept"),
+    )
+    return [
+        signed[image_id]
+        for image_id in dict.fromkeys(data.image_ids)
+        if image_id in signed
+    ]
 
 
 @router.post(
@@ -86,11 +122,11 @@ def revoke_image_share(request, org_slug: str, image_id: int, share_id: int):
     auth=None,
     throttle=[share_link_throttle],
 )
-def get_shared_image_signed_urls(request, data: ResolveImageShareIn):
-    share_link = get_object_or_404(
-        ImageShareLink.objects.select_related("image"),
-        token_hash=hash_share_token(data.token),
-    )
-    if not share_link.is_active():
+def get_shared_image_signed_urls(
+    request, response: HttpResponse, data: ResolveImageShareIn
+):
+    image = resolve_share_link(data.token)
+    if image is None:
         raise HttpError(404, "Share link not found")
-    return sign_image_variant_urls(share_link.image)
+    patch_vary_headers(response, ("Accept",))
+    return sign_image_variant_urls(image, accept=request.headers.get("Accept"))
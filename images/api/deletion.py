@@ -8,11 +8,18 @@ from core.authentication import JWTAuth
 from core.utils.idempotency import run_idempotently
 from images.api.common import logger, router
 from images.models import Image
-from images.services import delete_image_record
+from images.services import delete_image_record, delete_image_records
 from images.throttles import bulk_delete_throttle
 from organizations.scope import resolve_org_scope
 
 
+def _coerce_image_id(value) -> int | None:
+    try:
+        return int(value)
+    except TypeError, ValueError:
+        return None
+
+
 @router.delete(
     "/orgs/{org_slug}/images/{image_id}/", auth=JWTAuth(), response={204: None}
 )
@@ -52,22 +59,29 @@ def bulk_delete_images(request, org_slug: str):
         if not ids:
             raise HttpError(400, "No ids provided for deletion")
 
+        requested = [(img_id, _coerce_image_id(img_id)) for img_id in ids]
+        valid_ids = {image_id for _img_id, image_id in requested if image_id}
+        try:
+            deleted = set(delete_image_records(org, valid_ids))
+        except Exception:
+            logger.exception("images:bulk_delete_batch_failed org=%s", org.id)
+            deleted = set()
+            delete_failed = valid_ids
+        else:
+            delete_failed = set()
+
         deleted_ids = []
         failed = []
-        for img_id in ids:
-            try:
-                image = Image.objects.get(id=img_id, organization=org)
-            except Image.DoesNotExist:
-                failed.append({"id": img_id, "reason": "not found"})
-                continue
-
-            try:
-                delete_image_record(image)
-            except Exception:
+        for img_id, image_id in requested:
+            if image_id in delete_failed:
                 failed.append({"id": img_id, "reason": "delete failed"})
-                continue
+            elif image_id in deleted:
+                deleted.discard(image_id)
+                deleted_ids.append(img_id)
+            else:
+                failed.append({"id": img_id, "reason": "not found"})
 
-            deleted_ids.append(img_id)
+        for img_id in deleted_ids:
             logger.info(
                 "audit:image_delete org=%s user=%s image=%s",
                 org.id,
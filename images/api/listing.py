@@ -1,38 +1,104 @@
-from typing import List
+from typing import Annotated, List
 
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+from ninja import Query
 from ninja.errors import HttpError
 from ninja.pagination import LimitOffsetPagination, paginate
 
 from core.authentication import JWTAuth
+from core.utils.pagination import SerializedPage
 from core.utils.polymorphic import resolve_org_scoped_content_object
 from images.api.common import router
 from images.models import Image, PolymorphicImageRelation
-from images.schemas import ImageOut, PolymorphicImageRelationOut
+from images.schemas import ImageOut, PolymorphicImageRelationOut, SimilarImageOut
 from images.serializers import serialize_image, serialize_image_relation
+from images.services import SIGNABLE_VARIANTS, sign_images
+from images.similarity import MAX_SEARCH_DISTANCE, find_similar_images
 from organizations.scope import resolve_org_scope
 
 
-@router.get("/orgs/{org_slug}/images/", response=List[ImageOut], auth=JWTAuth())
-@paginate(LimitOffsetPagination)
-def list_images_for_org(request, org_slug: str, ordering: str | None = None):
-    scope = resolve_org_scope(request, org_slug)
-    ordering_map = {
-        None: "-created_at",
-        "created_at": "created_at",
-        "-created_at": "-created_at",
-        "title": "title",
-        "-title": "-title",
-    }
-    if ordering not in ordering_map:
+def parse_sign_variants(sign: str | None) -> tuple[str, ...]:
+    if not sign:
+        return ()
+    variants = tuple(dict.fromkeys(part.strip() for part in sign.split(",")))
+    if not set(variants) <= set(SIGNABLE_VARIANTS):
+        raise HttpError(
+            400, f"Invalid sign variants. Allowed: {', '.join(SIGNABLE_VARIANTS)}"
+        )
+    return variants
+
+
+ORG_IMAGE_ORDERING = {
+    None: "-created_at",
+    "created_at": "created_at",
+    "-created_at": "-created_at",
+    "title": "title",
+    "-title": "-title",
+}
+OBJECT_IMAGE_ORDERING = {
+    None: "order",
+    "order": "order",
+    "-order": "-order",
+    "created_at": "image__created_at",
+    "-created_at": "-image__created_at",
+    "title": "image__title",
+    "-title": "-image__title",
+}
+
+
+def org_image_order_by(ordering: str | None) -> str:
+    if ordering not in ORG_IMAGE_ORDERING:
         raise HttpError(
             400, "Invalid ordering. Allowed: created_at, -created_at, title, -title"
         )
-    return [
-        serialize_image(image)
-        for image in Image.objects.filter(organization=scope.org).order_by(
-            ordering_map[ordering]
+    return ORG_IMAGE_ORDERING[ordering]
+
+
+def object_image_relations(content_type, obj_id: int, ordering: str | None):
+    """An object's gallery relations, with their images, in ``ordering``."""
+    if ordering not in OBJECT_IMAGE_ORDERING:
+        raise HttpError(
+            400, "Invalid ordering. Allowed: created_at, -created_at, title, -title"
         )
-    ]
+    return (
+        PolymorphicImageRelation.objects.filter(
+            content_type=content_type, object_id=obj_id
+        )
+        .select_related("image")
+        .order_by(OBJECT_IMAGE_ORDERING[ordering], "pk")
+    )
+
+
+@router.get("/orgs/{org_slug}/images/", response=List[ImageOut], auth=JWTAuth())
+@paginate(LimitOffsetPagination)
+def list_images_for_org(
+    request,
+    response: HttpResponse,
+    org_slug: str,
+    ordering: str | None = None,
+    sign: str | None = None,
+):
+    scope = resolve_org_scope(request, org_slug)
+    order_by = org_image_order_by(ordering)
+    variants = parse_sign_variants(sign)
+    accept = request.headers.get("Accept")
+    patch_vary_headers(response, ("Accept",))
+
+    def serialize_page(images: list[Image]) -> list[ImageOut]:
+        signed = (
+            sign_images(images, variants=variants, accept=accept) if variants else {}
+        )
+        return [
+            serialize_image(image, signed.get(image.id), accept=accept)
+            for image in images
+        ]
+
+    return SerializedPage(
+        Image.objects.filter(organization=scope.org).order_by(order_by),
+        serialize_page,
+    )
 
 
 @router.get(
@@ -43,32 +109,63 @@ def list_images_for_org(request, org_slug: str, ordering: str | None = None):
 @paginate(LimitOffsetPagination)
 def list_images_for_object(
     request,
+    response: HttpResponse,
     org_slug: str,
     app_label: str,
     model: str,
     obj_id: int,
     ordering: str | None = None,
+    sign: str | None = None,
 ):
     resolved = resolve_org_scoped_content_object(
         request, org_slug, app_label, model, obj_id
     )
-    ct = resolved.content_type
-    ordering_map = {
-        None: "order",
-        "order": "order",
-        "-order": "-order",
-        "created_at": "image__created_at",
-        "-created_at": "-image__created_at",
-        "title": "image__title",
-        "-title": "-image__title",
-    }
-    if ordering not in ordering_map:
-        raise HttpError(
-            400, "Invalid ordering. Allowed: created_at, -created_at, title, -title"
+    relations = object_image_relations(resolved.content_type, obj_id, ordering)
+    variants = parse_sign_variants(sign)
+    accept = request.headers.get("Accept")
+    patch_vary_headers(response, ("Accept",))
+
+    def serialize_page(
+        page: list[PolymorphicImageRelation],
+    ) -> list[PolymorphicImageRelationOut]:
+        signed = (
+            sign_images(
+                [relation.image for relation in page],
+                variants=variants,
+                accept=accept,
+            )
+            if variants
+            else {}
         )
-    relations = (
-        PolymorphicImageRelation.objects.filter(content_type=ct, object_id=obj_id)
-        .select_related("image")
-        .order_by(ordering_map[ordering], "pk")
-    )
-    return [serialize_image_relation(relation) for relation in relations]
+        return [
+            serialize_image_relation(
+                relation, signed.get(relation.image_id), accept=accept
+            )
+            for relation in page
+        ]
+
+    return SerializedPage(relations, serialize_page)
+
+
+@router.get(
+    "/orgs/{org_slug}/images/{image_id}/similar/",
+    response=List[SimilarImageOut],
+    auth=JWTAuth(),
+)
+def list_similar_images(
+    request,
+    org_slug: str,
+    image_id: int,
+    max_distance: Annotated[int, Query(ge=0, le=MAX_SEARCH_DISTANCE)] = 6,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+):
+    scope = resolve_org_scope(request, org_slug)
+    image = get_object_or_404(Image, id=image_id, organization=scope.org)
+    if image.phash is None:
+        raise HttpError(409, "Image has not been hashed yet.")
+    return [
+        SimilarImageOut(distance=distance, image=serialize_image(match))
+        for distance, match in find_similar_images(
+            image, max_distance=max_distance, limit=limit
+        )
+    ]
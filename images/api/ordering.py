@@ -3,16 +3,19 @@ from ninja.errors import HttpError
 from core.authentication import JWTAuth
 from core.utils.polymorphic import resolve_org_scoped_content_object
 from images.api.common import logger, router
-from images.api_schemas import ReorderIn
+from images.api_schemas import MoveImageIn, ReorderIn
 from images.operations import (
     ImageNotFoundError,
     ImageOperationError,
+    ImageOrderConflictError,
     ImageOwnershipError,
+    move_object_image,
     reorder_object_images,
     set_object_cover_image,
     unset_object_cover_image,
 )
-from images.schemas import DetailResponse, SetCoverIn
+from images.schemas import DetailResponse, PolymorphicImageRelationOut, SetCoverIn
+from images.serializers import serialize_image_relation
 
 
 @router.post(
@@ -56,6 +59,53 @@ def reorder_images(
     return DetailResponse(detail="ok")
 
 
+@router.post(
+    "/orgs/{org_slug}/images/{app_label}/{model}/{obj_id}/move",
+    response=PolymorphicImageRelationOut,
+    auth=JWTAuth(),
+)
+def move_image(
+    request, org_slug: str, app_label: str, model: str, obj_id: int, data: MoveImageIn
+):
+    resolved = resolve_org_scoped_content_object(
+        request, org_slug, app_label, model, obj_id
+    )
+    resolved.scope.require_write()
+    org = resolved.organization
+    user = resolved.scope.user
+
+    try:
+        relation = move_object_image(
+            organization_id=org.id,
+            target=resolved.obj,
+            content_type=resolved.content_type,
+            image_id=data.image_id,
+            before_id=data.before_id,
+            after_id=data.after_id,
+        )
+    except ImageNotFoundError as exc:
+        raise HttpError(404, str(exc)) from exc
+    except ImageOwnershipError as exc:
+        raise HttpError(403, str(exc)) from exc
+    except ImageOrderConflictError as exc:
+        raise HttpError(409, str(exc)) from exc
+    except ImageOperationError as exc:
+        raise HttpError(400, str(exc)) from exc
+    logger.info(
+        "audit:image_move org=%s user=%s app=%s model=%s obj=%s image=%s "
+        "before=%s after=%s",
+        org.id,
+        getattr(user, "id", None),
+        app_label,
+        model,
+        obj_id,
+        data.image_id,
+        data.before_id,
+        data.after_id,
+    )
+    return serialize_image_relation(relation)
+
+
 @router.post(
     "/orgs/{org_slug}/images/{app_label}/{model}/{obj_id}/set_cover",
     response=DetailResponse,
@@ -5,15 +5,25 @@ from ninja.errors import HttpError
 
 from core.authentication import JWTAuth
 from core.utils.idempotency import run_idempotently
-from core.utils.polymorphic import resolve_org_scoped_content_object
+from core.utils.polymorphic import (
+    resolve_org_scoped_content_object,
+    resolve_org_scoped_content_objects,
+)
 from images.api.common import logger, router
 from images.api_schemas import BulkImageIdsIn, ImageIdsIn
 from images.operations import (
     ImageNotFoundError,
     attach_images_to_object,
+    attach_images_to_objects,
     detach_images_from_object,
 )
-from images.schemas import BulkAttachOut, BulkDetachOut, PolymorphicImageRelationOut
+from images.schemas import (
+    AttachToObjectsIn,
+    BulkAttachOut,
+    BulkDetachOut,
+    ObjectAttachOut,
+    PolymorphicImageRelationOut,
+)
 from images.serializers import serialize_image_relation
 from images.throttles import bulk_attach_throttle, bulk_detach_throttle
 
@@ -111,6 +121,56 @@ def bulk_attach_images(
     return Status(status, response_data) if status != 200 else response_data
 
 
+@router.post(
+    "/orgs/{org_slug}/image-attachments/",
+    response=List[ObjectAttachOut],
+    auth=JWTAuth(),
+    throttle=[bulk_attach_throttle],
+)
+def attach_images_to_many_objects(request, org_slug: str, data: AttachToObjectsIn):
+    """Attach one set of images to several objects of the same type at once."""
+    resolved = resolve_org_scoped_content_objects(
+        request, org_slug, data.app_label, data.model, data.object_ids
+    )
+    resolved.scope.require_write()
+    org = resolved.organization
+    user = resolved.scope.user
+    requested_ids = list(dict.fromkeys(data.image_ids))
+
+    def perform_attach() -> tuple[int, list[dict]]:
+        try:
+            results = attach_images_to_objects(
+                organization_id=org.id,
+                targets=resolved.objs,
+                content_type=resolved.content_type,
+                image_ids=requested_ids,
+            )
+        except ImageNotFoundError as exc:
+            raise HttpError(
+                403, "One or more images do not belong to this organization"
+            ) from exc
+        response_data = []
+        for object_id, result in results.items():
+            if result.attached_image_ids:
+                logger.info(
+                    "audit:image_bulk_attach org=%s user=%s app=%s model=%s "
+                    "obj=%s attached=%s",
+                    org.id,
+                    getattr(user, "id", None),
+                    data.app_label,
+                    data.model,
+                    object_id,
+                    result.attached_image_ids,
+                )
+            response_data.append(
+                {"object_id": object_id, "attached": result.attached_image_ids}
+            )
+        return 200, response_data
+
+    status, response_data = run_idempotently(request, perform_attach)
+    return Status(status, response_data) if status != 200 else response_data
+
+
 @router.post(
     "/orgs/{org_slug}/images/{app_label}/{model}/{obj_id}/bulk_detach/",
     response=BulkDetachOut,
@@ -0,0 +1,189 @@
+import base64
+import binascii
+from uuid import UUID
+
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from ninja import Status
+from ninja.errors import HttpError
+
+from core.authentication import JWTAuth
+from core.utils.image import InvalidImageContent
+from core.utils.upload_quota import charge_upload_quota
+from images.api.common import router
+from images.api.uploads import (
+    image_upload_max_bytes,
+    publish_upload_intent_finalization,
+    serialize_upload_intent,
+    validate_declared_upload,
+)
+from images.models import ImageUploadIntent
+from images.resumable import (
+    ResumableUploadConflict,
+    ResumableUploadExpired,
+    append_resumable_chunk,
+    create_resumable_upload,
+    discard_resumable_staging,
+    resumable_upload_expired,
+)
+from images.schemas import UploadIntentOut
+from images.throttles import upload_throttle
+from organizations.scope import resolve_org_scope
+
+TUS_VERSION = "1.0.0"
+CHUNK_CONTENT_TYPE = "application/offset+octet-stream"
+
+
+def _require_tus_version(request) -> None:
+    if request.headers.get("Tus-Resumable") != TUS_VERSION:
+        raise HttpError(412, f"Tus-Resumable: {TUS_VERSION} is required.")
+
+
+def _int_header(request, name: str) -> int:
+    try:
+        value = int(request.headers.get(name, ""))
+    except ValueError:
+        value = -1
+    if value < 0:
+        raise HttpError(400, f"{name} must be a non-negative integer.")
+    return value
+
+
+def _upload_metadata(header: str) -> dict[str, str]:
+    """Decode tus Upload-Metadata: comma-separated ``key base64value`` pairs."""
+    metadata = {}
+    for pair in filter(None, (item.strip() for item in header.split(","))):
+        key, _, encoded = pair.partition(" ")
+        try:
+            metadata[key] = base64.b64decode(encoded, validate=True).decode()
+        except (binascii.Error, UnicodeDecodeError) as exc:
+            raise HttpError(400, "Upload-Metadata is malformed.") from exc
+    return metadata
+
+
+def _tus_response(status: int, intent: ImageUploadIntent) -> HttpResponse:
+    response = HttpResponse(status=status)
+    response["Tus-Resumable"] = TUS_VERSION
+    response["Upload-Offset"] = str(intent.upload_offset)
+    response["Upload-Length"] = str(intent.upload_length)
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+def _get_resumable_upload(request, org_slug: str, upload_id: UUID):
+    scope = resolve_org_scope(request, org_slug).require_write()
+    return get_object_or_404(
+        ImageUploadIntent,
+        pk=upload_id,
+        organization=scope.org,
+        upload_length__isnull=False,
+    )
+
+
+@router.post(
+    "/orgs/{org_slug}/resumable-uploads/",
+    response={201: UploadIntentOut},
+    auth=JWTAuth(),
+    throttle=[upload_throttle],
+)
+def create_image_resumable_upload(request, org_slug: str, response: HttpResponse):
+    """
+    Start a resumable upload (tus creation). Send ``Upload-Length`` and
+    ``Upload-Metadata`` with base64 ``filename`` and ``filetype``; chunks are
+    then PATCHed to the returned ``Location``.
+    """
+    scope = resolve_org_scope(request, org_slug).require_write()
+    _require_tus_version(request)
+    length = _int_header(request, "Upload-Length")
+    metadata = _upload_metadata(request.headers.get("Upload-Metadata", ""))
+    content_type = metadata.get("filetype", "")
+    if length == 0:
+        raise HttpError(400, "Upload-Length must be positive.")
+    if length > image_upload_max_bytes():
+        raise HttpError(413, "Upload-Length exceeds the maximum image size.")
+    error = validate_declared_upload(length, content_type)
+    if error:
+        raise HttpError(400, error)
+    # Pixels are charged once the upload completes and is finalized.
+    charge_upload_quota(
+        user_id=getattr(scope.user, "id", None),
+        organization_id=scope.org.pk,
+        nbytes=length,
+    )
+    intent = create_resumable_upload(
+        scope.org,
+        original_name=(metadata.get("filename") or "image")[:120],
+        content_type=content_type[:100],
+        length=length,
+        creator_id=getattr(scope.user, "id", None),
+    )
+    location = request.build_absolute_uri(f"{request.path}{intent.pk}/")
+    response["Location"] = location
+    response["Tus-Resumable"] = TUS_VERSION
+    response["Upload-Offset"] = "0"
+    return Status(201, serialize_upload_intent(intent, upload_url=location))
+
+
+@router.api_operation(
+    ["HEAD"],
+    "/orgs/{org_slug}/resumable-uploads/{upload_id}/",
+    response={200: None},
+    auth=JWTAuth(),
+)
+def get_image_resumable_upload_offset(request, org_slug: str, upload_id: UUID):
+    """Report how many bytes of the upload are stored (tus offset retrieval)."""
+    intent = _get_resumable_upload(request, org_slug, upload_id)
+    if resumable_upload_expired(intent):
+        raise HttpError(410, "The upload has expired.")
+    return _tus_response(200, intent)
+
+
+@router.patch(
+    "/orgs/{org_slug}/resumable-uploads/{upload_id}/",
+    response={204: None},
+    auth=JWTAuth(),
+)
+def append_image_resumable_upload(request, org_slug: str, upload_id: UUID):
+    """
+    Append the request body at ``Upload-Offset``. The chunk that completes
+    the upload queues it for the normal finalization pipeline.
+    """
+    intent = _get_resumable_upload(request, org_slug, upload_id)
+    _require_tus_version(request)
+    if request.content_type != CHUNK_CONTENT_TYPE:
+        raise HttpError(415, f"Chunks must be sent as {CHUNK_CONTENT_TYPE}.")
+    offset = _int_header(request, "Upload-Offset")
+    remaining = intent.upload_length - offset
+    declared = request.headers.get("Content-Length")
+    if remaining < 0 or (declared and declared.isdigit() and int(declared) > remaining):
+        raise HttpError(409, "The chunk extends past Upload-Length.")
+    data = request.read(remaining + 1)
+    try:
+        intent = append_resumable_chunk(intent, offset=offset, data=data)
+    except ResumableUploadConflict as exc:
+        raise HttpError(409, str(exc)) from exc
+    except ResumableUploadExpired as exc:
+        raise HttpError(410, str(exc)) from exc
+    except InvalidImageContent as exc:
+        raise HttpError(400, str(exc)) from exc
+    if intent.status == ImageUploadIntent.Status.PROCESSING:
+        publish_upload_intent_finalization(intent)
+    return _tus_response(204, intent)
+
+
+@router.delete(
+    "/orgs/{org_slug}/resumable-uploads/{upload_id}/",
+    response={204: None},
+    auth=JWTAuth(),
+)
+def delete_image_resumable_upload(request, org_slug: str, upload_id: UUID):
+    """Abandon an unfinished upload and discard its stored chunks (tus termination)."""
+    intent = _get_resumable_upload(request, org_slug, upload_id)
+    _require_tus_version(request)
+    if intent.status != ImageUploadIntent.Status.PENDING:
+        raise HttpError(409, "The upload is already being finalized.")
+    discard_resumable_staging(intent)
+    intent.delete()
+    response = HttpResponse(status=204)
+    response["Tus-Resumable"] = TUS_VERSION
+    return response
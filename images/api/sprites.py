@@ -0,0 +1,89 @@
+from ninja.errors import HttpError
+
+from core.authentication import JWTAuth
+from core.utils.polymorphic import resolve_org_scoped_content_object
+from images.api.common import router
+from images.api.listing import object_image_relations, org_image_order_by
+from images.models import Image
+from images.schemas import SpriteSheetOut, SpriteTileOut
+from images.sprites import SPRITE_MAX_IMAGES, sprite_sheet_for_images
+from organizations.scope import resolve_org_scope
+
+
+def _page_bounds(limit: int, offset: int) -> slice:
+    if not 1 <= limit <= SPRITE_MAX_IMAGES or offset < 0:
+        raise HttpError(
+            400, f"limit must be 1-{SPRITE_MAX_IMAGES} and offset non-negative."
+        )
+    return slice(offset, offset + limit)
+
+
+def _sprite_response(organization_id: int, images: list[Image]) -> SpriteSheetOut:
+    if not images:
+        return SpriteSheetOut()
+    sheet = sprite_sheet_for_images(organization_id, images)
+    return SpriteSheetOut(
+        url=sheet.url.url,
+        expires_at=sheet.url.expires_at.isoformat(),
+        width=sheet.width,
+        height=sheet.height,
+        cell_width=sheet.cell_width,
+        cell_height=sheet.cell_height,
+        tiles=[
+            SpriteTileOut(
+                image_id=tile.image_id,
+                x=tile.x,
+                y=tile.y,
+                width=tile.width,
+                height=tile.height,
+            )
+            for tile in sheet.tiles
+        ],
+    )
+
+
+@router.get("/orgs/{org_slug}/image-sprite/", response=SpriteSheetOut, auth=JWTAuth())
+def get_org_image_sprite(
+    request,
+    org_slug: str,
+    ordering: str | None = None,
+    limit: int = 100,
+    offset: int = 0,
+):
+    """
+    One sprite sheet of ``thumb`` variants for a page of the organization's
+    images, in the same order and with the same limit/offset as the list.
+    """
+    scope = resolve_org_scope(request, org_slug)
+    page = _page_bounds(limit, offset)
+    images = list(
+        Image.objects.filter(organization=scope.org).order_by(
+            org_image_order_by(ordering)
+        )[page]
+    )
+    return _sprite_response(scope.org.pk, images)
+
+
+@router.get(
+    "/orgs/{org_slug}/image-sprite/{app_label}/{model}/{obj_id}/",
+    response=SpriteSheetOut,
+    auth=JWTAuth(),
+)
+def get_object_image_sprite(
+    request,
+    org_slug: str,
+    app_label: str,
+    model: str,
+    obj_id: int,
+    ordering: str | None = None,
+    limit: int = 100,
+    offset: int = 0,
+):
+    """One sprite sheet of ``thumb`` variants for a page of an object's gallery."""
+    resolved = resolve_org_scoped_content_object(
+        request, org_slug, app_label, model, obj_id
+    )
+    page = _page_bounds(limit, offset)
+    relations = object_image_relations(resolved.content_type, obj_id, ordering)
+    images = [relation.image for relation in relations[page]]
+    return _sprite_response(resolved.organization.pk, images)
@@ -2,20 +2,40 @@ import hashlib
 import json
 from dataclasses import dataclass
 from typing import List
+from uuid import UUID
 
 from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from ninja import File, Status, UploadedFile
+from ninja.decorators import decorate_view
 from ninja.errors import HttpError
 
 from core.authentication import JWTAuth
 from core.utils.idempotency import run_idempotently
 from core.utils.image import InvalidImageContent
-from core.utils.uploads import UploadTooLarge, read_uploaded_file_bounded
+from core.utils.image_pool import run_in_image_pool
+from core.utils.upload_quota import charge_upload_quota, upload_pixels
+from core.utils.uploads import (
+    UploadLimits,
+    UploadTooLarge,
+    read_uploaded_file_bounded,
+    stream_image_uploads,
+    uploaded_file_sha256,
+)
 from images.api.common import router
 from images.api_schemas import BulkUploadResponse
-from images.schemas import ImageOut
+from images.models import ImageUploadIntent
+from images.schemas import CreateUploadIntentIn, ImageOut, UploadIntentOut
 from images.serializers import serialize_image
-from images.services import ImageUploadFailed, upload_image_file
+from images.services import (
+    ImageUploadFailed,
+    create_upload_intent,
+    upload_image_file,
+)
+from images.tasks import finalize_image_upload_intent
 from images.throttles import bulk_upload_throttle, upload_throttle
 from organizations.scope import resolve_org_scope
 
@@ -25,39 +45,79 @@ class PreparedUpload:
     name: str
     content_type: str
     data: bytes
+    size: int
+    sha256: str
+    rejection: InvalidImageContent | None = None
 
 
 def image_upload_max_bytes() -> int:
     return int(getattr(settings, "UPLOAD_IMAGE_MAX_BYTES", 10 * 1024 * 1024))
 
 
-def validate_image_upload(file):
+def _file_too_large_message() -> str:
+    max_bytes = image_upload_max_bytes()
+    return f"File too large. Maximum allowed size is {int(max_bytes/1024/1024)}MB."
+
+
+def _single_upload_limits() -> UploadLimits:
+    return UploadLimits(
+        max_file_bytes=image_upload_max_bytes(),
+        file_too_large=_file_too_large_message(),
+    )
+
+
+def _bulk_upload_limits() -> UploadLimits:
+    max_files = int(getattr(settings, "UPLOAD_IMAGE_MAX_FILES_PER_REQUEST", 20))
+    return UploadLimits(
+        max_file_bytes=image_upload_max_bytes(),
+        file_too_large="Image upload exceeds the per-file size limit.",
+        max_total_bytes=int(
+            getattr(settings, "UPLOAD_IMAGE_MAX_TOTAL_BYTES", 50 * 1024 * 1024)
+        ),
+        total_too_large="Image upload exceeds the aggregate size limit.",
+        max_files=max_files,
+        too_many_files=f"Upload at most {max_files} images per request.",
+    )
+
+
+def validate_declared_upload(size, content_type) -> str | None:
     max_bytes = image_upload_max_bytes()
-    declared_size = getattr(file, "size", None)
-    if declared_size is not None and declared_size > max_bytes:
-        return f"File too large. Maximum allowed size is {int(max_bytes/1024/1024)}MB."
+    if size is not None and size > max_bytes:
+        return _file_too_large_message()
     prefixes = getattr(settings, "UPLOAD_ALLOWED_IMAGE_MIME_PREFIXES", ("image/",))
-    if not any(str(file.content_type or "").startswith(p) for p in prefixes):
+    if not any(str(content_type or "").startswith(p) for p in prefixes):
         return "Invalid file type. Only images are allowed."
     return None
 
 
+def validate_image_upload(file):
+    return validate_declared_upload(getattr(file, "size", None), file.content_type)
+
+
 def _read_prepared_upload(file, *, max_bytes: int) -> PreparedUpload:
     try:
         data = read_uploaded_file_bounded(file, max_bytes=max_bytes)
     except UploadTooLarge as exc:
         raise HttpError(400, "Image upload exceeds the configured size limit.") from exc
+    rejection = getattr(file, "rejection", None)
     return PreparedUpload(
         name=str(getattr(file, "name", "") or "image"),
         content_type=str(getattr(file, "content_type", "") or ""),
         data=data,
+        # A rejected file's bytes were dropped while streaming.
+        size=file.size if rejection is not None else len(data),
+        sha256=uploaded_file_sha256(file, data),
+        rejection=rejection,
     )
 
 
 def _multipart_fingerprint(files: list[PreparedUpload]) -> str:
-    """Hash ordered multipart metadata and bytes using a versioned format."""
+    """
+    Hash ordered multipart metadata and per-file digests using a versioned
+    format; the digests were computed while the files streamed in.
+    """
     digest = hashlib.sha256()
-    digest.update(b"image-bulk-upload-v1\0")
+    digest.update(b"image-bulk-upload-v2\0")
     for index, file in enumerate(files):
         metadata = json.dumps(
             {
@@ -65,15 +125,14 @@ def _multipart_fingerprint(files: list[PreparedUpload]) -> str:
                 "index": index,
                 "name": file.name,
                 "content_type": file.content_type,
-                "size": len(file.data),
+                "size": file.size,
             },
             sort_keys=True,
             separators=(",", ":"),
         ).encode()
         digest.update(len(metadata).to_bytes(8, "big"))
         digest.update(metadata)
-        digest.update(len(file.data).to_bytes(8, "big"))
-        digest.update(file.data)
+        digest.update(bytes.fromhex(file.sha256))
     return digest.hexdigest()
 
 
@@ -129,6 +188,7 @@ def _request_upload_files(request) -> list:
     auth=JWTAuth(),
     throttle=[upload_throttle],
 )
+@decorate_view(stream_image_uploads(_single_upload_limits))
 def upload_image(request, org_slug: str, file: UploadedFile = File(...)):
     scope = resolve_org_scope(request, org_slug).require_write()
     org = scope.org
@@ -139,11 +199,21 @@ def upload_image(request, org_slug: str, file: UploadedFile = File(...)):
 
     try:
         prepared = _read_prepared_upload(file, max_bytes=image_upload_max_bytes())
+        if prepared.rejection is not None:
+            raise prepared.rejection
+        charge_upload_quota(
+            user_id=getattr(user, "id", None),
+            organization_id=org.pk,
+            nbytes=len(prepared.data),
+            pixels=upload_pixels(prepared.data),
+        )
         img = upload_image_file(
             prepared.data,
             org,
             original_name=prepared.name,
             creator_id=getattr(user, "id", None),
+            source_hash=prepared.sha256,
+            runner=run_in_image_pool,
         )
     except InvalidImageContent as exc:
         raise HttpError(400, str(exc)) from exc
@@ -158,6 +228,7 @@ def upload_image(request, org_slug: str, file: UploadedFile = File(...)):
     auth=JWTAuth(),
     throttle=[bulk_upload_throttle],
 )
+@decorate_view(stream_image_uploads(_bulk_upload_limits))
 def bulk_upload_images(request, org_slug: str):
     scope = resolve_org_scope(request, org_slug).require_write()
     org = scope.org
@@ -169,6 +240,13 @@ def bulk_upload_images(request, org_slug: str):
     fingerprint = _multipart_fingerprint(prepared_files)
 
     def perform_upload() -> tuple[int, list[dict]]:
+        accepted = [item.data for item in prepared_files if item.rejection is None]
+        charge_upload_quota(
+            user_id=getattr(user, "id", None),
+            organization_id=org.pk,
+            nbytes=sum(len(data) for data in accepted),
+            pixels=sum(upload_pixels(data) for data in accepted),
+        )
         responses = []
         for file, prepared in zip(files, prepared_files, strict=True):
             try:
@@ -178,11 +256,15 @@ def bulk_upload_images(request, org_slug: str):
                         BulkUploadResponse(status="error", error=error, file=file.name)
                     )
                     continue
+                if prepared.rejection is not None:
+                    raise prepared.rejection
                 img = upload_image_file(
                     prepared.data,
                     org,
                     original_name=prepared.name,
                     creator_id=getattr(user, "id", None),
+                    source_hash=prepared.sha256,
+                    runner=run_in_image_pool,
                 )
                 responses.append(
                     BulkUploadResponse(status="success", id=img.id, file=str(img.file))
@@ -205,3 +287,118 @@ def bulk_upload_images(request, org_slug: str):
     if status != 200:
         return Status(status, data)
     return [BulkUploadResponse.model_validate(item) for item in data]
+
+
+def publish_upload_intent_finalization(intent: ImageUploadIntent) -> None:
+    """Queue a PROCESSING intent's finalization, returning it to PENDING on failure."""
+    try:
+        finalize_image_upload_intent.delay(str(intent.pk))
+    except Exception as exc:
+        ImageUploadIntent.objects.filter(
+            pk=intent.pk, status=ImageUploadIntent.Status.PROCESSING
+        ).update(status=ImageUploadIntent.Status.PENDING)
+        raise HttpError(503, "Image finalization could not be queued.") from exc
+
+
+def serialize_upload_intent(
+    intent: ImageUploadIntent,
+    *,
+    upload_url: str | None = None,
+    upload_fields: dict[str, str] | None = None,
+) -> UploadIntentOut:
+    return UploadIntentOut(
+        id=str(intent.pk),
+        status=intent.status,
+        upload_url=upload_url,
+        upload_fields=upload_fields,
+        max_bytes=intent.max_bytes,
+        expires_at=intent.expires_at.isoformat(),
+        image=serialize_image(intent.image) if intent.image is not None else None,
+        error_message=intent.error_message,
+        upload_offset=(
+            intent.upload_offset if intent.upload_length is not None else None
+        ),
+        upload_length=intent.upload_length,
+    )
+
+
+@router.post(
+    "/orgs/{org_slug}/upload-intents/",
+    response={201: UploadIntentOut},
+    auth=JWTAuth(),
+    throttle=[upload_throttle],
+)
+def create_image_upload_intent(request, org_slug: str, data: CreateUploadIntentIn):
+    scope = resolve_org_scope(request, org_slug).require_write()
+    error = validate_declared_upload(data.size, data.content_type)
+    if error:
+        raise HttpError(400, error)
+    # The bytes go straight to the bucket; charge what the client declared
+    # and cap the presigned policy at it. Pixels are charged on finalize.
+    charge_upload_quota(
+        user_id=getattr(scope.user, "id", None),
+        organization_id=scope.org.pk,
+        nbytes=data.size,
+    )
+    presigned = create_upload_intent(
+        scope.org,
+        original_name=data.name,
+        content_type=data.content_type,
+        max_bytes=data.size,
+        creator_id=getattr(scope.user, "id", None),
+    )
+    return Status(
+        201,
+        serialize_upload_intent(
+            presigned.intent,
+            upload_url=presigned.url,
+            upload_fields=presigned.fields,
+        ),
+    )
+
+
+@router.get(
+    "/orgs/{org_slug}/upload-intents/{intent_id}/",
+    response=UploadIntentOut,
+    auth=JWTAuth(),
+)
+def get_image_upload_intent(request, org_slug: str, intent_id: UUID):
+    scope = resolve_org_scope(request, org_slug).require_write()
+    intent = get_object_or_404(
+        ImageUploadIntent.objects.select_related("image"),
+        pk=intent_id,
+        organization=scope.org,
+    )
+    return serialize_upload_intent(intent)
+
+
+@router.post(
+    "/orgs/{org_slug}/upload-intents/{intent_id}/finalize/",
+    response={202: UploadIntentOut},
+    auth=JWTAuth(),
+)
+def finalize_image_upload(request, org_slug: str, intent_id: UUID):
+    scope = resolve_org_scope(request, org_slug).require_write()
+    with transaction.atomic():
+        intent = get_object_or_404(
+            ImageUploadIntent.objects.select_for_update(),
+            pk=intent_id,
+            organization=scope.org,
+        )
+        should_publish = intent.status == ImageUploadIntent.Status.PENDING
+        if should_publish:
+            if intent.upload_length is not None:
+                raise HttpError(
+                    409, "Resumable uploads finalize with their last chunk."
+                )
+            if intent.expires_at <= timezone.now():
+                # Cleanup may be deleting the intent and its staged object.
+                raise HttpError(410, "The upload intent has expired.")
+            if not default_storage.exists(intent.object_key):
+                raise HttpError(409, "The upload has not been received yet.")
+            intent.status = ImageUploadIntent.Status.PROCESSING
+            intent.save(update_fields=["status"])
+    if should_publish:
+        publish_upload_intent_finalization(intent)
+    intent.refresh_from_db()
+    return Status(202, serialize_upload_intent(intent))
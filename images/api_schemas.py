@@ -30,3 +30,10 @@ class ImageIdsIn(Schema):
 class ReorderIn(Schema):
     image_ids: list[int]
     model_config = ConfigDict(extra="forbid")
+
+
+class MoveImageIn(Schema):
+    image_id: int
+    before_id: Optional[int] = None
+    after_id: Optional[int] = None
+    model_config = ConfigDict(extra="forbid")
@@ -0,0 +1,303 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import time
+from collections.abc import Iterable
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
+from core.utils.image import (
+    AVIF_SIBLINGS,
+    EAGER_VARIANTS,
+    VARIANT_PROFILES,
+    avif_metadata_key,
+    render_variants,
+)
+from core.utils.storage import list_storage_keys, upload_to_storage
+from images.models import Image, VariantBackfillCheckpoint
+from images.services import avif_variants_enabled, request_avif_variants
+
+BACKFILL_CHUNK_SIZE = 500
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BackfillStats:
+    images_scanned: int = 0
+    files_rendered: int = 0
+    variants_created: int = 0
+    originals_missing: int = 0
+    avif_queued: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+    error_messages: list[str] = field(default_factory=list)
+
+    def add(self, other: "BackfillStats") -> None:
+        for name in (
+            "images_scanned",
+            "files_rendered",
+            "variants_created",
+            "originals_missing",
+            "avif_queued",
+            "errors",
+            "elapsed",
+        ):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.error_messages.extend(other.error_messages)
+
+    @property
+    def images_per_second(self) -> float:
+        return self.images_scanned / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"scanned={self.images_scanned} rendered={self.files_rendered} "
+            f"created_files={self.variants_created} "
+            f"missing_originals={self.originals_missing} "
+            f"queued_avif={self.avif_queued} errors={self.errors} "
+            f"rate={self.images_per_second:.1f}/s"
+        )
+
+
+def render_missing_variants(original: str, names: tuple[str, ...]) -> int:
+    """
+    Render ``names`` from one read of ``original`` and upload them.
+    Runs in pool workers, so it only touches storage, never the database.
+    """
+    with default_storage.open(original, mode="rb") as f:
+        rendered = render_variants(f.read(), names)
+    for name, content in rendered.items():
+        profile = VARIANT_PROFILES[name]
+        upload_to_storage(
+            profile.key_for(original), content, content_type=profile.content_type
+        )
+    return len(rendered)
+
+
+class VariantBackfill:
+    """
+    Render missing eager variants, one organization chunk at a time.
+    Images are walked in (organization, id) order from a named checkpoint, so
+    an interrupted run resumes after the last finished chunk. A filtered run
+    keeps its own checkpoint (see checkpoint_name), so it never advances the
+    cursor of an unfiltered run under the same name. Each storage
+    directory is listed once per organization instead of probing every key
+    with ``exists``, and renders fan out to ``executor`` when one is given.
+    """
+
+    def __init__(
+        self,
+        *,
+        name: str = "default",
+        organization_id: int | None = None,
+        image_ids: Iterable[int] | None = None,
+        chunk_size: int = BACKFILL_CHUNK_SIZE,
+        executor: Executor | None = None,
+        dry_run: bool = False,
+        avif: bool = False,
+    ):
+        self.name = name
+        self.organization_id = organization_id
+        self.image_ids = list(image_ids) if image_ids else None
+        self.chunk_size = chunk_size
+        self.executor = executor
+        self.dry_run = dry_run
+        self.avif = avif and avif_variants_enabled()
+        self._checkpoint: VariantBackfillCheckpoint | None = None
+        self._listed_org: int | None = None
+        self._listed: dict[str, set[str]] = {}
+
+    @property
+    def checkpoint_name(self) -> str:
+        """``name``, qualified by the organization and image filters if any."""
+        name = self.name
+        if self.organization_id:
+            name = f"{name}@org{self.organization_id}"
+        if self.image_ids:
+            ids = ",".join(str(pk) for pk in sorted(set(self.image_ids)))
+            name = f"{name}@ids-{hashlib.sha256(ids.encode()).hexdigest()[:12]}"
+        return name
+
+    def checkpoint(self) -> VariantBackfillCheckpoint:
+        """The run's checkpoint; dry runs advance an unsaved copy only."""
+        if self._checkpoint is None:
+            checkpoint = VariantBackfillCheckpoint.objects.filter(
+                name=self.checkpoint_name
+            ).first()
+            if checkpoint is None:
+                checkpoint = VariantBackfillCheckpoint(name=self.checkpoint_name)
+                if not self.dry_run:
+                    checkpoint.save()
+            self._checkpoint = checkpoint
+        return self._checkpoint
+
+    def reset(self) -> None:
+        VariantBackfillCheckpoint.objects.filter(name=self.checkpoint_name).delete()
+        self._checkpoint = None
+
+    def start(self, *, restart: bool = False) -> VariantBackfillCheckpoint:
+        """Resume the named run, or start over if asked or if it had finished."""
+        checkpoint = self.checkpoint()
+        if restart or checkpoint.completed_at is not None:
+            self.reset()
+            checkpoint = self.checkpoint()
+        return checkpoint
+
+    def _next_chunk(self, checkpoint: VariantBackfillCheckpoint) -> list[Image]:
+        qs = Image.objects.all()
+        if self.organization_id:
+            qs = qs.filter(organization_id=self.organization_id)
+        if self.image_ids:
+            qs = qs.filter(id__in=self.image_ids)
+        if checkpoint.last_organization_id is not None:
+            qs = qs.filter(
+                Q(organization_id__gt=checkpoint.last_organization_id)
+                | Q(
+                    organization_id=checkpoint.last_organization_id,
+                    id__gt=checkpoint.last_image_id,
+                )
+            )
+        head = qs.order_by("organization_id", "id").only("organization_id").first()
+        if head is None:
+            return []
+        # A chunk never spans organizations, so one listing covers it.
+        return list(
+            qs.filter(organization_id=head.organization_id)
+            .order_by("id")
+            .only("id", "organization_id", "file", "variant_metadata")[
+                : self.chunk_size
+            ]
+        )
+
+    def _stored_keys(self, organization_id: int, prefix: str) -> set[str]:
+        if self._listed_org != organization_id:
+            self._listed_org = organization_id
+            self._listed = {}
+        if prefix not in self._listed:
+            self._listed[prefix] = set(list_storage_keys(prefix))
+        return self._listed[prefix]
+
+    def _missing_variants(
+        self, images: list[Image], stats: BackfillStats
+    ) -> dict[str, tuple[str, ...]]:
+        # Images sharing a blob share keys; render each original once.
+        missing: dict[str, tuple[str, ...]] = {}
+        seen: set[str] = set()
+        for image in images:
+            original = str(image.file)
+            if original in seen:
+                continue
+            seen.add(original)
+            stored = self._stored_keys(
+                image.organization_id, f"{os.path.dirname(original)}/"
+            )
+            if original not in stored:
+                stats.originals_missing += 1
+                continue
+            names = tuple(
+                name
+                for name in EAGER_VARIANTS
+                if VARIANT_PROFILES[name].key_for(original) not in stored
+            )
+            if names:
+                missing[original] = names
+        return missing
+
+    def _render_results(self, missing: dict[str, tuple[str, ...]]):
+        if self.executor is None:
+            for original, names in missing.items():
+                try:
+                    yield original, render_missing_variants(original, names)
+                except Exception as exc:
+                    yield original, exc
+            return
+        futures = {
+            original: self.executor.submit(render_missing_variants, original, names)
+            for original, names in missing.items()
+        }
+        for original, future in futures.items():
+            try:
+                yield original, future.result()
+            except Exception as exc:
+                yield original, exc
+
+    def _render(
+        self, missing: dict[str, tuple[str, ...]], stats: BackfillStats
+    ) -> None:
+        for original, result in self._render_results(missing):
+            if isinstance(result, Exception):
+                stats.errors += 1
+                stats.error_messages.append(f"{original}: {result}")
+                logger.error(
+                    "images:variant_backfill_failed file=%s error=%s", original, result
+                )
+                continue
+            stats.files_rendered += 1
+            stats.variants_created += result
+
+    def run_chunk(self) -> BackfillStats | None:
+        """Process the next chunk and advance the checkpoint; None when done."""
+        started = time.monotonic()
+        checkpoint = self.checkpoint()
+        images = self._next_chunk(checkpoint)
+        if not images:
+            if checkpoint.completed_at is None and not self.dry_run:
+                checkpoint.completed_at = timezone.now()
+                checkpoint.save(update_fields=["completed_at", "updated_at"])
+            return None
+
+        stats = BackfillStats(images_scanned=len(images))
+        missing = self._missing_variants(images, stats)
+        if self.dry_run:
+            stats.variants_created = sum(len(names) for names in missing.values())
+        else:
+            self._render(missing, stats)
+            if self.avif:
+                stats.avif_queued = self._queue_avif(images)
+        stats.elapsed = time.monotonic() - started
+
+        last = images[-1]
+        checkpoint.last_organization_id = last.organization_id
+        checkpoint.last_image_id = last.pk
+        checkpoint.images_scanned += stats.images_scanned
+        checkpoint.variants_created += stats.variants_created
+        checkpoint.errors += stats.errors
+        if not self.dry_run:
+            checkpoint.save()
+        logger.info(
+            "images:variant_backfill_chunk name=%s org=%s last_id=%s %s",
+            self.checkpoint_name,
+            last.organization_id,
+            last.pk,
+            stats.summary(),
+        )
+        return stats
+
+    def _queue_avif(self, images: list[Image]) -> int:
+        queued = 0
+        for image in images:
+            rendered = image.variant_metadata or {}
+            if any(
+                avif_metadata_key(name) not in rendered for name in AVIF_SIBLINGS
+            ) and request_avif_variants(image):
+                queued += 1
+        return queued
+
+
+def backfill_executor(workers: int) -> ProcessPoolExecutor | None:
+    """
+    A fork-based pool for ``workers`` > 1, or None to render inline.
+    Database connections are closed first so no child inherits a socket.
+    """
+    if workers <= 1:
+        return None
+    connections.close_all()
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("fork")
+    )
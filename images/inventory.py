@@ -0,0 +1,179 @@
+"""
+Sorted streams of referenced and stored media keys, merge-joined for audits.
+
+Both sides are produced in key (UTF-8 byte) order, so missing and
+unreferenced keys fall out of a single pass without per-key storage requests
+or a set of every referenced key. Derived keys are ``<base>_<suffix>`` for an
+original ``<base>.<ext>``; every key of a file sorting after ``F`` is at least
+``base(F)``, which is what lets the reference stream buffer only the keys of
+neighbouring files.
+"""
+
+import heapq
+import os
+from collections.abc import Callable, Iterable, Iterator
+from datetime import datetime
+from typing import NamedTuple, TypeVar
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Collate
+
+from contacts.models import Contact
+from core.utils.avatar import avatar_file_keys
+from core.utils.image import AVIF_SIBLINGS, VARIANT_PROFILES, avif_metadata_key
+from core.utils.storage import StoredObject
+from images.models import Image
+from images.serializers import pending_lazy_variants
+from images.services import image_storage_keys
+
+Row = TypeVar("Row")
+
+
+class ReferencedKey(NamedTuple):
+    key: str
+    # False for lazy variants and AVIF siblings that were never rendered: the
+    # key belongs to an image, but its absence is not an error.
+    expected: bool = True
+
+
+def _byte_ordered(field: str):
+    # PostgreSQL sorts text by locale unless told otherwise; S3 sorts bytes.
+    if connection.vendor == "postgresql":
+        return Collate(F(field), "C")
+    return F(field)
+
+
+def sorted_reference_keys(
+    files: Iterable[tuple[str, Row]],
+    keys_for: Callable[[str, Row], Iterable[ReferencedKey]],
+) -> Iterator[ReferencedKey]:
+    """
+    Expand files (in key order) into all their keys, in key order.
+    Keys shared by several rows are merged; a key is expected if any row
+    expects it.
+    """
+    heap: list[ReferencedKey] = []
+
+    def drain(watermark: str | None) -> Iterator[ReferencedKey]:
+        while heap and (watermark is None or heap[0].key < watermark):
+            yield heapq.heappop(heap)
+
+    def merged(keys: Iterator[ReferencedKey]) -> Iterator[ReferencedKey]:
+        current: ReferencedKey | None = None
+        for item in keys:
+            if current is not None and item.key == current.key:
+                current = ReferencedKey(item.key, current.expected or item.expected)
+                continue
+            if current is not None:
+                yield current
+            current = item
+        if current is not None:
+            yield current
+
+    def expanded() -> Iterator[ReferencedKey]:
+        for file_name, row in files:
+            yield from drain(os.path.splitext(file_name)[0])
+            for item in keys_for(file_name, row):
+                heapq.heappush(heap, item)
+        yield from drain(None)
+
+    return merged(expanded())
+
+
+def _image_keys(file_name: str, image: Image) -> list[ReferencedKey]:
+    rendered = image.variant_metadata or {}
+    unrendered = {
+        VARIANT_PROFILES[name].key_for(file_name)
+        for name in pending_lazy_variants(image)
+    } | {
+        profile.key_for(file_name)
+        for name, profile in AVIF_SIBLINGS.items()
+        if avif_metadata_key(name) not in rendered
+    }
+    return [
+        ReferencedKey(key, key not in unrendered) for key in image_storage_keys(image)
+    ]
+
+
+def image_reference_keys() -> Iterator[ReferencedKey]:
+    images = (
+        Image.objects.only("file", "variant_metadata")
+        .order_by(_byte_ordered("file"), "pk")
+        .iterator(chunk_size=2000)
+    )
+    return sorted_reference_keys(
+        ((str(image.file), image) for image in images), _image_keys
+    )
+
+
+def avatar_reference_keys() -> Iterator[ReferencedKey]:
+    def paths(queryset) -> Iterator[str]:
+        return (
+            queryset.exclude(avatar_path__isnull=True)
+            .exclude(avatar_path="")
+            .order_by(_byte_ordered("avatar_path"))
+            .values_list("avatar_path", flat=True)
+            .iterator(chunk_size=2000)
+        )
+
+    merged = heapq.merge(paths(get_user_model().objects), paths(Contact.objects))
+    return sorted_reference_keys(
+        ((path, None) for path in merged),
+        lambda path, _row: [ReferencedKey(key) for key in avatar_file_keys(path)],
+    )
+
+
+class AuditRow(NamedTuple):
+    key: str
+    missing: bool
+    stored: StoredObject | None = None
+
+
+def merge_join(
+    referenced: Iterable[ReferencedKey], stored: Iterable[StoredObject]
+) -> Iterator[AuditRow]:
+    """
+    Yield expected keys that are not stored (``missing``) and stored keys that
+    nothing references, from two streams sorted by key.
+    """
+    references = iter(referenced)
+    objects = iter(stored)
+    reference = next(references, None)
+    item = next(objects, None)
+    while reference is not None:
+        if item is not None and item.key < reference.key:
+            yield AuditRow(item.key, missing=False, stored=item)
+            item = next(objects, None)
+            continue
+        if item is not None and item.key == reference.key:
+            item = next(objects, None)
+        elif reference.expected:
+            yield AuditRow(reference.key, missing=True)
+        reference = next(references, None)
+    while item is not None:
+        yield AuditRow(item.key, missing=False, stored=item)
+        item = next(objects, None)
+
+
+def read_inventory(path: str) -> Iterator[StoredObject]:
+    """Stream a snapshot saved by ``write_inventory``."""
+    with open(path, encoding="utf-8") as snapshot:
+        for line in snapshot:
+            key, _, modified = line.rstrip("\n").partition("\t")
+            yield StoredObject(
+                key, datetime.fromisoformat(modified) if modified else None
+            )
+
+
+def write_inventory(path: str, stored: Iterable[StoredObject]):
+    """Pass ``stored`` through while saving it as a snapshot at ``path``."""
+    temporary = f"{path}.partial"
+    with open(temporary, "w", encoding="utf-8") as snapshot:
+        for item in stored:
+            modified = item.last_modified.isoformat() if item.last_modified else ""
+            snapshot.write(f"{item.key}\t{modified}\n")
+            yield item
+    # Only a complete listing replaces the previous snapshot.
+    os.replace(temporary, path)
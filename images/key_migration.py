@@ -0,0 +1,200 @@
+"""
+Move media written before content-hashed keys onto them.
+
+Each image original and its variants, and each avatar pair, is copied to a
+key carrying a digest of its content (hashed_media_key), stored with the
+immutable Cache-Control header, repointed in the database (dropping cached
+share-link resolutions) and its old keys queued for deletion in the same
+transaction. Rows are walked in key or id
+order in batches, so an interrupted run can simply be started again: keys
+that already carry a digest are skipped.
+"""
+
+import hashlib
+import logging
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from contacts.models import Contact
+from core.utils.avatar import avatar_file_keys
+from core.utils.storage import (
+    copy_storage_object,
+    enqueue_storage_deletions,
+    hashed_media_key,
+    is_hashed_media_key,
+    list_storage_keys,
+    public_storage_exists,
+    read_storage_object,
+)
+from images.models import Image, ImageBlob, ImageShareLink, purge_share_link_cache
+from images.services import original_storage_keys
+
+KEY_MIGRATION_BATCH_SIZE = 100
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class KeyMigrationStats:
+    originals_migrated: int = 0
+    avatars_migrated: int = 0
+    objects_copied: int = 0
+    missing: int = 0
+    errors: int = 0
+    error_messages: list[str] = field(default_factory=list)
+
+    def summary(self) -> str:
+        return (
+            f"originals={self.originals_migrated} avatars={self.avatars_migrated} "
+            f"copied_objects={self.objects_copied} missing={self.missing} "
+            f"errors={self.errors}"
+        )
+
+    def record_error(self, subject: str, exc: Exception) -> None:
+        self.errors += 1
+        self.error_messages.append(f"{subject}: {exc}")
+        logger.exception("images:key_migration_failed subject=%s", subject)
+
+
+def rehashed_key(key: str, content_hash: str) -> str:
+    """``dir/stem.ext`` as ``dir/stem.{digest}.ext``, keeping the stem."""
+    directory, _, name = key.rpartition("/")
+    stem, _, extension = name.rpartition(".")
+    return hashed_media_key(directory, content_hash, extension, stem=stem)
+
+
+def _unhashed_originals(batch_size: int) -> Iterator[list[str]]:
+    last = ""
+    while True:
+        batch = list(
+            Image.objects.filter(file__gt=last)
+            .order_by("file")
+            .values_list("file", flat=True)
+            .distinct()[:batch_size]
+        )
+        if not batch:
+            return
+        last = batch[-1]
+        yield [key for key in batch if not is_hashed_media_key(key)]
+
+
+def _original_content_hash(original: str) -> str:
+    content_hash = (
+        ImageBlob.objects.filter(file=original)
+        .values_list("content_hash", flat=True)
+        .first()
+    )
+    return content_hash or hashlib.sha256(read_storage_object(original)).hexdigest()
+
+
+def _migrate_original(original: str, stats: KeyMigrationStats, dry_run: bool):
+    stored = set(list_storage_keys(original.rpartition(".")[0]))
+    if original not in stored:
+        stats.missing += 1
+        return
+    new_original = rehashed_key(original, _original_content_hash(original))
+    moves = {
+        key: new_key
+        for key, new_key in zip(
+            original_storage_keys(original),
+            original_storage_keys(new_original),
+            strict=True,
+        )
+        if key in stored
+    }
+    if dry_run:
+        stats.originals_migrated += 1
+        stats.objects_copied += len(moves)
+        return
+    for key, new_key in moves.items():
+        copy_storage_object(key, new_key)
+    with transaction.atomic():
+        # Locking the blob keeps a concurrent dedup hit from reading the old key.
+        list(ImageBlob.objects.select_for_update().filter(file=original))
+        ImageBlob.objects.filter(file=original).update(file=new_original)
+        Image.objects.filter(file=original).update(file=new_original)
+        # Cached share-link resolutions still carry the old key.
+        purge_share_link_cache(
+            ImageShareLink.objects.filter(image__file=new_original).values_list(
+                "token_hash", flat=True
+            )
+        )
+        enqueue_storage_deletions(moves)
+    stats.originals_migrated += 1
+    stats.objects_copied += len(moves)
+
+
+def migrate_image_keys(
+    *, batch_size: int = KEY_MIGRATION_BATCH_SIZE, dry_run: bool = False
+) -> KeyMigrationStats:
+    """Move every image original (and the variants beside it) to hashed keys."""
+    stats = KeyMigrationStats()
+    for batch in _unhashed_originals(batch_size):
+        for original in batch:
+            try:
+                _migrate_original(original, stats, dry_run)
+            except Exception as exc:
+                stats.record_error(original, exc)
+    return stats
+
+
+def _migrate_avatar(model, pk, avatar_path: str, stats: KeyMigrationStats, dry_run):
+    small = read_storage_object(avatar_path, target="public")
+    new_path = rehashed_key(avatar_path, hashlib.sha256(small).hexdigest())
+    moves = {
+        key: new_key
+        for key, new_key in zip(
+            avatar_file_keys(avatar_path), avatar_file_keys(new_path), strict=True
+        )
+        if key == avatar_path or public_storage_exists(key)
+    }
+    if dry_run:
+        stats.avatars_migrated += 1
+        stats.objects_copied += len(moves)
+        return
+    for key, new_key in moves.items():
+        copy_storage_object(key, new_key, target="public")
+    with transaction.atomic():
+        # A concurrent avatar upload wins; the copies are then unreferenced.
+        updated = model.objects.filter(pk=pk, avatar_path=avatar_path).update(
+            avatar_path=new_path
+        )
+        enqueue_storage_deletions(
+            moves.keys() if updated else moves.values(), target="public"
+        )
+    if updated:
+        stats.avatars_migrated += 1
+        stats.objects_copied += len(moves)
+
+
+def migrate_avatar_keys(
+    *, batch_size: int = KEY_MIGRATION_BATCH_SIZE, dry_run: bool = False
+) -> KeyMigrationStats:
+    """Move every user and contact avatar pair to hashed keys."""
+    stats = KeyMigrationStats()
+    for model in (get_user_model(), Contact):
+        last_pk = None
+        while True:
+            queryset = (
+                model.objects.exclude(avatar_path__isnull=True)
+                .exclude(avatar_path="")
+                .order_by("pk")
+            )
+            if last_pk is not None:
+                queryset = queryset.filter(pk__gt=last_pk)
+            batch = list(queryset.values_list("pk", "avatar_path")[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            for pk, avatar_path in batch:
+                if not avatar_path or is_hashed_media_key(avatar_path):
+                    continue
+                try:
+                    _migrate_avatar(model, pk, avatar_path, stats, dry_run)
+                except FileNotFoundError:
+                    stats.missing += 1
+                except Exception as exc:
+                    stats.record_error(avatar_path, exc)
+    return stats
@@ -1,87 +1,121 @@
 from datetime import timedelta
 
-from django.contrib.auth import get_user_model
 from django.core.files.storage import default_storage
 from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from django.utils import timezone
 
-from contacts.models import Contact
-from core.utils.storage import public_storage_exists
-from images.models import Image
-from images.services import image_storage_keys
+from core.utils.storage import (
+    STORAGE_DELETION_BATCH_SIZE,
+    enqueue_storage_deletions,
+    list_storage_objects,
+    public_storage_options,
+)
+from images.inventory import (
+    avatar_reference_keys,
+    image_reference_keys,
+    merge_join,
+    read_inventory,
+    write_inventory,
+)
+from images.models import ImageBlob
 
-
-def walk_storage(prefix: str):
-    try:
-        directories, files = default_storage.listdir(prefix)
-    except FileNotFoundError, NotImplementedError:
-        return
-    for filename in files:
-        yield f"{prefix.rstrip('/')}/{filename}"
-    for directory in directories:
-        yield from walk_storage(f"{prefix.rstrip('/')}/{directory}")
+UNREFERENCED_PREFIX = "private/images/"
 
 
 class Command(BaseCommand):
-    help = "Audit private image records and objects; deletion is opt-in and age-gated."
+    help = (
+        "Audit private image records and objects against bucket listings; "
+        "deletion is opt-in and age-gated."
+    )
 
     def add_arguments(self, parser):
         parser.add_argument("--fail-on-missing", action="store_true")
         parser.add_argument("--delete-unreferenced", action="store_true")
         parser.add_argument("--minimum-age-hours", type=int, default=24)
+        parser.add_argument(
+            "--inventory",
+            help="Compare against a saved listing snapshot instead of listing "
+            "the private bucket; keys found missing are re-checked live",
+        )
+        parser.add_argument(
+            "--save-inventory",
+            help="Save the private bucket listing to this path for later runs",
+        )
 
     def handle(self, *args, **options):
-        referenced: set[str] = set()
-        missing: list[str] = []
-        for image in Image.objects.iterator():
-            keys = image_storage_keys(image)
-            referenced.update(keys)
-            for key in keys:
-                if not default_storage.exists(key):
-                    missing.append(key)
+        cutoff = timezone.now() - timedelta(hours=max(1, options["minimum_age_hours"]))
+        delete = options["delete_unreferenced"]
+        snapshot = options.get("inventory")
+        if snapshot:
+            stored = read_inventory(snapshot)
+        else:
+            stored = list_storage_objects("")
+            if options.get("save_inventory"):
+                stored = write_inventory(options["save_inventory"], stored)
 
-        avatar_paths = list(
-            get_user_model()
-            .objects.exclude(avatar_path__isnull=True)
-            .exclude(avatar_path="")
-            .values_list("avatar_path", flat=True)
-        ) + list(
-            Contact.objects.exclude(avatar_path__isnull=True)
-            .exclude(avatar_path="")
-            .values_list("avatar_path", flat=True)
+        orphan_blobs = list(
+            ImageBlob.objects.filter(images__isnull=True).values_list("pk", flat=True)
         )
-        for avatar_path in avatar_paths:
-            if not avatar_path:
-                continue
-            base = avatar_path.removesuffix(".webp")
-            for key in (avatar_path, f"{base}_lg.webp"):
-                if not public_storage_exists(key):
-                    missing.append(key)
+        if delete:
+            for blob_id in orphan_blobs:
+                with transaction.atomic():
+                    # Same lock as upload reuse, so a blob gaining an image
+                    # between the scan and here is kept.
+                    blob = (
+                        ImageBlob.objects.select_for_update()
+                        .filter(pk=blob_id, created_at__lte=cutoff)
+                        .first()
+                    )
+                    if blob is not None and not blob.images.exists():
+                        blob.delete()
 
-        stored = set(walk_storage("private/images") or ())
-        unreferenced = sorted(stored - referenced)
+        missing = 0
+        unreferenced = 0
+        expired: list[str] = []
         deleted = 0
-        if options["delete_unreferenced"]:
-            cutoff = timezone.now() - timedelta(
-                hours=max(1, options["minimum_age_hours"])
-            )
-            for key in unreferenced:
-                try:
-                    if default_storage.get_modified_time(key) > cutoff:
-                        continue
-                except NotImplementedError, OSError:
-                    self.stderr.write(f"Skipping {key}: storage age is unavailable")
+        for row in merge_join(image_reference_keys(), stored):
+            if row.missing:
+                # A snapshot predates objects written since it was taken.
+                if snapshot and default_storage.exists(row.key):
                     continue
-                default_storage.delete(key)
-                deleted += 1
+                missing += 1
+                self.stderr.write(f"missing: {row.key}")
+                continue
+            if not row.key.startswith(UNREFERENCED_PREFIX):
+                continue
+            unreferenced += 1
+            self.stdout.write(f"unreferenced: {row.key}")
+            if delete and self._is_expired(row, cutoff):
+                expired.append(row.key)
+                if len(expired) >= STORAGE_DELETION_BATCH_SIZE:
+                    enqueue_storage_deletions(expired)
+                    deleted += len(expired)
+                    expired = []
+        enqueue_storage_deletions(expired)
+        deleted += len(expired)
+
+        for row in merge_join(
+            avatar_reference_keys(),
+            list_storage_objects("", storage_options=public_storage_options()),
+        ):
+            if row.missing:
+                missing += 1
+                self.stderr.write(f"missing: {row.key}")
 
         self.stdout.write(
-            f"media audit: missing={len(missing)} unreferenced={len(unreferenced)} deleted={deleted}"
+            f"media audit: missing={missing} unreferenced={unreferenced} "
+            f"orphan_blobs={len(orphan_blobs)} deleted={deleted}"
         )
-        for key in missing:
-            self.stderr.write(f"missing: {key}")
-        for key in unreferenced:
-            self.stdout.write(f"unreferenced: {key}")
-
         if missing and options["fail_on_missing"]:
             raise CommandError("Referenced media objects are missing.")
+
+    def _is_expired(self, row, cutoff) -> bool:
+        modified = row.stored.last_modified
+        if modified is None:
+            try:
+                modified = default_storage.get_modified_time(row.key)
+            except NotImplementedError, OSError:
+                self.stderr.write(f"Skipping {row.key}: storage age is unavailable")
+                return False
+        return modified <= cutoff
@@ -0,0 +1,75 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from core.utils.image import perceptual_hash
+from images.models import Image
+from images.similarity import phash_fields
+
+
+class Command(BaseCommand):
+    help = "Compute missing perceptual hashes used by the similar-images search."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--org",
+            dest="org_id",
+            type=int,
+            help="Only process images for a specific organization id",
+        )
+        parser.add_argument(
+            "--limit", dest="limit", type=int, help="Limit number of images to process"
+        )
+        parser.add_argument(
+            "--dry-run",
+            dest="dry_run",
+            action="store_true",
+            help="Do not write hashes, only report",
+        )
+
+    def handle(self, *args, **options):
+        qs = Image.objects.filter(phash__isnull=True).order_by("id")
+        if options.get("org_id"):
+            qs = qs.filter(organization_id=options["org_id"])
+        if options.get("limit"):
+            qs = qs[: options["limit"]]
+
+        hashed = 0
+        skipped = 0
+        errors = 0
+        # Images sharing a blob share a hash; decode each stored file once.
+        hashes_by_file: dict[str, int | None] = {}
+        for img in qs.only("id", "file").iterator():
+            filename = str(img.file)
+            try:
+                if filename not in hashes_by_file:
+                    hashes_by_file[filename] = self._hash_stored_image(filename)
+                value = hashes_by_file[filename]
+                if value is None:
+                    skipped += 1
+                    self.stdout.write(
+                        self.style.WARNING(f"[skip] not decodable: id={img.id}")
+                    )
+                    continue
+                if not options.get("dry_run"):
+                    Image.objects.filter(pk=img.pk).update(**phash_fields(value))
+                hashed += 1
+            except Exception as e:
+                errors += 1
+                self.stderr.write(self.style.ERROR(f"[err] id={img.id}: {e}"))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Completed. hashed={hashed} skipped={skipped} errors={errors}"
+            )
+        )
+
+    def _hash_stored_image(self, filename: str) -> int | None:
+        # The thumbnail is what uploads hash, and it is far cheaper to decode.
+        base, _ext = os.path.splitext(filename)
+        for key in (f"{base}_thumb.webp", filename):
+            if default_storage.exists(key):
+                with default_storage.open(key, mode="rb") as f:
+                    return perceptual_hash(f.read())
+        return None
@@ -0,0 +1,93 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from PIL import Image as PilImage
+
+from core.utils.image import image_intrinsics
+from images.models import Image
+from images.serializers import build_variant_keys
+
+
+class Command(BaseCommand):
+    help = "Record missing dimensions, byte sizes, blurhash and dominant colour."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--org",
+            dest="org_id",
+            type=int,
+            help="Only process images for a specific organization id",
+        )
+        parser.add_argument(
+            "--limit", dest="limit", type=int, help="Limit number of files to process"
+        )
+        parser.add_argument(
+            "--dry-run",
+            dest="dry_run",
+            action="store_true",
+            help="Do not write metadata, only report",
+        )
+
+    def handle(self, *args, **options):
+        qs = Image.objects.filter(blurhash="")
+        if options.get("org_id"):
+            qs = qs.filter(organization_id=options["org_id"])
+        # Images sharing a blob share their file; read each stored set once.
+        filenames = qs.order_by("file").values_list("file", flat=True).distinct()
+        if options.get("limit"):
+            filenames = filenames[: options["limit"]]
+
+        updated = 0
+        skipped = 0
+        errors = 0
+        for filename in filenames.iterator():
+            try:
+                fields = self._stored_intrinsics(filename)
+                if not fields["blurhash"]:
+                    skipped += 1
+                    self.stdout.write(
+                        self.style.WARNING(f"[skip] not decodable: {filename}")
+                    )
+                    continue
+                if not options.get("dry_run"):
+                    updated += qs.filter(file=filename).update(**fields)
+                else:
+                    updated += qs.filter(file=filename).count()
+            except Exception as e:
+                errors += 1
+                self.stderr.write(self.style.ERROR(f"[err] {filename}: {e}"))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Completed. updated={updated} skipped={skipped} errors={errors}"
+            )
+        )
+
+    def _stored_intrinsics(self, filename: str) -> dict:
+        variants: dict[str, bytes] = {}
+        keys = build_variant_keys(filename).model_dump()
+        keys.pop("original")
+        for name, key in keys.items():
+            if default_storage.exists(key):
+                with default_storage.open(key, mode="rb") as f:
+                    variants[name] = f.read()
+        # Variants are small; the original only needs its header read.
+        fields = image_intrinsics(b"" if variants else self._read(filename), variants)
+        if variants and default_storage.exists(filename):
+            with default_storage.open(filename, mode="rb") as f:
+                with PilImage.open(f) as image:
+                    width, height = image.size
+            fields["variant_metadata"] = {
+                "original": {
+                    "width": width,
+                    "height": height,
+                    "bytes": default_storage.size(filename),
+                },
+                **fields["variant_metadata"],
+            }
+        return fields
+
+    def _read(self, filename: str) -> bytes:
+        if not default_storage.exists(filename):
+            return b""
+        with default_storage.open(filename, mode="rb") as f:
+            return f.read()
@@ -1,17 +1,19 @@
-import os
-import sys
+from django.core.management.base import BaseCommand, CommandError
 
-from django.core.files.storage import default_storage
-from django.core.management.base import BaseCommand
-from django.db.models import Q
-
-from core.utils.image import resize_images
-from core.utils.storage import upload_to_storage
-from images.models import Image
+from images.backfill import (
+    BACKFILL_CHUNK_SIZE,
+    BackfillStats,
+    VariantBackfill,
+    backfill_executor,
+)
+from images.tasks import backfill_image_variants_chunk
 
 
 class Command(BaseCommand):
-    help = "Generate and upload missing WebP variants (thumb, sm, md, lg) for images."
+    help = (
+        "Generate and upload missing eager variants (thumb, sm, md, lg) for images. "
+        "Runs resume from a named checkpoint."
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -28,104 +30,124 @@ class Command(BaseCommand):
             help="Explicit image IDs to process",
         )
         parser.add_argument(
-            "--limit", dest="limit", type=int, help="Limit number of images to process"
+            "--limit",
+            dest="limit",
+            type=int,
+            help="Stop after roughly this many images (whole chunks)",
         )
         parser.add_argument(
             "--dry-run",
             dest="dry_run",
             action="store_true",
-            help="Do not write variants, only report",
+            help="Do not write variants or the checkpoint, only report",
+        )
+        parser.add_argument(
+            "--avif",
+            dest="avif",
+            action="store_true",
+            help="Also queue missing AVIF siblings on the media queue",
+        )
+        parser.add_argument(
+            "--workers",
+            dest="workers",
+            type=int,
+            default=1,
+            help="Render in a pool of this many processes",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            dest="chunk_size",
+            type=int,
+            default=BACKFILL_CHUNK_SIZE,
+            help="Images per chunk; the checkpoint advances after each chunk",
+        )
+        parser.add_argument(
+            "--name",
+            dest="name",
+            default="default",
+            help=(
+                "Checkpoint name; runs with the same name and filters resume "
+                "each other"
+            ),
+        )
+        parser.add_argument(
+            "--restart",
+            dest="restart",
+            action="store_true",
+            help="Discard the checkpoint and start from the first image",
+        )
+        parser.add_argument(
+            "--celery",
+            dest="celery",
+            action="store_true",
+            help="Queue the run as chained chunk tasks on the media queue",
         )
         parser.add_argument(
             "--verbose", dest="verbose", action="store_true", help="Verbose output"
         )
 
     def handle(self, *args, **options):
-        org_id = options.get("org_id")
-        ids = options.get("ids")
-        limit = options.get("limit")
-        dry = options.get("dry_run")
-        verbose = options.get("verbose")
-
-        qs = Image.objects.all().order_by("id")
-        if org_id:
-            qs = qs.filter(organization_id=org_id)
-        if ids:
-            qs = qs.filter(id__in=ids)
-        if limit:
-            qs = qs[:limit]
-
-        total = qs.count()
-        processed = 0
-        created = 0
-        skipped = 0
-        errors = 0
-
-        self.stdout.write(f"Scanning {total} images...")
-
-        for img in qs.iterator():
-            try:
-                filename = str(img.file)
-                base, ext = os.path.splitext(filename)
-
-                # Check original exists
-                if not default_storage.exists(filename):
-                    skipped += 1
-                    if verbose:
-                        self.stdout.write(
-                            self.style.WARNING(
-                                f"[skip] original missing: id={img.id} file={filename}"
-                            )
-                        )
-                    continue
-
-                # Determine which variants are missing
-                targets = {
-                    "thumb": f"{base}_thumb.webp",
-                    "sm": f"{base}_sm.webp",
-                    "md": f"{base}_md.webp",
-                    "lg": f"{base}_lg.webp",
-                }
-                missing = {
-                    k: v for k, v in targets.items() if not default_storage.exists(v)
-                }
-                if not missing:
-                    skipped += 1
-                    if verbose:
-                        self.stdout.write(f"[ok] all variants exist: id={img.id}")
-                    continue
-
-                # Read original bytes
-                with default_storage.open(filename, mode="rb") as f:
-                    original_bytes = f.read()
-
-                # Generate all variants in-memory
-                variants_bytes = resize_images(original_bytes)
+        name = options["name"]
+        if options.get("celery"):
+            unsupported = [
+                flag
+                for flag, given in (
+                    ("--ids", options.get("ids")),
+                    ("--workers", options["workers"] != 1),
+                    ("--limit", options.get("limit") is not None),
+                    ("--dry-run", options["dry_run"]),
+                )
+                if given
+            ]
+            if unsupported:
+                raise CommandError(
+                    f"{', '.join(unsupported)} cannot be combined with --celery."
+                )
+            VariantBackfill(name=name, organization_id=options.get("org_id")).start(
+                restart=options["restart"]
+            )
+            backfill_image_variants_chunk.delay(
+                name, options.get("org_id"), options["chunk_size"], options["avif"]
+            )
+            self.stdout.write(self.style.SUCCESS(f"Queued variant backfill {name}."))
+            return
 
-                if dry:
+        executor = (
+            None if options.get("dry_run") else backfill_executor(options["workers"])
+        )
+        backfill = VariantBackfill(
+            name=name,
+            organization_id=options.get("org_id"),
+            image_ids=options.get("ids"),
+            chunk_size=options["chunk_size"],
+            executor=executor,
+            dry_run=options["dry_run"],
+            avif=options["avif"],
+        )
+        checkpoint = backfill.start(restart=options["restart"])
+        if checkpoint.last_organization_id is not None:
+            self.stdout.write(
+                f"Resuming {name} after org={checkpoint.last_organization_id} "
+                f"image={checkpoint.last_image_id}"
+            )
+        total = BackfillStats()
+        limit = options.get("limit")
+        try:
+            while limit is None or total.images_scanned < limit:
+                stats = backfill.run_chunk()
+                if stats is None:
+                    break
+                total.add(stats)
+                for message in stats.error_messages:
+                    self.stderr.write(self.style.ERROR(f"[err] {message}"))
+                if options.get("verbose") or options.get("dry_run"):
+                    checkpoint = backfill.checkpoint()
+                    prefix = "[dry] " if options.get("dry_run") else ""
                     self.stdout.write(
-                        self.style.NOTICE(
-                            f"[dry] would create {list(missing.keys())} for id={img.id}"
-                        )
+                        f"{prefix}image={checkpoint.last_image_id} {stats.summary()}"
                     )
-                else:
-                    for key in missing.keys():
-                        variant_key = targets[key]
-                        upload_to_storage(variant_key, variants_bytes[key])
-                        created += 1
-                    if verbose:
-                        self.stdout.write(
-                            self.style.SUCCESS(
-                                f"[done] created {list(missing.keys())} for id={img.id}"
-                            )
-                        )
-                processed += 1
-            except Exception as e:
-                errors += 1
-                self.stderr.write(self.style.ERROR(f"[err] id={img.id}: {e}"))
+        finally:
+            if executor is not None:
+                executor.shutdown()
 
-        self.stdout.write(
-            self.style.SUCCESS(
-                f"Completed. processed={processed} created_files={created} skipped={skipped} errors={errors}"
-            )
-        )
+        self.stdout.write(self.style.SUCCESS(f"Completed. {total.summary()}"))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from images.key_migration import (
+    KEY_MIGRATION_BATCH_SIZE,
+    migrate_avatar_keys,
+    migrate_image_keys,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy image originals, variants and avatars stored under legacy keys to "
+        "content-hashed keys with immutable caching, and queue the old keys for "
+        "deletion. Safe to re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--only",
+            dest="only",
+            choices=("images", "avatars"),
+            help="Only migrate image files or only avatars",
+        )
+        parser.add_argument(
+            "--batch-size",
+            dest="batch_size",
+            type=int,
+            default=KEY_MIGRATION_BATCH_SIZE,
+            help="Rows read per query",
+        )
+        parser.add_argument(
+            "--dry-run",
+            dest="dry_run",
+            action="store_true",
+            help="Do not copy objects or update rows, only report",
+        )
+
+    def handle(self, *args, **options):
+        kwargs = {"batch_size": options["batch_size"], "dry_run": options["dry_run"]}
+        runs = {"images": migrate_image_keys, "avatars": migrate_avatar_keys}
+        errors = 0
+        for name, migrate in runs.items():
+            if options.get("only") not in (None, name):
+                continue
+            stats = migrate(**kwargs)
+            errors += stats.errors
+            for message in stats.error_messages:
+                self.stderr.write(self.style.ERROR(f"[err] {message}"))
+            self.stdout.write(f"{name}: {stats.summary()}")
+        style = self.style.WARNING if errors else self.style.SUCCESS
+        self.stdout.write(style("Completed."))
@@ -0,0 +1,66 @@
+# Generated by Django 6.0.7 on 2026-10-19 02:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("images", "0002_image_upload_intents"),
+        ("organizations", "0005_shorten_index_names"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImageBlob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("content_hash", models.CharField(max_length=64)),
+                ("source_hash", models.CharField(max_length=64)),
+                ("file", models.CharField(max_length=255)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "organization",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="image_blobs",
+                        to="organizations.organization",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="image",
+            name="blob",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.RESTRICT,
+                related_name="images",
+                to="images.imageblob",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="imageblob",
+            index=models.Index(
+                fields=["organization", "source_hash"],
+                name="images_blob_org_source_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="imageblob",
+            constraint=models.UniqueConstraint(
+                fields=("organization", "content_hash"),
+                name="images_blob_org_content_uniq",
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.7 on 2026-10-19 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("images", "0004_image_perceptual_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="image",
+            name="blurhash",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.AddField(
+            model_name="image",
+            name="dominant_color",
+            field=models.CharField(blank=True, default="", max_length=7),
+        ),
+        migrations.AddField(
+            model_name="image",
+            name="variant_metadata",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.7 on 2026-10-19 03:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("images", "0005_image_intrinsic_metadata"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VariantBackfillCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=64, unique=True)),
+                ("last_organization_id", models.BigIntegerField(blank=True, null=True)),
+                ("last_image_id", models.BigIntegerField(default=0)),
+                ("images_scanned", models.PositiveBigIntegerField(default=0)),
+                ("variants_created", models.PositiveBigIntegerField(default=0)),
+                ("errors", models.PositiveBigIntegerField(default=0)),
+                ("started_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
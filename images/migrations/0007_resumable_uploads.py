@@ -0,0 +1,33 @@
+# Generated by Django 6.0.7 on 2026-10-19 03:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("images", "0006_variant_backfill_checkpoint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="imageuploadintent",
+            name="multipart_parts",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name="imageuploadintent",
+            name="multipart_upload_id",
+            field=models.CharField(blank=True, default="", max_length=512),
+        ),
+        migrations.AddField(
+            model_name="imageuploadintent",
+            name="upload_length",
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="imageuploadintent",
+            name="upload_offset",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
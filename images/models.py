@@ -1,9 +1,11 @@
 import hashlib
+import uuid
 
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
 from django.db.models import Q
 from django.utils import timezone
 
@@ -18,6 +20,37 @@ def image_upload_to(instance, filename):
     return generate_upload_filename("image", filename)
 
 
+class ImageBlob(models.Model):
+    """Stored original and variants shared by an org's identical uploads."""
+
+    organization = models.ForeignKey(
+        Organization, on_delete=models.CASCADE, related_name="image_blobs"
+    )
+    # SHA-256 of the normalized original; the dedup identity.
+    content_hash = models.CharField(max_length=64)
+    # SHA-256 of the uploaded bytes; lets exact re-uploads skip processing.
+    source_hash = models.CharField(max_length=64)
+    file = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=("organization", "content_hash"),
+                name="images_blob_org_content_uniq",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=("organization", "source_hash"),
+                name="images_blob_org_source_idx",
+            )
+        ]
+
+    def __str__(self):
+        return self.file
+
+
 class Image(models.Model):
     class Visibility(models.TextChoices):
         PRIVATE = "private", "Private"
@@ -42,6 +75,24 @@ class Image(models.Model):
         blank=True,
         related_name="uploaded_images",
     )
+    blob = models.ForeignKey(
+        ImageBlob,
+        on_delete=models.RESTRICT,
+        null=True,
+        blank=True,
+        related_name="images",
+    )
+    # 64-bit dHash stored signed, plus its four 16-bit chunks for
+    # multi-index Hamming search (see images.similarity).
+    phash = models.BigIntegerField(null=True, blank=True)
+    phash_0 = models.IntegerField(null=True, blank=True)
+    phash_1 = models.IntegerField(null=True, blank=True)
+    phash_2 = models.IntegerField(null=True, blank=True)
+    phash_3 = models.IntegerField(null=True, blank=True)
+    # {"original"|"thumb"|...: {"width", "height", "bytes"}} for layout.
+    variant_metadata = models.JSONField(default=dict, blank=True)
+    blurhash = models.CharField(max_length=64, blank=True, default="")
+    dominant_color = models.CharField(max_length=7, blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -53,7 +104,14 @@ class Image(models.Model):
             models.Index(
                 fields=("organization", "created_at"),
                 name="images_org_created_idx",
-            )
+            ),
+            *(
+                models.Index(
+                    fields=("organization", f"phash_{chunk}"),
+                    name=f"images_org_phash{chunk}_idx",
+                )
+                for chunk in range(4)
+            ),
         ]
 
     @property
@@ -101,6 +159,19 @@ def hash_share_token(token: str) -> str:
     return hashlib.sha256(token.encode("utf-8")).hexdigest()
 
 
+def share_link_cache_key(token_hash: str) -> str:
+    return f"images:share-link:{token_hash}"
+
+
+def purge_share_link_cache(token_hashes) -> None:
+    """Drop cached resolutions now and again after commit, past any refill."""
+    keys = [share_link_cache_key(token_hash) for token_hash in token_hashes]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
 class ImageShareLink(models.Model):
     image = models.ForeignKey(
         Image, on_delete=models.CASCADE, related_name="share_links"
@@ -134,6 +205,78 @@ class ImageShareLink(models.Model):
     def revoke(self):
         self.revoked_at = timezone.now()
         self.save(update_fields=["revoked_at"])
+        purge_share_link_cache([self.token_hash])
 
     def __str__(self):
         return f"Share link {self.pk} for image {self.image_id}"
+
+
+class ImageUploadIntent(models.Model):
+    """A direct-to-bucket upload awaiting server-side finalization."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSING = "processing", "Processing"
+        FINALIZED = "finalized", "Finalized"
+        FAILED = "failed", "Failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    organization = models.ForeignKey(
+        Organization, on_delete=models.CASCADE, related_name="image_upload_intents"
+    )
+    creator = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="image_upload_intents",
+    )
+    object_key = models.CharField(max_length=255, unique=True)
+    original_name = models.CharField(max_length=120, blank=True, default="")
+    content_type = models.CharField(max_length=100)
+    max_bytes = models.PositiveBigIntegerField()
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.PENDING
+    )
+    image = models.OneToOneField(
+        Image,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="upload_intent",
+    )
+    error_message = models.CharField(max_length=255, blank=True, default="")
+    # Set for resumable uploads, which arrive through the API in chunks.
+    upload_length = models.PositiveBigIntegerField(null=True, blank=True)
+    upload_offset = models.PositiveBigIntegerField(default=0)
+    multipart_upload_id = models.CharField(max_length=512, blank=True, default="")
+    multipart_parts = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    finalized_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=("expires_at",), name="img_upload_intent_exp_idx"),
+        ]
+
+    def __str__(self):
+        return f"Upload intent {self.pk} ({self.status})"
+
+
+class VariantBackfillCheckpoint(models.Model):
+    """Resume point of a variant backfill run; images up to the cursor are done."""
+
+    name = models.CharField(max_length=64, unique=True)
+    # Images are walked in (organization, id) order.
+    last_organization_id = models.BigIntegerField(null=True, blank=True)
+    last_image_id = models.BigIntegerField(default=0)
+    images_scanned = models.PositiveBigIntegerField(default=0)
+    variants_created = models.PositiveBigIntegerField(default=0)
+    errors = models.PositiveBigIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Variant backfill {self.name} at image {self.last_image_id}"
@@ -1,12 +1,22 @@
 from __future__ import annotations
 
+import logging
 from dataclasses import dataclass
 
 from django.contrib.contenttypes.models import ContentType
 from django.db import models, transaction
+from django.db.models import Count, Max, Q
 
 from images.models import Image, PolymorphicImageRelation
 
+logger = logging.getLogger(__name__)
+
+# Relations are ordered by sparse keys so a move can take the midpoint between
+# its neighbours without renumbering the rest of the gallery.
+ORDER_GAP = 1024
+# A move that leaves less room than this queues a background rebalance.
+ORDER_MIN_GAP = 8
+
 
 class ImageOperationError(ValueError):
     pass
@@ -20,6 +30,10 @@ class ImageOwnershipError(ImageOperationError):
     pass
 
 
+class ImageOrderConflictError(ImageOperationError):
+    pass
+
+
 @dataclass(frozen=True)
 class AttachImagesResult:
     relations: list[PolymorphicImageRelation]
@@ -59,6 +73,20 @@ def _images_in_request_order(
     return [images_by_id[image_id] for image_id in image_ids]
 
 
+def _lock_targets(targets: list[models.Model]) -> None:
+    if not targets:
+        return
+    # One query, in pk order, so overlapping multi-object attaches cannot
+    # deadlock against each other.
+    list(
+        targets[0]
+        ._meta.model._base_manager.select_for_update()
+        .filter(pk__in=[target.pk for target in targets])
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+
 @transaction.atomic
 def attach_images_to_object(
     *,
@@ -67,47 +95,83 @@ def attach_images_to_object(
     content_type: ContentType,
     image_ids: list[int],
 ) -> AttachImagesResult:
-    _lock_target(target)
-    existing_relations = _locked_relations(
+    return attach_images_to_objects(
+        organization_id=organization_id,
+        targets=[target],
         content_type=content_type,
-        object_id=target.pk,
-    )
+        image_ids=image_ids,
+    )[target.pk]
+
+
+@transaction.atomic
+def attach_images_to_objects(
+    *,
+    organization_id: int,
+    targets: list[models.Model],
+    content_type: ContentType,
+    image_ids: list[int],
+) -> dict[int, AttachImagesResult]:
+    """
+    Attach the same images to every target, keyed by target pk in the result.
+    Next order and cover presence come from one aggregate per call, and all new
+    relations are inserted with a single bulk_create; existing relations are
+    only loaded for the requested images.
+    """
+    _lock_targets(targets)
     images = _images_in_request_order(
         organization_id=organization_id,
         image_ids=image_ids,
     )
-
-    relation_by_image_id = {
-        relation.image_id: relation for relation in existing_relations
+    target_ids = [target.pk for target in targets]
+    # Target locks serialize writers, so the aggregate itself needs no lock.
+    stats = {
+        row["object_id"]: row
+        for row in PolymorphicImageRelation.objects.filter(
+            content_type=content_type, object_id__in=target_ids
+        )
+        .order_by()
+        .values("object_id")
+        .annotate(max_order=Max("order"), covers=Count("pk", filter=Q(is_cover=True)))
     }
-    has_cover = any(relation.is_cover for relation in existing_relations)
-    existing_orders = [
-        relation.order for relation in existing_relations if relation.order is not None
-    ]
-    next_order = max(existing_orders, default=-1) + 1
-    attached_image_ids: list[int] = []
-    result_relations: list[PolymorphicImageRelation] = []
-
-    for image in images:
-        relation = relation_by_image_id.get(image.pk)
-        if relation is None:
-            relation = PolymorphicImageRelation.objects.create(
-                image=image,
-                content_type=content_type,
-                object_id=target.pk,
-                order=next_order,
-                is_cover=not has_cover,
-            )
-            relation_by_image_id[image.pk] = relation
-            next_order += 1
-            has_cover = True
-            attached_image_ids.append(image.pk)
-        result_relations.append(relation)
-
-    return AttachImagesResult(
-        relations=result_relations,
-        attached_image_ids=attached_image_ids,
-    )
+    existing = {
+        (relation.object_id, relation.image_id): relation
+        for relation in PolymorphicImageRelation.objects.select_for_update(of=("self",))
+        .filter(
+            content_type=content_type,
+            object_id__in=target_ids,
+            image_id__in=[image.pk for image in images],
+        )
+        .select_related("image")
+    }
+
+    new_relations: list[PolymorphicImageRelation] = []
+    results: dict[int, AttachImagesResult] = {}
+    for target_id in dict.fromkeys(target_ids):
+        row = stats.get(target_id)
+        max_order = row["max_order"] if row else None
+        next_order = 0 if max_order is None else max_order + ORDER_GAP
+        has_cover = bool(row and row["covers"])
+        result = results[target_id] = AttachImagesResult(
+            relations=[], attached_image_ids=[]
+        )
+        for image in images:
+            relation = existing.get((target_id, image.pk))
+            if relation is None:
+                relation = PolymorphicImageRelation(
+                    image=image,
+                    content_type=content_type,
+                    object_id=target_id,
+                    order=next_order,
+                    is_cover=not has_cover,
+                )
+                existing[(target_id, image.pk)] = relation
+                new_relations.append(relation)
+                next_order += ORDER_GAP
+                has_cover = True
+                result.attached_image_ids.append(image.pk)
+            result.relations.append(relation)
+    PolymorphicImageRelation.objects.bulk_create(new_relations)
+    return results
 
 
 @transaction.atomic
@@ -170,7 +234,8 @@ def reorder_object_images(
         )
 
     order_updates: list[PolymorphicImageRelation] = []
-    for order, image_id in enumerate(image_ids):
+    for index, image_id in enumerate(image_ids):
+        order = index * ORDER_GAP
         relation = relation_by_image_id[image_id]
         if relation.order != order:
             relation.order = order
@@ -194,6 +259,137 @@ def reorder_object_images(
         )
 
 
+def _rebalance_relations(*, content_type: ContentType, object_id: int) -> int:
+    relations = list(
+        PolymorphicImageRelation.objects.filter(
+            content_type=content_type, object_id=object_id
+        )
+        .order_by("order", "pk")
+        .only("pk", "order")
+    )
+    updates = []
+    for index, relation in enumerate(relations):
+        if relation.order != index * ORDER_GAP:
+            relation.order = index * ORDER_GAP
+            updates.append(relation)
+    PolymorphicImageRelation.objects.bulk_update(updates, ["order"])
+    return len(updates)
+
+
+@transaction.atomic
+def rebalance_object_image_order(
+    *, target: models.Model, content_type: ContentType
+) -> int:
+    """Respace an object's order keys ORDER_GAP apart; returns rows changed."""
+    _lock_target(target)
+    return _rebalance_relations(content_type=content_type, object_id=target.pk)
+
+
+def _schedule_rebalance(content_type_id: int, object_id: int) -> None:
+    from images.tasks import rebalance_image_order
+
+    try:
+        rebalance_image_order.delay(content_type_id, object_id)
+    except Exception:
+        # Moves still work without it; an exhausted gap respaces inline.
+        logger.exception(
+            "images:rebalance_enqueue_failed ct=%s obj=%s", content_type_id, object_id
+        )
+
+
+def _neighbour_order(
+    anchor: PolymorphicImageRelation, *, moving_pk: int, after: bool
+) -> int | None:
+    if after:
+        adjacent = Q(order__gt=anchor.order) | Q(order=anchor.order, pk__gt=anchor.pk)
+        ordering: tuple[str, ...] = ("order", "pk")
+    else:
+        adjacent = Q(order__lt=anchor.order) | Q(order=anchor.order, pk__lt=anchor.pk)
+        ordering = ("-order", "-pk")
+    return (
+        PolymorphicImageRelation.objects.filter(
+            adjacent,
+            content_type_id=anchor.content_type_id,
+            object_id=anchor.object_id,
+        )
+        .exclude(pk=moving_pk)
+        .order_by(*ordering)
+        .values_list("order", flat=True)
+        .first()
+    )
+
+
+def _order_between(
+    anchor: PolymorphicImageRelation, *, moving_pk: int, after: bool
+) -> int | None:
+    if anchor.order is None:
+        return None
+    neighbour = _neighbour_order(anchor, moving_pk=moving_pk, after=after)
+    if neighbour is None:
+        return anchor.order + (ORDER_GAP if after else -ORDER_GAP)
+    low, high = sorted((anchor.order, neighbour))
+    if high - low < 2:
+        return None
+    return (low + high) // 2
+
+
+@transaction.atomic
+def move_object_image(
+    *,
+    organization_id: int,
+    target: models.Model,
+    content_type: ContentType,
+    image_id: int,
+    before_id: int | None = None,
+    after_id: int | None = None,
+) -> PolymorphicImageRelation:
+    """
+    Move one image directly before or after another attached image.
+    Only the moved row is written unless its neighbours' keys are exhausted,
+    in which case the object is respaced first. The cover is left unchanged.
+    """
+    anchor_id = after_id if before_id is None else before_id
+    if anchor_id is None or (before_id is not None and after_id is not None):
+        raise ImageOperationError("Provide exactly one of before_id or after_id")
+    if anchor_id == image_id:
+        raise ImageOperationError("An image cannot be moved relative to itself")
+    _lock_target(target)
+    relations = {
+        relation.image_id: relation
+        for relation in PolymorphicImageRelation.objects.filter(
+            content_type=content_type,
+            object_id=target.pk,
+            image_id__in=[image_id, anchor_id],
+        ).select_related("image")
+    }
+    moving = relations.get(image_id)
+    anchor = relations.get(anchor_id)
+    if moving is None or anchor is None:
+        raise ImageNotFoundError("Image is not attached to this object")
+    if {moving.image.organization_id, anchor.image.organization_id} != {
+        organization_id
+    }:
+        raise ImageOwnershipError(
+            "One or more images do not belong to this organization"
+        )
+
+    after = after_id is not None
+    order = _order_between(anchor, moving_pk=moving.pk, after=after)
+    if order is None:
+        _rebalance_relations(content_type=content_type, object_id=target.pk)
+        anchor.refresh_from_db(fields=["order"])
+        order = _order_between(anchor, moving_pk=moving.pk, after=after)
+        if order is None:
+            raise ImageOrderConflictError(
+                "Could not place the image; the gallery order changed, retry."
+            )
+    elif anchor.order is not None and abs(order - anchor.order) < ORDER_MIN_GAP:
+        transaction.on_commit(lambda: _schedule_rebalance(content_type.pk, target.pk))
+    moving.order = order
+    PolymorphicImageRelation.objects.filter(pk=moving.pk).update(order=order)
+    return moving
+
+
 @transaction.atomic
 def set_object_cover_image(
     *,
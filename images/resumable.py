@@ -0,0 +1,239 @@
+"""
+Resumable image uploads: a tus-style protocol over ImageUploadIntent.
+
+A client declares the total length up front and then appends chunks at the
+offset the server reports, so a dropped connection resumes from the last
+stored byte rather than from zero. With a private bucket the bytes go into an
+S3 multipart upload; parts must be at least 5 MiB, so a shorter remainder is
+parked in a sidecar object until enough arrives. Local storage spools chunks
+into the staged file directly. The completed object is finalized exactly like
+a presigned upload intent.
+"""
+
+import logging
+import os
+import uuid
+from datetime import timedelta
+
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from core.utils.image import sniff_image_header
+from core.utils.storage import enqueue_storage_deletions, private_bucket_client
+from core.utils.uploads import SNIFF_BYTES
+from images.models import ImageUploadIntent
+from images.services import UPLOAD_INTENT_PREFIX
+
+logger = logging.getLogger(__name__)
+
+# S3's minimum size for every multipart part but the last.
+MULTIPART_PART_BYTES = 5 * 1024 * 1024
+CHUNK_LOCK_SECONDS = 5 * 60
+
+
+class ResumableUploadConflict(Exception):
+    """The chunk does not continue the upload at its current offset."""
+
+
+class ResumableUploadExpired(Exception):
+    """The upload's window has passed; cleanup may be discarding its data."""
+
+
+def resumable_upload_ttl_seconds() -> int:
+    return int(getattr(settings, "RESUMABLE_UPLOAD_TTL_SECONDS", 24 * 60 * 60))
+
+
+def resumable_upload_expired(intent: ImageUploadIntent) -> bool:
+    """An unfinished upload whose window passed without a chunk arriving."""
+    return (
+        intent.status == ImageUploadIntent.Status.PENDING
+        and intent.expires_at <= timezone.now()
+    )
+
+
+def _tail_key(intent: ImageUploadIntent, offset: int) -> str:
+    # Keyed by the offset it is valid at, so a chunk whose offset update
+    # loses a race never replaces the tail a retry will read.
+    return f"{intent.object_key}.tail/{offset}"
+
+
+def create_resumable_upload(
+    organization,
+    *,
+    original_name: str,
+    content_type: str,
+    length: int,
+    creator_id=None,
+) -> ImageUploadIntent:
+    intent_id = uuid.uuid4()
+    object_key = f"{UPLOAD_INTENT_PREFIX}{organization.pk}/{intent_id}"
+    multipart_upload_id = ""
+    bucket = private_bucket_client()
+    if bucket is not None:
+        client, bucket_name = bucket
+        multipart_upload_id = client.create_multipart_upload(
+            Bucket=bucket_name, Key=object_key, ContentType=content_type
+        )["UploadId"]
+    return ImageUploadIntent.objects.create(
+        id=intent_id,
+        organization=organization,
+        creator_id=creator_id,
+        object_key=object_key,
+        original_name=original_name,
+        content_type=content_type,
+        max_bytes=length,
+        upload_length=length,
+        multipart_upload_id=multipart_upload_id,
+        expires_at=timezone.now() + timedelta(seconds=resumable_upload_ttl_seconds()),
+    )
+
+
+def _spool_chunk(intent: ImageUploadIntent, data: bytes) -> None:
+    path = default_storage.path(intent.object_key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "r+b" if os.path.exists(path) else "wb") as spool:
+        # Drop bytes a failed request wrote past the recorded offset.
+        spool.truncate(intent.upload_offset)
+        spool.seek(intent.upload_offset)
+        spool.write(data)
+
+
+def _upload_multipart_chunk(intent: ImageUploadIntent, data: bytes, *, final: bool):
+    bucket = private_bucket_client()
+    if bucket is None:
+        raise RuntimeError("Multipart uploads need the private bucket configured.")
+    client, bucket_name = bucket
+    parts = list(intent.multipart_parts)
+    committed = sum(part["Size"] for part in parts)
+    tail_bytes = intent.upload_offset - committed
+    buffer = data
+    if tail_bytes:
+        tail = client.get_object(
+            Bucket=bucket_name, Key=_tail_key(intent, intent.upload_offset)
+        )
+        buffer = tail["Body"].read()[:tail_bytes] + data
+    while len(buffer) >= MULTIPART_PART_BYTES or (final and buffer):
+        body, buffer = buffer[:MULTIPART_PART_BYTES], buffer[MULTIPART_PART_BYTES:]
+        part_number = len(parts) + 1
+        uploaded = client.upload_part(
+            Bucket=bucket_name,
+            Key=intent.object_key,
+            UploadId=intent.multipart_upload_id,
+            PartNumber=part_number,
+            Body=body,
+        )
+        parts.append(
+            {"PartNumber": part_number, "ETag": uploaded["ETag"], "Size": len(body)}
+        )
+    if final:
+        client.complete_multipart_upload(
+            Bucket=bucket_name,
+            Key=intent.object_key,
+            UploadId=intent.multipart_upload_id,
+            MultipartUpload={
+                "Parts": [
+                    {"PartNumber": part["PartNumber"], "ETag": part["ETag"]}
+                    for part in parts
+                ]
+            },
+        )
+    if buffer:
+        client.put_object(
+            Bucket=bucket_name,
+            Key=_tail_key(intent, intent.upload_offset + len(data)),
+            Body=buffer,
+        )
+    return parts
+
+
+def _delete_tail(intent: ImageUploadIntent, offset: int) -> None:
+    bucket = private_bucket_client()
+    if bucket is not None:
+        client, bucket_name = bucket
+        client.delete_object(Bucket=bucket_name, Key=_tail_key(intent, offset))
+
+
+def append_resumable_chunk(
+    intent: ImageUploadIntent, *, offset: int, data: bytes
+) -> ImageUploadIntent:
+    """
+    Store ``data`` at ``offset`` and advance the upload. The chunk that
+    completes the upload moves the intent to PROCESSING; the caller then
+    publishes its finalization.
+    """
+    if (
+        intent.upload_length is None
+        or intent.status != ImageUploadIntent.Status.PENDING
+    ):
+        raise ResumableUploadConflict("The upload is not accepting data.")
+    if resumable_upload_expired(intent):
+        raise ResumableUploadExpired("The upload has expired.")
+    if offset != intent.upload_offset:
+        raise ResumableUploadConflict("Upload-Offset does not match the upload.")
+    if offset + len(data) > intent.upload_length:
+        raise ResumableUploadConflict("The chunk extends past Upload-Length.")
+    final = offset + len(data) == intent.upload_length
+    if offset == 0:
+        sniff_image_header(data[:SNIFF_BYTES], complete=final)
+
+    lock_key = f"images:resumable:{intent.pk}"
+    if not cache.add(lock_key, 1, timeout=CHUNK_LOCK_SECONDS):
+        raise ResumableUploadConflict("Another request is writing to this upload.")
+    # Whichever tail the recorded offset does not point at afterwards.
+    unused_tail = offset + len(data)
+    try:
+        if intent.multipart_upload_id:
+            parts = _upload_multipart_chunk(intent, data, final=final)
+        else:
+            _spool_chunk(intent, data)
+            parts = []
+        now = timezone.now()
+        fields = {
+            "upload_offset": offset + len(data),
+            "multipart_parts": parts,
+            "expires_at": now + timedelta(seconds=resumable_upload_ttl_seconds()),
+        }
+        if final:
+            fields["status"] = ImageUploadIntent.Status.PROCESSING
+        updated = ImageUploadIntent.objects.filter(
+            pk=intent.pk,
+            status=ImageUploadIntent.Status.PENDING,
+            upload_offset=offset,
+            expires_at__gt=now,
+        ).update(**fields)
+        if updated:
+            unused_tail = offset
+    finally:
+        if intent.multipart_upload_id:
+            _delete_tail(intent, unused_tail)
+        cache.delete(lock_key)
+    if not updated:
+        raise ResumableUploadConflict("Upload-Offset does not match the upload.")
+    intent.refresh_from_db()
+    return intent
+
+
+def discard_resumable_staging(intent: ImageUploadIntent) -> None:
+    """Abort an unfinished multipart upload and drop its sidecar tail."""
+    if intent.upload_length is None:
+        return
+    bucket = private_bucket_client()
+    if bucket is not None and intent.multipart_upload_id:
+        client, bucket_name = bucket
+        try:
+            client.abort_multipart_upload(
+                Bucket=bucket_name,
+                Key=intent.object_key,
+                UploadId=intent.multipart_upload_id,
+            )
+        except ClientError:
+            # Already completed or aborted.
+            logger.info("images:multipart_abort_skipped intent=%s", intent.pk)
+    with transaction.atomic():
+        enqueue_storage_deletions(
+            [intent.object_key, _tail_key(intent, intent.upload_offset)]
+        )
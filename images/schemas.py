@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 
 from pydantic import BaseModel, ConfigDict, Field, field_serializer
 
@@ -36,6 +36,7 @@ class ImageVariants(BaseModel):
     sm: Optional[str] = None
     md: Optional[str] = None
     lg: Optional[str] = None
+    xl: Optional[str] = None
 
 
 class ImageSignedUrls(BaseModel):
@@ -52,14 +53,43 @@ class ImageSignedUrlsOut(BaseModel):
     urls: ImageSignedUrls
 
 
+class ImageSignedVariantsOut(BaseModel):
+    image_id: int
+    expires_at: str
+    urls: ImageVariants
+
+
+# Mirrors core.utils.image.VARIANT_PROFILES plus the original.
+ImageVariantName = Literal["original", "thumb", "sm", "md", "lg", "xl"]
+
+
+class BatchSignImagesIn(BaseModel):
+    image_ids: List[int] = Field(min_length=1, max_length=100)
+    variants: Optional[List[ImageVariantName]] = Field(default=None, min_length=1)
+    model_config = ConfigDict(extra="forbid")
+
+
+class ImageVariantMetadata(BaseModel):
+    width: int
+    height: int
+    bytes: int
+
+
 class ImageOut(BaseModel):
     id: int
     file: str
     visibility: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    variant_metadata: Optional[Dict[str, ImageVariantMetadata]] = None
+    blurhash: Optional[str] = None
+    dominant_color: Optional[str] = None
     url: Optional[str] = None
     public_url: Optional[str] = None
     variant_keys: Optional[ImageVariants] = None
     public_variant_urls: Optional[ImageVariants] = None
+    signed_urls: Optional[ImageVariants] = None
+    signed_urls_expires_at: Optional[str] = None
     description: Optional[str] = None
     alt_text: Optional[str] = None
     title: Optional[str] = None
@@ -83,6 +113,41 @@ class ImageOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class SpriteTileOut(BaseModel):
+    image_id: int
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+class SpriteSheetOut(BaseModel):
+    # Null when the page has no images.
+    url: Optional[str] = None
+    expires_at: Optional[str] = None
+    width: int = 0
+    height: int = 0
+    cell_width: int = 0
+    cell_height: int = 0
+    tiles: List[SpriteTileOut] = []
+
+
+class ImageCoverOut(BaseModel):
+    image_id: int
+    alt_text: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    blurhash: Optional[str] = None
+    dominant_color: Optional[str] = None
+    thumb_url: Optional[str] = None
+    expires_at: str
+
+
+class SimilarImageOut(BaseModel):
+    distance: int
+    image: ImageOut
+
+
 class PolymorphicImageRelationOut(BaseModel):
     id: int
     image: ImageOut
@@ -100,6 +165,19 @@ class BulkAttachOut(BaseModel):
     attached: List[int]
 
 
+class AttachToObjectsIn(BaseModel):
+    app_label: str
+    model: str
+    object_ids: List[int] = Field(min_length=1, max_length=100)
+    image_ids: List[int] = Field(min_length=1, max_length=500)
+    model_config = ConfigDict(extra="forbid")
+
+
+class ObjectAttachOut(BaseModel):
+    object_id: int
+    attached: List[int]
+
+
 class BulkDetachOut(BaseModel):
     detached: List[int]
 
@@ -126,3 +204,24 @@ class ImageShareOut(BaseModel):
     created_at: str
     expires_at: Optional[str] = None
     revoked_at: Optional[str] = None
+
+
+class CreateUploadIntentIn(BaseModel):
+    name: str = Field(default="image", min_length=1, max_length=120)
+    content_type: str = Field(min_length=1, max_length=100)
+    size: int = Field(gt=0)
+    model_config = ConfigDict(extra="forbid")
+
+
+class UploadIntentOut(BaseModel):
+    id: str
+    status: str
+    upload_url: Optional[str] = None
+    upload_fields: Optional[dict[str, str]] = None
+    max_bytes: int
+    expires_at: str
+    image: Optional[ImageOut] = None
+    error_message: str = ""
+    # Resumable uploads only: bytes received so far and the declared total.
+    upload_offset: Optional[int] = None
+    upload_length: Optional[int] = None
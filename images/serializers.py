@@ -1,21 +1,53 @@
-import os
-
+from core.utils.image import (
+    AVIF_SIBLINGS,
+    VARIANT_PROFILES,
+    accepts_avif,
+    avif_metadata_key,
+)
 from core.utils.storage import public_storage_url
 from images.models import Image, PolymorphicImageRelation
-from images.schemas import ImageOut, ImageVariants, PolymorphicImageRelationOut
+from images.schemas import (
+    ImageOut,
+    ImageSignedVariantsOut,
+    ImageVariants,
+    PolymorphicImageRelationOut,
+)
 
 
 def build_variant_keys(file_name: str) -> ImageVariants:
-    base, _ext = os.path.splitext(file_name)
     return ImageVariants(
         original=file_name,
-        thumb=f"{base}_thumb.webp",
-        sm=f"{base}_sm.webp",
-        md=f"{base}_md.webp",
-        lg=f"{base}_lg.webp",
+        **{
+            name: profile.key_for(file_name)
+            for name, profile in VARIANT_PROFILES.items()
+        },
     )
 
 
+def pending_lazy_variants(image: Image) -> set[str]:
+    """Lazy variants not rendered yet; rendered ones are in variant_metadata."""
+    rendered = image.variant_metadata or {}
+    return {
+        name
+        for name, profile in VARIANT_PROFILES.items()
+        if profile.lazy and name not in rendered
+    }
+
+
+def negotiated_variant_keys(
+    image: Image, file_name: str, accept: str | None
+) -> dict[str, str]:
+    """AVIF sibling keys to serve instead of WebP, for clients that accept it."""
+    if not accepts_avif(accept):
+        return {}
+    rendered = image.variant_metadata or {}
+    return {
+        name: profile.key_for(file_name)
+        for name, profile in AVIF_SIBLINGS.items()
+        if avif_metadata_key(name) in rendered
+    }
+
+
 def build_public_url(key: str) -> str | None:
     return public_storage_url(key)
 
@@ -31,27 +63,49 @@ def build_public_variant_urls(variant_keys: ImageVariants) -> ImageVariants | No
     return ImageVariants(**urls)
 
 
-def serialize_image(image: Image) -> ImageOut:
+def serialize_image(
+    image: Image,
+    signed_urls: ImageSignedVariantsOut | None = None,
+    *,
+    accept: str | None = None,
+) -> ImageOut:
     file_name = (
         image.file.name or str(image.file)
         if hasattr(image.file, "name")
         else str(image.file)
     )
-    variant_keys = build_variant_keys(file_name)
+    variant_keys = build_variant_keys(file_name).model_copy(
+        update=dict.fromkeys(pending_lazy_variants(image))
+    )
     public_variant_urls = (
-        build_public_variant_urls(variant_keys) if image.is_public else None
+        build_public_variant_urls(
+            variant_keys.model_copy(
+                update=negotiated_variant_keys(image, file_name, accept)
+            )
+        )
+        if image.is_public
+        else None
     )
+    variant_metadata = image.variant_metadata or None
+    original = (variant_metadata or {}).get("original") or {}
     return ImageOut.model_validate(
         {
             "id": image.id,
             "file": file_name,
             "visibility": image.visibility,
+            "width": original.get("width"),
+            "height": original.get("height"),
+            "variant_metadata": variant_metadata,
+            "blurhash": image.blurhash or None,
+            "dominant_color": image.dominant_color or None,
             "url": None,
             "public_url": public_variant_urls.original if public_variant_urls else None,
             "variant_keys": variant_keys.model_dump(),
             "public_variant_urls": (
                 public_variant_urls.model_dump() if public_variant_urls else None
             ),
+            "signed_urls": signed_urls.urls.model_dump() if signed_urls else None,
+            "signed_urls_expires_at": signed_urls.expires_at if signed_urls else None,
             "description": image.description,
             "alt_text": image.alt_text,
             "title": image.title,
@@ -65,11 +119,14 @@ def serialize_image(image: Image) -> ImageOut:
 
 def serialize_image_relation(
     relation: PolymorphicImageRelation,
+    signed_urls: ImageSignedVariantsOut | None = None,
+    *,
+    accept: str | None = None,
 ) -> PolymorphicImageRelationOut:
     return PolymorphicImageRelationOut.model_validate(
         {
             "id": relation.id,
-            "image": serialize_image(relation.image),
+            "image": serialize_image(relation.image, signed_urls, accept=accept),
             "content_type": relation.content_type.model,
             "object_id": relation.object_id,
             "is_cover": getattr(relation, "is_cover", False),
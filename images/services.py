@@ -1,25 +1,83 @@
+import hashlib
 import logging
 import mimetypes
-import os
 import uuid
-from datetime import timedelta
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Any
 
 from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.core.files.storage import default_storage
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import Count
 from django.utils import timezone
+from ninja.errors import Throttled
 
-from core.utils.image import InvalidImageContent, normalize_image_bytes, resize_images
+from core.utils.decode_budget import reserve_decode_budget
+from core.utils.image import (
+    AVIF_SIBLINGS,
+    EAGER_VARIANTS,
+    VARIANT_PROFILES,
+    InvalidImageContent,
+    avif_metadata_key,
+    avif_supported,
+    image_dimensions,
+    normalize_image_bytes,
+    render_upload,
+    render_variants,
+    stored_image_format,
+)
+from core.utils.image_pool import run_inline
 from core.utils.storage import (
     delete_storage_keys,
+    enqueue_storage_deletions,
     generate_private_presigned_storage_url,
+    generate_private_presigned_upload,
+    hashed_media_key,
+    media_cache_control,
     upload_to_storage,
 )
-from images.models import Image
-from images.schemas import ImageSignedUrls, ImageSignedUrlsOut
-from images.serializers import build_variant_keys
+from core.utils.upload_quota import charge_upload_quota, upload_pixels
+from images.models import (
+    Image,
+    ImageBlob,
+    ImageShareLink,
+    ImageUploadIntent,
+    PolymorphicImageRelation,
+    hash_share_token,
+    purge_share_link_cache,
+    share_link_cache_key,
+)
+from images.schemas import (
+    ImageCoverOut,
+    ImageSignedUrls,
+    ImageSignedUrlsOut,
+    ImageSignedVariantsOut,
+    ImageVariants,
+)
+from images.serializers import (
+    build_variant_keys,
+    negotiated_variant_keys,
+    pending_lazy_variants,
+)
+from images.similarity import PHASH_FIELDS, phash_fields
 
 DEFAULT_SIGNED_URL_TTL_SECONDS = 15 * 60
+DEFAULT_SIGNED_URL_CACHE_SECONDS = 5 * 60
+SIGNABLE_VARIANTS = ("original", *VARIANT_PROFILES)
+DEFAULT_SIGNED_VARIANTS = ("original", *EAGER_VARIANTS)
+LAZY_VARIANT_INFLIGHT_SECONDS = 10 * 60
+DEFAULT_SHARE_LINK_CACHE_SECONDS = 5 * 60
+DEFAULT_SHARE_LINK_NEGATIVE_CACHE_SECONDS = 30
+DEFAULT_UPLOAD_INTENT_TTL_SECONDS = 15 * 60
+UPLOAD_INTENT_PREFIX = "private/uploads/"
+# Long enough for one finalize; a claim left by a killed worker lapses in time
+# for the broker to redeliver the task.
+UPLOAD_INTENT_CLAIM_SECONDS = 5 * 60
+INTRINSIC_FIELDS = ("variant_metadata", "blurhash", "dominant_color")
 logger = logging.getLogger(__name__)
 
 
@@ -35,6 +93,43 @@ def signed_url_ttl_seconds() -> int:
     )
 
 
+def signed_url_cache_seconds() -> int:
+    return int(
+        getattr(
+            settings,
+            "IMAGE_SIGNED_URL_CACHE_SECONDS",
+            DEFAULT_SIGNED_URL_CACHE_SECONDS,
+        )
+    )
+
+
+def share_link_cache_seconds() -> int:
+    return max(
+        int(
+            getattr(
+                settings,
+                "IMAGE_SHARE_LINK_CACHE_SECONDS",
+                DEFAULT_SHARE_LINK_CACHE_SECONDS,
+            )
+        ),
+        0,
+    )
+
+
+def avif_variants_enabled() -> bool:
+    return bool(getattr(settings, "IMAGE_AVIF_VARIANTS", True)) and avif_supported()
+
+
+def upload_intent_ttl_seconds() -> int:
+    return int(
+        getattr(
+            settings,
+            "IMAGE_UPLOAD_INTENT_TTL_SECONDS",
+            DEFAULT_UPLOAD_INTENT_TTL_SECONDS,
+        )
+    )
+
+
 def image_variant_keys(image: Image) -> dict[str, str]:
     file_name = (
         image.file.name or str(image.file)
@@ -44,16 +139,84 @@ def image_variant_keys(image: Image) -> dict[str, str]:
     return build_variant_keys(file_name).model_dump()
 
 
+def _create_image_for_blob(
+    blob_filter: dict,
+    organization,
+    *,
+    original_name: str,
+    creator_id=None,
+) -> Image | None:
+    """Attach a new Image to an existing blob, or None if it has gone away."""
+    with transaction.atomic():
+        # Locking the blob serializes reuse with deletion of its last image.
+        blob = (
+            ImageBlob.objects.select_for_update()
+            .filter(organization=organization, **blob_filter)
+            .first()
+        )
+        if blob is None:
+            return None
+        sibling_fields = (
+            blob.images.filter(phash__isnull=False)
+            .values(*PHASH_FIELDS, *INTRINSIC_FIELDS)
+            .first()
+            or {}
+        )
+        return Image.objects.create(
+            file=blob.file,
+            blob=blob,
+            **sibling_fields,
+            organization=organization,
+            creator_id=creator_id,
+            title=original_name,
+            description="",
+            alt_text="",
+        )
+
+
 def upload_image_file(
     data: bytes,
     organization,
     *,
     original_name: str = "image",
     creator_id=None,
+    source_hash: str | None = None,
+    runner: Callable = run_inline,
 ) -> Image:
+    """
+    Store an uploaded image, reusing an identical blob in the organization.
+    An exact re-upload is matched on the source bytes and skips processing
+    entirely; a different file that normalizes to the same bytes skips the
+    storage writes. ``source_hash`` is the SHA-256 of ``data`` when the
+    caller already has it; ``runner`` executes the CPU-bound steps (the web
+    tier passes run_in_image_pool).
+    """
+    source_hash = source_hash or hashlib.sha256(data).hexdigest()
+    image = _create_image_for_blob(
+        {"source_hash": source_hash},
+        organization,
+        original_name=original_name,
+        creator_id=creator_id,
+    )
+    if image is not None:
+        return image
+
     try:
-        normalized = normalize_image_bytes(data)
-        variants_bytes = resize_images(normalized)
+        with reserve_decode_budget(data):
+            normalized = runner(normalize_image_bytes, data)
+            content_hash = hashlib.sha256(normalized).hexdigest()
+            image = _create_image_for_blob(
+                {"content_hash": content_hash},
+                organization,
+                original_name=original_name,
+                creator_id=creator_id,
+            )
+            if image is not None:
+                return image
+            rendered = runner(render_upload, normalized)
+            variants_bytes = rendered.variants
+            hash_fields = phash_fields(rendered.phash)
+            intrinsic_fields = rendered.intrinsics
     except InvalidImageContent:
         raise
     except Exception as exc:
@@ -61,25 +224,58 @@ def upload_image_file(
         raise ImageUploadFailed("Image processing failed.") from exc
 
     operation_id = uuid.uuid4()
-    filename = f"private/images/{organization.pk}/{operation_id}.webp"
-    base, _ext = os.path.splitext(filename)
+    extension, content_type = stored_image_format(normalized)
+    filename = hashed_media_key(
+        f"private/images/{organization.pk}",
+        content_hash,
+        extension,
+        stem=operation_id.hex,
+    )
     uploaded_keys: list[str] = []
     try:
-        upload_to_storage(filename, normalized, content_type="image/webp")
+        upload_to_storage(filename, normalized, content_type=content_type)
         uploaded_keys.append(filename)
-        for key, content in variants_bytes.items():
-            variant_key = f"{base}_{key}.webp"
-            upload_to_storage(variant_key, content, content_type="image/webp")
+        for name, content in variants_bytes.items():
+            profile = VARIANT_PROFILES[name]
+            variant_key = profile.key_for(filename)
+            upload_to_storage(variant_key, content, content_type=profile.content_type)
             uploaded_keys.append(variant_key)
         try:
-            return Image.objects.create(
-                file=filename,
-                organization=organization,
+            with transaction.atomic():
+                blob = ImageBlob.objects.create(
+                    organization=organization,
+                    content_hash=content_hash,
+                    source_hash=source_hash,
+                    file=filename,
+                )
+                created = Image.objects.create(
+                    file=filename,
+                    blob=blob,
+                    **hash_fields,
+                    **intrinsic_fields,
+                    organization=organization,
+                    creator_id=creator_id,
+                    title=original_name,
+                    description="",
+                    alt_text="",
+                )
+            if avif_variants_enabled():
+                # AVIF encodes are slow; keep them off the upload request.
+                transaction.on_commit(lambda: request_avif_variants(created))
+            return created
+        except IntegrityError:
+            # A concurrent identical upload won the blob; share its objects.
+            delete_storage_keys(uploaded_keys)
+            uploaded_keys = []
+            image = _create_image_for_blob(
+                {"content_hash": content_hash},
+                organization,
+                original_name=original_name,
                 creator_id=creator_id,
-                title=original_name,
-                description="",
-                alt_text="",
             )
+            if image is None:
+                raise
+            return image
         except Exception:
             delete_storage_keys(uploaded_keys)
             raise
@@ -93,27 +289,493 @@ def upload_image_file(
         raise ImageUploadFailed("Image upload failed.") from exc
 
 
+@dataclass(frozen=True)
+class PresignedUploadIntent:
+    intent: ImageUploadIntent
+    url: str
+    fields: dict[str, str]
+
+
+def create_upload_intent(
+    organization,
+    *,
+    original_name: str,
+    content_type: str,
+    max_bytes: int,
+    creator_id=None,
+) -> PresignedUploadIntent:
+    intent_id = uuid.uuid4()
+    object_key = f"{UPLOAD_INTENT_PREFIX}{organization.pk}/{intent_id}"
+    ttl = upload_intent_ttl_seconds()
+    presigned = generate_private_presigned_upload(
+        object_key,
+        content_type=content_type,
+        max_bytes=max_bytes,
+        expires_in=ttl,
+    )
+    intent = ImageUploadIntent.objects.create(
+        id=intent_id,
+        organization=organization,
+        creator_id=creator_id,
+        object_key=object_key,
+        original_name=original_name,
+        content_type=content_type,
+        max_bytes=max_bytes,
+        expires_at=timezone.now() + timedelta(seconds=ttl),
+    )
+    return PresignedUploadIntent(
+        intent=intent,
+        url=presigned["url"],
+        fields=dict(presigned["fields"]),
+    )
+
+
+def _read_upload_intent_object(intent: ImageUploadIntent) -> bytes:
+    if default_storage.size(intent.object_key) > intent.max_bytes:
+        raise InvalidImageContent("Image upload exceeds the configured size limit.")
+    with default_storage.open(intent.object_key, mode="rb") as staged:
+        data = staged.read(intent.max_bytes + 1)
+    if len(data) > intent.max_bytes:
+        raise InvalidImageContent("Image upload exceeds the configured size limit.")
+    return data
+
+
+def _complete_upload_intent(intent: ImageUploadIntent, **changes) -> None:
+    ImageUploadIntent.objects.filter(
+        pk=intent.pk, status=ImageUploadIntent.Status.PROCESSING
+    ).update(finalized_at=timezone.now(), **changes)
+
+
+def _charge_upload_intent_quota(intent: ImageUploadIntent, data: bytes) -> None:
+    """
+    Bytes were charged as declared when the intent was created; charge the
+    decoded pixels now, plus anything received beyond the declaration.
+    """
+    declared = (
+        intent.upload_length if intent.upload_length is not None else intent.max_bytes
+    )
+    charge_upload_quota(
+        user_id=intent.creator_id,
+        organization_id=intent.organization_id,
+        nbytes=max(0, len(data) - declared),
+        pixels=upload_pixels(data),
+    )
+
+
+def finalize_upload_intent(intent_id) -> ImageUploadIntent | None:
+    """Validate and process a staged upload into a regular image record."""
+    intent = (
+        ImageUploadIntent.objects.select_related("organization")
+        .filter(pk=intent_id)
+        .first()
+    )
+    if intent is None:
+        # Cleanup removed the intent before its task ran.
+        return None
+    if intent.status != ImageUploadIntent.Status.PROCESSING:
+        return intent
+    # Redelivered tasks must not process the same staged object twice.
+    claim_key = f"images:upload-intent:{intent.pk}"
+    if not cache.add(claim_key, 1, timeout=UPLOAD_INTENT_CLAIM_SECONDS):
+        return intent
+
+    try:
+        try:
+            data = _read_upload_intent_object(intent)
+            _charge_upload_intent_quota(intent, data)
+            image = upload_image_file(
+                data,
+                intent.organization,
+                original_name=intent.original_name or "image",
+                creator_id=intent.creator_id,
+            )
+        except InvalidImageContent as exc:
+            _complete_upload_intent(
+                intent,
+                status=ImageUploadIntent.Status.FAILED,
+                error_message=str(exc),
+            )
+        except Throttled as exc:
+            _complete_upload_intent(
+                intent,
+                status=ImageUploadIntent.Status.FAILED,
+                error_message=(
+                    f"Upload quota exceeded. Try again in {exc.wait} seconds."
+                ),
+            )
+        except ImageUploadFailed, OSError:
+            logger.exception("images:upload_intent_failed intent=%s", intent.pk)
+            _complete_upload_intent(
+                intent,
+                status=ImageUploadIntent.Status.FAILED,
+                error_message="Image upload failed.",
+            )
+        except Exception:
+            # Unexpected: report it to the client, then let the task fail loudly.
+            _complete_upload_intent(
+                intent,
+                status=ImageUploadIntent.Status.FAILED,
+                error_message="Image upload failed.",
+            )
+            raise
+        else:
+            _complete_upload_intent(
+                intent,
+                status=ImageUploadIntent.Status.FINALIZED,
+                image=image,
+            )
+
+        with transaction.atomic():
+            enqueue_storage_deletions([intent.object_key])
+    finally:
+        cache.delete(claim_key)
+    intent.refresh_from_db()
+    return intent
+
+
+@dataclass(frozen=True)
+class SignedStorageUrl:
+    url: str
+    expires_at: datetime
+
+
+def sign_storage_keys(
+    keys: Iterable[str],
+    *,
+    expires_in: int | None = None,
+) -> dict[str, SignedStorageUrl]:
+    """
+    Presign private storage keys, reusing URLs signed in the current window.
+    Every request inside one cache window gets byte-identical URLs, so
+    browsers can reuse cached images; each URL stays valid for at least
+    ``ttl - window`` seconds after it is handed out.
+    """
+    ttl = expires_in or signed_url_ttl_seconds()
+    window = min(signed_url_cache_seconds(), ttl)
+    now = timezone.now()
+    unique_keys = list(dict.fromkeys(key for key in keys if key))
+    cache_keys: dict[str, str] = {}
+    cached: dict[str, tuple[str, float]] = {}
+    if window > 0:
+        bucket = int(now.timestamp()) // window
+        cache_keys = {
+            key: f"images:signed-url:{ttl}:{bucket}:{key}" for key in unique_keys
+        }
+        hits = cache.get_many(list(cache_keys.values()))
+        cached = {
+            key: hits[cache_key]
+            for key, cache_key in cache_keys.items()
+            if cache_key in hits
+        }
+
+    expires_at = (now + timedelta(seconds=ttl)).timestamp()
+    fresh = {
+        key: (
+            generate_private_presigned_storage_url(
+                key,
+                expires_in=ttl,
+                content_type=mimetypes.guess_type(key)[0],
+                cache_control=media_cache_control(key) or f"private, max-age={ttl}",
+            ),
+            expires_at,
+        )
+        for key in unique_keys
+        if key not in cached
+    }
+    if fresh and window > 0:
+        cache.set_many(
+            {cache_keys[key]: value for key, value in fresh.items()},
+            timeout=max((bucket + 1) * window - int(now.timestamp()), 1),
+        )
+    return {
+        key: SignedStorageUrl(
+            url=url,
+            expires_at=datetime.fromtimestamp(expires_ts, tz=UTC),
+        )
+        for key, (url, expires_ts) in {**cached, **fresh}.items()
+    }
+
+
+def _lazy_variant_claim_key(image: Image, variant: str) -> str:
+    return f"images:lazy-variant:{image.file}:{variant}"
+
+
+def request_lazy_variant(image: Image, variant: str) -> bool:
+    """
+    Queue rendering of a lazy variant unless it is already in flight.
+    Images sharing a blob share the claim, so a popular file renders once.
+    """
+    from images.tasks import generate_image_variant
+
+    return _queue_variant_render(
+        _lazy_variant_claim_key(image, variant),
+        lambda: generate_image_variant.delay(image.pk, variant),
+        image=image,
+        variant=variant,
+    )
+
+
+def request_avif_variants(image: Image) -> bool:
+    """Queue rendering of the image's AVIF siblings unless already in flight."""
+    from images.tasks import generate_image_avif_variants
+
+    return _queue_variant_render(
+        _lazy_variant_claim_key(image, "avif"),
+        lambda: generate_image_avif_variants.delay(image.pk),
+        image=image,
+        variant="avif",
+    )
+
+
+def _queue_variant_render(
+    claim_key: str, enqueue: Callable[[], object], *, image: Image, variant: str
+) -> bool:
+    if not cache.add(claim_key, 1, timeout=LAZY_VARIANT_INFLIGHT_SECONDS):
+        return False
+    try:
+        enqueue()
+    except Exception:
+        cache.delete(claim_key)
+        logger.exception(
+            "images:lazy_variant_enqueue_failed image=%s variant=%s", image.pk, variant
+        )
+        return False
+    return True
+
+
+def _record_variant_metadata(original: str, rendered: dict[str, bytes]) -> None:
+    """Record rendered variants on every image sharing the ``original`` blob."""
+    entries = {}
+    for name, content in rendered.items():
+        size = image_dimensions(content) or (0, 0)
+        entries[name] = {"width": size[0], "height": size[1], "bytes": len(content)}
+    with transaction.atomic():
+        for sibling in (
+            Image.objects.select_for_update().filter(file=original).order_by("pk")
+        ):
+            sibling.variant_metadata = {**sibling.variant_metadata, **entries}
+            sibling.save(update_fields=["variant_metadata"])
+
+
+def generate_lazy_variant(image_id: int, variant: str) -> bool:
+    """Render and store a lazy variant, recording it on every image sharing it."""
+    profile = VARIANT_PROFILES[variant]
+    image = Image.objects.filter(pk=image_id).first()
+    if image is None or not profile.lazy:
+        return False
+    try:
+        if variant not in pending_lazy_variants(image):
+            return False
+        original = str(image.file)
+        key = profile.key_for(original)
+        with default_storage.open(original, mode="rb") as f:
+            content = render_variants(f.read(), (variant,))[variant]
+        # A retried task may find its own earlier upload; keep the key stable.
+        if not default_storage.exists(key):
+            upload_to_storage(key, content, content_type=profile.content_type)
+        _record_variant_metadata(original, {variant: content})
+        return True
+    finally:
+        cache.delete(_lazy_variant_claim_key(image, variant))
+
+
+def generate_avif_variants(image_id: int) -> list[str]:
+    """
+    Render and store the AVIF siblings an image does not have yet.
+    Returns the variant names rendered; they are served to clients whose
+    Accept header lists image/avif once recorded in ``variant_metadata``.
+    """
+    image = Image.objects.filter(pk=image_id).first()
+    if image is None or not avif_variants_enabled():
+        return []
+    try:
+        rendered = image.variant_metadata or {}
+        names = tuple(
+            name for name in AVIF_SIBLINGS if avif_metadata_key(name) not in rendered
+        )
+        if not names:
+            return []
+        original = str(image.file)
+        with default_storage.open(original, mode="rb") as f:
+            contents = render_variants(f.read(), names, AVIF_SIBLINGS)
+        for name, content in contents.items():
+            profile = AVIF_SIBLINGS[name]
+            key = profile.key_for(original)
+            if not default_storage.exists(key):
+                upload_to_storage(key, content, content_type=profile.content_type)
+        _record_variant_metadata(
+            original,
+            {avif_metadata_key(name): content for name, content in contents.items()},
+        )
+        return list(names)
+    finally:
+        cache.delete(_lazy_variant_claim_key(image, "avif"))
+
+
+def sign_images(
+    images: Iterable[Image],
+    *,
+    variants: Sequence[str] = DEFAULT_SIGNED_VARIANTS,
+    expires_in: int | None = None,
+    accept: str | None = None,
+) -> dict[int, ImageSignedVariantsOut]:
+    """
+    Sign the selected variants of many images with one cache round trip.
+    A lazy variant that is not rendered yet is queued and, meanwhile, signed
+    as its fallback variant. When ``accept`` lists image/avif, variants with
+    a rendered AVIF sibling are signed as the sibling.
+    """
+    variant_keys = {}
+    for image in images:
+        keys = image_variant_keys(image)
+        keys.update(negotiated_variant_keys(image, keys["original"], accept))
+        pending = pending_lazy_variants(image) & set(variants)
+        for variant in pending:
+            request_lazy_variant(image, variant)
+            fallback = VARIANT_PROFILES[variant].fallback
+            if fallback:
+                keys[variant] = keys[fallback]
+            else:
+                del keys[variant]
+        variant_keys[image.id] = {
+            variant: key for variant, key in keys.items() if variant in variants
+        }
+    signed = sign_storage_keys(
+        (key for keys in variant_keys.values() for key in keys.values()),
+        expires_in=expires_in,
+    )
+    results = {}
+    for image_id, keys in variant_keys.items():
+        urls = {variant: signed[key] for variant, key in keys.items()}
+        results[image_id] = ImageSignedVariantsOut(
+            image_id=image_id,
+            expires_at=min(url.expires_at for url in urls.values()).isoformat(),
+            urls=ImageVariants(**{variant: url.url for variant, url in urls.items()}),
+        )
+    return results
+
+
+def attach_image_summaries(objects: Sequence[Any]) -> None:
+    """
+    Set ``image_count`` and ``cover_image`` (with a signed thumb URL) on a
+    page of objects of one model: a grouped count and a cover lookup served
+    by ``uniq_primary_per_object``, whatever the page size.
+    """
+    if not objects:
+        return
+    content_type = ContentType.objects.get_for_model(objects[0])
+    object_ids = [obj.pk for obj in objects]
+    relations = PolymorphicImageRelation.objects.filter(
+        content_type=content_type, object_id__in=object_ids
+    )
+    counts = dict(
+        relations.order_by()
+        .values("object_id")
+        .annotate(count=Count("pk"))
+        .values_list("object_id", "count")
+    )
+    covers = {
+        relation.object_id: relation
+        for relation in relations.filter(is_cover=True).select_related("image")
+    }
+    signed = sign_images(
+        [relation.image for relation in covers.values()], variants=("thumb",)
+    )
+    for obj in objects:
+        obj.image_count = counts.get(obj.pk, 0)
+        relation = covers.get(obj.pk)
+        obj.cover_image = None
+        if relation is None:
+            continue
+        image = relation.image
+        original = (image.variant_metadata or {}).get("original") or {}
+        urls = signed[image.id]
+        obj.cover_image = ImageCoverOut(
+            image_id=image.id,
+            alt_text=relation.custom_alt_text or image.alt_text or None,
+            width=original.get("width"),
+            height=original.get("height"),
+            blurhash=image.blurhash or None,
+            dominant_color=image.dominant_color or None,
+            thumb_url=urls.urls.thumb,
+            expires_at=urls.expires_at,
+        )
+
+
+def resolve_share_link(token: str) -> Image | None:
+    """
+    The image an active share link points at, or None.
+    Resolutions are cached by token hash until the link expires (at most
+    IMAGE_SHARE_LINK_CACHE_SECONDS) and purged on revoke, image deletion or
+    key migration; unknown, expired and revoked tokens are cached briefly as
+    misses, so repeated or guessed tokens do not reach the database.
+    """
+    token_hash = hash_share_token(token)
+    cache_key = share_link_cache_key(token_hash)
+    now = timezone.now()
+    cached = cache.get(cache_key)
+    if cached is not None:
+        if not cached or (
+            cached["expires_at"] is not None and cached["expires_at"] <= now.timestamp()
+        ):
+            return None
+        return Image(
+            id=cached["image_id"],
+            file=cached["file"],
+            variant_metadata=cached["variant_metadata"],
+            organization_id=cached["organization_id"],
+        )
+
+    share_link = (
+        ImageShareLink.objects.select_related("image")
+        .filter(token_hash=token_hash)
+        .first()
+    )
+    if share_link is None or not share_link.is_active():
+        cache.set(
+            cache_key,
+            False,
+            timeout=int(
+                getattr(
+                    settings,
+                    "IMAGE_SHARE_LINK_NEGATIVE_CACHE_SECONDS",
+                    DEFAULT_SHARE_LINK_NEGATIVE_CACHE_SECONDS,
+                )
+            ),
+        )
+        return None
+    image = share_link.image
+    timeout = share_link_cache_seconds()
+    if share_link.expires_at is not None:
+        timeout = min(timeout, int((share_link.expires_at - now).total_seconds()))
+    if timeout > 0:
+        cache.set(
+            cache_key,
+            {
+                "image_id": image.id,
+                "file": str(image.file),
+                "variant_metadata": image.variant_metadata,
+                "organization_id": image.organization_id,
+                "expires_at": (
+                    share_link.expires_at.timestamp() if share_link.expires_at else None
+                ),
+            },
+            timeout=timeout,
+        )
+    return image
+
+
 def sign_image_variant_urls(
     image: Image,
     *,
     expires_in: int | None = None,
+    accept: str | None = None,
 ) -> ImageSignedUrlsOut:
-    ttl = expires_in or signed_url_ttl_seconds()
-    keys = image_variant_keys(image)
-    urls = {
-        variant: generate_private_presigned_storage_url(
-            key,
-            expires_in=ttl,
-            content_type=mimetypes.guess_type(key)[0],
-            cache_control=f"private, max-age={ttl}",
-        )
-        for variant, key in keys.items()
-    }
-    expires_at = timezone.now() + timedelta(seconds=ttl)
+    signed = sign_images([image], expires_in=expires_in, accept=accept)[image.id]
     return ImageSignedUrlsOut(
         image_id=image.id,
-        expires_at=expires_at.isoformat(),
-        urls=ImageSignedUrls(**urls),
+        expires_at=signed.expires_at,
+        urls=ImageSignedUrls(**signed.urls.model_dump()),
     )
 
 
@@ -123,25 +785,84 @@ def image_storage_keys(image: Image) -> list[str]:
         if hasattr(image.file, "name")
         else str(image.file)
     )
-    base, _ext = os.path.splitext(original)
+    return original_storage_keys(original)
+
+
+def original_storage_keys(original: str) -> list[str]:
+    """The original's key followed by every variant key derived from it."""
     return [
         original,
-        *(f"{base}_{suffix}.webp" for suffix in ("thumb", "sm", "md", "lg")),
+        *(profile.key_for(original) for profile in VARIANT_PROFILES.values()),
+        *(profile.key_for(original) for profile in AVIF_SIBLINGS.values()),
     ]
 
 
 def delete_image_record(image: Image) -> int:
+    """Delete an image; its objects go only when no other image shares them."""
     image_id = image.pk
     keys = image_storage_keys(image)
     with transaction.atomic():
+        purge_share_link_cache(
+            ImageShareLink.objects.filter(image_id=image_id).values_list(
+                "token_hash", flat=True
+            )
+        )
+        blob = (
+            ImageBlob.objects.select_for_update().filter(pk=image.blob_id).first()
+            if image.blob_id
+            else None
+        )
         image.delete()
+        if blob is not None:
+            if blob.images.exists():
+                keys = []
+            else:
+                blob.delete()
+        enqueue_storage_deletions(keys)
+    return image_id
 
-        def delete_objects() -> None:
-            for key in keys:
-                try:
-                    default_storage.delete(key)
-                except Exception:
-                    logger.exception("images:storage_delete_failed image=%s", image_id)
 
-        transaction.on_commit(delete_objects)
-    return image_id
+def delete_image_records(organization, image_ids: Iterable[int]) -> list[int]:
+    """
+    Delete an organization's images in one cascading query.
+    Returns the ids that existed and were deleted; their objects, minus those
+    still shared through a blob, are queued for deletion in the same
+    transaction.
+    """
+    with transaction.atomic():
+        images = list(
+            Image.objects.filter(organization=organization, id__in=set(image_ids))
+            .order_by("pk")
+            .only("id", "file", "blob_id")
+        )
+        if not images:
+            return []
+        blob_ids = {image.blob_id for image in images if image.blob_id}
+        # Same lock order as single deletes and uploads reusing a blob.
+        list(
+            ImageBlob.objects.select_for_update()
+            .filter(pk__in=blob_ids)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        deleted_ids = [image.id for image in images]
+        purge_share_link_cache(
+            ImageShareLink.objects.filter(image_id__in=deleted_ids).values_list(
+                "token_hash", flat=True
+            )
+        )
+        Image.objects.filter(id__in=deleted_ids).delete()
+
+        orphaned_blobs = set(
+            ImageBlob.objects.filter(pk__in=blob_ids, images__isnull=True).values_list(
+                "pk", flat=True
+            )
+        )
+        ImageBlob.objects.filter(pk__in=orphaned_blobs).delete()
+        enqueue_storage_deletions(
+            key
+            for image in images
+            if not image.blob_id or image.blob_id in orphaned_blobs
+            for key in image_storage_keys(image)
+        )
+    return deleted_ids
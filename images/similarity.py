@@ -0,0 +1,83 @@
+"""
+Near-duplicate search over 64-bit perceptual hashes.
+
+Multi-index hashing: the hash is split into four indexed 16-bit chunks. Two
+hashes within Hamming distance ``d`` must agree on at least one chunk to
+within ``d // 4`` bits, so a lookup only enumerates that small neighbourhood
+of each query chunk and verifies the candidates exactly.
+"""
+
+from itertools import combinations
+
+from django.db.models import Q
+
+from images.models import Image
+
+HASH_BITS = 64
+CHUNK_BITS = 16
+CHUNK_COUNT = HASH_BITS // CHUNK_BITS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+# Radius 10 enumerates at most 137 values per chunk; beyond that candidate
+# sets stop being selective on 64-bit hashes.
+MAX_SEARCH_DISTANCE = 10
+PHASH_FIELDS = ("phash", *(f"phash_{index}" for index in range(CHUNK_COUNT)))
+
+
+def hash_chunks(value: int) -> list[int]:
+    return [
+        (value >> (CHUNK_BITS * (CHUNK_COUNT - 1 - index))) & CHUNK_MASK
+        for index in range(CHUNK_COUNT)
+    ]
+
+
+def phash_fields(value: int | None) -> dict[str, int | None]:
+    """Model field values for an unsigned 64-bit hash (or None to clear)."""
+    if value is None:
+        return dict.fromkeys(PHASH_FIELDS)
+    signed = value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+    return dict(zip(PHASH_FIELDS, (signed, *hash_chunks(value)), strict=True))
+
+
+def unsigned_phash(value: int) -> int:
+    return value & ((1 << HASH_BITS) - 1)
+
+
+def chunk_neighbourhood(chunk: int, radius: int) -> list[int]:
+    values = [chunk]
+    for distance in range(1, radius + 1):
+        for bits in combinations(range(CHUNK_BITS), distance):
+            flipped = chunk
+            for bit in bits:
+                flipped ^= 1 << bit
+            values.append(flipped)
+    return values
+
+
+def find_similar_images(
+    image: Image, *, max_distance: int, limit: int
+) -> list[tuple[int, Image]]:
+    """Return ``(distance, image)`` pairs in the image's org, nearest first."""
+    if image.phash is None:
+        return []
+    max_distance = min(max_distance, MAX_SEARCH_DISTANCE)
+    target = unsigned_phash(image.phash)
+    radius = max_distance // CHUNK_COUNT
+    chunk_filter = Q()
+    for index, chunk in enumerate(hash_chunks(target)):
+        chunk_filter |= Q(**{f"phash_{index}__in": chunk_neighbourhood(chunk, radius)})
+
+    candidates = (
+        Image.objects.filter(organization_id=image.organization_id)
+        .filter(chunk_filter)
+        .exclude(pk=image.pk)
+        .values_list("pk", "phash")
+    )
+    # Rank on (pk, hash) pairs and only load the rows that are returned.
+    ranked = sorted(
+        (distance, pk)
+        for pk, phash in candidates.iterator()
+        if phash is not None
+        and (distance := (unsigned_phash(phash) ^ target).bit_count()) <= max_distance
+    )[:limit]
+    images = Image.objects.in_bulk([pk for _distance, pk in ranked])
+    return [(distance, images[pk]) for distance, pk in ranked if pk in images]
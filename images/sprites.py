@@ -0,0 +1,155 @@
+"""
+Thumbnail sprite sheets for gallery grids.
+
+A grid of N thumbnails otherwise costs N signed URLs and N fetches. A sheet
+packs the ``thumb`` variants of an ordered list of images into one WebP plus
+a manifest of per-image boxes. Both are stored under a key derived from the
+image ids and their ``updated_at``, so an unchanged page reuses the stored
+sheet and any edit, reorder or new image produces a new key; stale sheets
+are never served. The maintenance queue deletes sheets older than
+IMAGE_SPRITE_RETENTION_DAYS; a page still in use is rebuilt on its next
+request. Those deletes are synchronous rather than queued on the outbox: the
+keys are deterministic, so a queued delete could remove a rebuilt sheet.
+"""
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from core.utils.image import VARIANT_PROFILES, compose_sprite_sheet
+from core.utils.image_pool import run_in_image_pool
+from core.utils.storage import (
+    delete_storage_objects,
+    list_storage_objects,
+    upload_to_storage,
+)
+from images.models import Image
+from images.services import SignedStorageUrl, image_variant_keys, sign_storage_keys
+
+logger = logging.getLogger(__name__)
+
+SPRITE_PREFIX = "private/sprites/"
+SPRITE_COLUMNS = 10
+SPRITE_MAX_IMAGES = 200
+SPRITE_BUILD_CLAIM_SECONDS = 60
+
+
+@dataclass(frozen=True)
+class SpriteTile:
+    image_id: int
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+@dataclass(frozen=True)
+class SignedSpriteSheet:
+    url: SignedStorageUrl
+    width: int
+    height: int
+    cell_width: int
+    cell_height: int
+    tiles: list[SpriteTile]
+
+
+def sprite_key(organization_id: int, images: list[Image]) -> str:
+    digest = hashlib.sha256(b"image-sprite-v1\0")
+    for image in images:
+        digest.update(f"{image.pk}:{image.updated_at.isoformat()}\n".encode())
+    return f"{SPRITE_PREFIX}{organization_id}/{digest.hexdigest()}.webp"
+
+
+def _manifest_key(key: str) -> str:
+    return f"{key}.json"
+
+
+def _read_tile(image: Image) -> bytes | None:
+    try:
+        with default_storage.open(image_variant_keys(image)["thumb"], "rb") as tile:
+            return tile.read()
+    except OSError:
+        logger.warning("images:sprite_tile_missing image=%s", image.pk)
+        return None
+
+
+def _load_manifest(key: str) -> dict | None:
+    try:
+        with default_storage.open(_manifest_key(key), "rb") as stored:
+            return json.loads(stored.read())
+    except OSError, ValueError:
+        return None
+
+
+def _build_manifest(key: str, images: list[Image]) -> dict:
+    cell = VARIANT_PROFILES["thumb"].max_size
+    tiles = [_read_tile(image) for image in images]
+    sheet = run_in_image_pool(compose_sprite_sheet, tiles, cell, SPRITE_COLUMNS)
+    manifest = {
+        "width": sheet.width,
+        "height": sheet.height,
+        "cell": list(cell),
+        "tiles": [
+            [image.pk, *box]
+            for image, box in zip(images, sheet.boxes, strict=True)
+            if box is not None
+        ],
+    }
+    # Concurrent builders of the same page skip the write, not the response.
+    claim_key = f"images:sprite:{key}"
+    if cache.add(claim_key, 1, timeout=SPRITE_BUILD_CLAIM_SECONDS):
+        try:
+            # Local storage renames rather than overwrites an existing name.
+            if not default_storage.exists(key):
+                upload_to_storage(key, sheet.content, content_type="image/webp")
+            upload_to_storage(
+                _manifest_key(key),
+                json.dumps(manifest).encode(),
+                content_type="application/json",
+            )
+        finally:
+            cache.delete(claim_key)
+    logger.info(
+        "images:sprite_built key=%s images=%d bytes=%d",
+        key,
+        len(images),
+        len(sheet.content),
+    )
+    return manifest
+
+
+def sprite_sheet_for_images(
+    organization_id: int, images: list[Image]
+) -> SignedSpriteSheet:
+    """Sign the stored sheet for ``images``, building and storing it if needed."""
+    key = sprite_key(organization_id, images)
+    manifest = _load_manifest(key) or _build_manifest(key, images)
+    signed = sign_storage_keys([key])[key]
+    return SignedSpriteSheet(
+        url=signed,
+        width=manifest["width"],
+        height=manifest["height"],
+        cell_width=manifest["cell"][0],
+        cell_height=manifest["cell"][1],
+        tiles=[SpriteTile(*tile) for tile in manifest["tiles"]],
+    )
+
+
+def delete_stale_sprite_sheets(*, older_than: timedelta) -> int:
+    """Delete sheets (and manifests) stored before the cutoff; returns the count."""
+    cutoff = timezone.now() - older_than
+    stale = []
+    for stored in list_storage_objects(SPRITE_PREFIX):
+        modified = stored.last_modified or default_storage.get_modified_time(stored.key)
+        if modified < cutoff:
+            stale.append(stored.key)
+    failed = delete_storage_objects(stale)
+    for key, error in failed.items():
+        logger.warning("images:sprite_delete_failed key=%s error=%s", key, error)
+    return len(stale) - len(failed)
@@ -0,0 +1,113 @@
+import logging
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+from core.utils.storage import enqueue_storage_deletions
+from images.backfill import BACKFILL_CHUNK_SIZE, VariantBackfill
+from images.models import ImageUploadIntent
+from images.operations import rebalance_object_image_order
+from images.resumable import discard_resumable_staging
+from images.services import (
+    finalize_upload_intent,
+    generate_avif_variants,
+    generate_lazy_variant,
+)
+from images.sprites import delete_stale_sprite_sheets
+
+UPLOAD_INTENT_RETENTION = timedelta(hours=1)
+logger = logging.getLogger(__name__)
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def finalize_image_upload_intent(intent_id: str) -> str | None:
+    intent = finalize_upload_intent(intent_id)
+    return intent.status if intent is not None else None
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def cleanup_expired_upload_intents() -> int:
+    """
+    Delete intents (and any staged object) well past their upload window. A
+    resumable upload's window slides forward with every chunk, so this only
+    reaps ones the client abandoned.
+    """
+    cutoff = timezone.now() - UPLOAD_INTENT_RETENTION
+    removed = 0
+    for intent in ImageUploadIntent.objects.filter(expires_at__lte=cutoff).iterator():
+        with transaction.atomic():
+            if intent.status != ImageUploadIntent.Status.FINALIZED:
+                enqueue_storage_deletions([intent.object_key])
+                discard_resumable_staging(intent)
+            intent.delete()
+        removed += 1
+    return removed
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def cleanup_stale_sprite_sheets() -> int:
+    """Delete sprite sheets stored more than IMAGE_SPRITE_RETENTION_DAYS ago."""
+    days = int(getattr(settings, "IMAGE_SPRITE_RETENTION_DAYS", 7))
+    return delete_stale_sprite_sheets(older_than=timedelta(days=days))
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def rebalance_image_order(content_type_id: int, object_id: int) -> int:
+    """Respace an object's gallery order keys after moves used up a gap."""
+    content_type = ContentType.objects.get_for_id(content_type_id)
+    model_class = content_type.model_class()
+    if model_class is None:
+        return 0
+    target = model_class._base_manager.filter(pk=object_id).first()
+    if target is None:
+        return 0
+    return rebalance_object_image_order(target=target, content_type=content_type)
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def generate_image_variant(image_id: int, variant: str) -> bool:
+    return generate_lazy_variant(image_id, variant)
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def generate_image_avif_variants(image_id: int) -> list[str]:
+    return generate_avif_variants(image_id)
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def backfill_image_variants_chunk(
+    name: str = "default",
+    organization_id: int | None = None,
+    chunk_size: int = BACKFILL_CHUNK_SIZE,
+    avif: bool = False,
+) -> dict | None:
+    """
+    Backfill one chunk from the named checkpoint, then queue the next one.
+    Each chunk commits its checkpoint first, so a lost worker only repeats
+    the chunk it was on.
+    """
+    backfill = VariantBackfill(
+        name=name, organization_id=organization_id, chunk_size=chunk_size, avif=avif
+    )
+    stats = backfill.run_chunk()
+    if stats is None:
+        checkpoint = backfill.checkpoint()
+        logger.info(
+            "images:variant_backfill_done name=%s scanned=%s created_files=%s errors=%s",
+            name,
+            checkpoint.images_scanned,
+            checkpoint.variants_created,
+            checkpoint.errors,
+        )
+        return None
+    backfill_image_variants_chunk.delay(name, organization_id, chunk_size, avif)
+    return {
+        "images_scanned": stats.images_scanned,
+        "variants_created": stats.variants_created,
+        "errors": stats.errors,
+        "images_per_second": round(stats.images_per_second, 1),
+    }
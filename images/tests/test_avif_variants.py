@@ -0,0 +1,108 @@
+import io
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from PIL import Image as PilImage
+
+from accounts.tests.utils import create_test_user
+from core.utils.image import AVIF_SIBLINGS, VARIANT_PROFILES, avif_supported
+from images.models import Image
+from images.serializers import serialize_image
+from images.services import generate_avif_variants, sign_images, upload_image_file
+from organizations.models import Membership
+from organizations.tests.utils import create_test_group
+
+AVIF_ACCEPT = "image/avif,image/webp,*/*;q=0.8"
+
+pytestmark = pytest.mark.skipif(
+    not avif_supported(), reason="Pillow built without AVIF"
+)
+
+
+@pytest.fixture(autouse=True)
+def fake_presign(monkeypatch):
+    cache.clear()
+    monkeypatch.setattr(
+        "images.services.generate_private_presigned_storage_url",
+        lambda key, **kwargs: f"https://r2.example/{key}",
+    )
+
+
+def jpeg_bytes() -> bytes:
+    buffer = io.BytesIO()
+    PilImage.new("RGB", (1200, 800), (200, 120, 40)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+@pytest.mark.django_db
+def test_upload_queues_avif_siblings_after_commit(django_capture_on_commit_callbacks):
+    org = create_test_group(name="Avif Queue", slug="avif-queue")
+
+    with patch("images.tasks.generate_image_avif_variants.delay") as delay:
+        with django_capture_on_commit_callbacks(execute=True):
+            image = upload_image_file(jpeg_bytes(), org)
+        with django_capture_on_commit_callbacks(execute=True):
+            upload_image_file(jpeg_bytes(), org)
+
+    # The re-upload shares the blob, so the siblings are only rendered once.
+    delay.assert_called_once_with(image.pk)
+    assert "md.avif" not in image.variant_metadata
+
+
+@pytest.mark.django_db
+def test_avif_siblings_are_negotiated_once_rendered():
+    org = create_test_group(name="Avif Sign", slug="avif-sign")
+    image = upload_image_file(jpeg_bytes(), org)
+    sibling = upload_image_file(jpeg_bytes(), org)
+    md_webp = VARIANT_PROFILES["md"].key_for(str(image.file))
+    md_avif = AVIF_SIBLINGS["md"].key_for(str(image.file))
+
+    before = sign_images([image], variants=("md",), accept=AVIF_ACCEPT)[image.id]
+    assert before.urls.md == f"https://r2.example/{md_webp}"
+
+    assert generate_avif_variants(image.pk) == ["md", "lg"]
+    assert generate_avif_variants(image.pk) == []
+    assert default_storage.exists(md_avif)
+
+    sibling.refresh_from_db()
+    assert sibling.variant_metadata["md.avif"]["width"] == 1024
+    avif = sign_images([sibling], variants=("md", "sm"), accept=AVIF_ACCEPT)
+    webp = sign_images([sibling], variants=("md",), accept="image/webp,*/*")
+    assert avif[sibling.id].urls.md == f"https://r2.example/{md_avif}"
+    assert avif[sibling.id].urls.sm.endswith("_sm.webp")
+    assert webp[sibling.id].urls.md == f"https://r2.example/{md_webp}"
+
+
+@pytest.mark.django_db
+def test_public_urls_and_endpoints_vary_on_accept(
+    settings, api_client, make_auth_headers
+):
+    settings.IMAGE_PUBLIC_BASE_URL = "https://media.example.com/"
+    user = create_test_user(email="avif@example.com")
+    org = create_test_group(name="Avif Public", slug="avif-public")
+    Membership.objects.create(user=user, organization=org, role="member")
+    image = Image.objects.create(
+        file="public/images/a.webp",
+        organization=org,
+        visibility=Image.Visibility.PUBLIC,
+        variant_metadata={"lg.avif": {"width": 2048, "height": 1024, "bytes": 9}},
+    )
+
+    out = serialize_image(image, accept=AVIF_ACCEPT)
+    assert (
+        out.public_variant_urls.lg
+        == "https://media.example.com/public/images/a_lg.avif"
+    )
+    assert out.public_variant_urls.md.endswith("a_md.webp")
+    assert out.variant_keys.lg == "public/images/a_lg.webp"
+
+    response = api_client.get(
+        f"/orgs/{org.slug}/images/?sign=lg",
+        headers={**make_auth_headers(api_client, user), "Accept": AVIF_ACCEPT},
+    )
+    assert response.status_code == 200, response.content
+    assert "Accept" in response["Vary"]
+    item = response.json()["items"][0]
+    assert item["signed_urls"]["lg"] == "https://r2.example/public/images/a_lg.avif"
@@ -2,10 +2,14 @@ from unittest.mock import call, patch
 
 import pytest
 
-from images.models import Image
-from images.services import delete_image_record
+from core.utils.image import AVIF_SIBLINGS, VARIANT_PROFILES
+from images.models import Image, ImageBlob
+from images.services import delete_image_record, delete_image_records
 from organizations.tests.utils import create_test_group
 
+# The original plus every variant profile and AVIF sibling, rendered or not.
+KEYS_PER_IMAGE = 1 + len(VARIANT_PROFILES) + len(AVIF_SIBLINGS)
+
 
 @pytest.mark.django_db
 def test_delete_image_record_removes_database_row_and_all_storage_variants(
@@ -33,6 +37,84 @@ def test_delete_image_record_removes_database_row_and_all_storage_variants(
             call("private/images/delete/example_sm.webp"),
             call("private/images/delete/example_md.webp"),
             call("private/images/delete/example_lg.webp"),
+            call("private/images/delete/example_xl.webp"),
+            call("private/images/delete/example_md.avif"),
+            call("private/images/delete/example_lg.avif"),
         ],
         any_order=True,
     )
+
+
+@pytest.mark.django_db
+def test_shared_blob_objects_are_deleted_with_the_last_reference(
+    django_capture_on_commit_callbacks,
+):
+    organization = create_test_group(name="Shared", slug="shared-delete")
+    blob = ImageBlob.objects.create(
+        organization=organization,
+        content_hash="c" * 64,
+        source_hash="s" * 64,
+        file="private/images/shared/blob.webp",
+    )
+    first, second = (
+        Image.objects.create(file=blob.file, blob=blob, organization=organization)
+        for _ in range(2)
+    )
+
+    with (
+        patch("images.services.default_storage.delete") as delete,
+        django_capture_on_commit_callbacks(execute=True),
+    ):
+        delete_image_record(first)
+    delete.assert_not_called()
+    assert ImageBlob.objects.filter(pk=blob.pk).exists()
+
+    with (
+        patch("images.services.default_storage.delete") as delete,
+        django_capture_on_commit_callbacks(execute=True),
+    ):
+        delete_image_record(second)
+    assert delete.call_count == KEYS_PER_IMAGE
+    delete.assert_any_call("private/images/shared/blob_thumb.webp")
+    assert not ImageBlob.objects.filter(pk=blob.pk).exists()
+
+
+@pytest.mark.django_db
+def test_delete_image_records_batches_rows_and_storage_cleanup(
+    django_capture_on_commit_callbacks, django_assert_max_num_queries
+):
+    organization = create_test_group(name="Batch", slug="batch-delete")
+    other = create_test_group(name="Batch Other", slug="batch-delete-other")
+    blob = ImageBlob.objects.create(
+        organization=organization,
+        content_hash="b" * 64,
+        source_hash="b" * 64,
+        file="private/images/batch/shared.webp",
+    )
+    shared_kept = Image.objects.create(
+        file=blob.file, blob=blob, organization=organization
+    )
+    shared_deleted = Image.objects.create(
+        file=blob.file, blob=blob, organization=organization
+    )
+    plain = [
+        Image.objects.create(
+            file=f"private/images/batch/{index}.webp", organization=organization
+        )
+        for index in range(50)
+    ]
+    foreign = Image.objects.create(file="private/images/x.webp", organization=other)
+    requested = [shared_deleted.pk, foreign.pk, *(image.pk for image in plain)]
+
+    with (
+        patch("images.services.default_storage.delete") as delete,
+        django_capture_on_commit_callbacks(execute=True) as callbacks,
+        django_assert_max_num_queries(12),
+    ):
+        deleted = delete_image_records(organization, requested)
+
+    assert sorted(deleted) == sorted([shared_deleted.pk, *(i.pk for i in plain)])
+    assert len(callbacks) == 1
+    assert delete.call_count == 50 * KEYS_PER_IMAGE
+    assert Image.objects.filter(pk__in=[shared_kept.pk, foreign.pk]).count() == 2
+    assert ImageBlob.objects.filter(pk=blob.pk).exists()
@@ -0,0 +1,147 @@
+import pytest
+from django.contrib.contenttypes.models import ContentType
+
+from accounts.tests.utils import create_test_user
+from contacts.models import Contact
+from images.models import Image, PolymorphicImageRelation
+from images.operations import (
+    ORDER_GAP,
+    ImageOperationError,
+    ImageOrderConflictError,
+    attach_images_to_object,
+    move_object_image,
+)
+from organizations.models import Membership
+from organizations.tests.utils import create_test_group
+
+
+@pytest.fixture
+def gallery():
+    user = create_test_user(email="mover@example.com")
+    org = create_test_group(name="Moves", slug="moves")
+    Membership.objects.create(user=user, organization=org, role="member")
+    contact = Contact.objects.create(display_name="Gallery", organization=org)
+    content_type = ContentType.objects.get_for_model(contact)
+    images = [
+        Image.objects.create(file=f"private/images/{i}.webp", organization=org)
+        for i in range(4)
+    ]
+    attach_images_to_object(
+        organization_id=org.pk,
+        target=contact,
+        content_type=content_type,
+        image_ids=[image.pk for image in images],
+    )
+    return user, org, contact, content_type, [image.pk for image in images]
+
+
+def gallery_rows(contact, content_type):
+    return list(
+        PolymorphicImageRelation.objects.filter(
+            content_type=content_type, object_id=contact.pk
+        )
+        .order_by("order", "pk")
+        .values_list("image_id", "order")
+    )
+
+
+def move(org, contact, content_type, image_id, **anchor):
+    return move_object_image(
+        organization_id=org.pk,
+        target=contact,
+        content_type=content_type,
+        image_id=image_id,
+        **anchor,
+    )
+
+
+@pytest.mark.django_db
+def test_move_writes_only_the_moved_row(gallery, django_assert_max_num_queries):
+    _user, org, contact, content_type, (a, b, c, d) = gallery
+
+    with django_assert_max_num_queries(6):
+        relation = move(org, contact, content_type, d, before_id=b)
+
+    assert relation.order == ORDER_GAP // 2
+    assert gallery_rows(contact, content_type) == [
+        (a, 0),
+        (d, ORDER_GAP // 2),
+        (b, ORDER_GAP),
+        (c, 2 * ORDER_GAP),
+    ]
+
+    move(org, contact, content_type, a, after_id=c)
+    move(org, contact, content_type, c, before_id=d)
+    assert [row[0] for row in gallery_rows(contact, content_type)] == [c, d, b, a]
+
+
+@pytest.mark.django_db
+def test_exhausted_gap_respaces_the_gallery(
+    gallery, django_capture_on_commit_callbacks
+):
+    _user, org, contact, content_type, (a, b, c, d) = gallery
+    PolymorphicImageRelation.objects.filter(image_id=b).update(order=1)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        move(org, contact, content_type, c, after_id=a)
+
+    assert gallery_rows(contact, content_type) == [
+        (a, 0),
+        (c, ORDER_GAP // 2),
+        (b, ORDER_GAP),
+        (d, 3 * ORDER_GAP),
+    ]
+
+    # Repeated halving eventually queues a background rebalance.
+    with django_capture_on_commit_callbacks(execute=True):
+        for _ in range(8):
+            move(org, contact, content_type, d, after_id=a)
+            move(org, contact, content_type, c, after_id=a)
+    rows = gallery_rows(contact, content_type)
+    assert [row[0] for row in rows] == [a, c, d, b]
+    assert [row[1] for row in rows] == [i * ORDER_GAP for i in range(4)]
+
+
+@pytest.mark.django_db
+def test_move_without_room_after_respacing_is_a_conflict(gallery, monkeypatch):
+    _user, org, contact, content_type, (a, b, c, _d) = gallery
+    PolymorphicImageRelation.objects.filter(image_id=b).update(order=1)
+    monkeypatch.setattr("images.operations._rebalance_relations", lambda **kwargs: None)
+
+    with pytest.raises(ImageOrderConflictError):
+        move(org, contact, content_type, c, after_id=a)
+
+    assert PolymorphicImageRelation.objects.get(image_id=c).order == 2 * ORDER_GAP
+
+
+@pytest.mark.django_db
+def test_move_requires_exactly_one_attached_anchor(gallery):
+    _user, org, contact, content_type, (a, b, _c, _d) = gallery
+
+    with pytest.raises(ImageOperationError):
+        move(org, contact, content_type, a, before_id=b, after_id=b)
+    with pytest.raises(ImageOperationError):
+        move(org, contact, content_type, a)
+    with pytest.raises(ImageOperationError):
+        move(org, contact, content_type, a, after_id=a)
+
+
+@pytest.mark.django_db
+def test_move_endpoint(api_client, make_auth_headers, gallery):
+    user, org, contact, content_type, (a, b, c, d) = gallery
+    headers = make_auth_headers(api_client, user)
+    url = f"/orgs/{org.slug}/images/contacts/contact/{contact.pk}/move"
+
+    response = api_client.post(
+        url, json={"image_id": a, "after_id": d}, headers=headers
+    )
+    assert response.status_code == 200, response.content
+    assert response.json()["order"] == 4 * ORDER_GAP
+    assert [row[0] for row in gallery_rows(contact, content_type)] == [b, c, d, a]
+
+    response = api_client.post(
+        url, json={"image_id": a, "before_id": 999999}, headers=headers
+    )
+    assert response.status_code == 404
+    response = api_client.post(url, json={"image_id": a}, headers=headers)
+    assert response.status_code == 400
@@ -5,7 +5,7 @@ from django.db.models.query import QuerySet
 from accounts.models import User
 from contacts.models import Contact
 from images.models import Image, PolymorphicImageRelation
-from images.operations import attach_images_to_object
+from images.operations import ORDER_GAP, attach_images_to_object
 from organizations.tests.utils import create_test_group
 
 
@@ -43,3 +43,129 @@ def test_attach_operation_locks_existing_relations(monkeypatch):
 
     assert result.attached_image_ids == [image.pk]
     assert locked_relation_models == [PolymorphicImageRelation]
+
+
+@pytest.mark.django_db
+def test_attach_appends_after_existing_gallery_with_bulk_insert(
+    django_assert_max_num_queries,
+):
+    user = User.objects.create_user(email="image-gallery@example.com", password="pw")
+    organization = create_test_group(name="Gallery", slug="gallery", owner=user)
+    contact = Contact.objects.create(
+        display_name="Gallery", organization=organization, creator=user
+    )
+    content_type = ContentType.objects.get_for_model(contact)
+    existing = Image.objects.create(
+        file="private/images/a.webp", organization=organization
+    )
+    PolymorphicImageRelation.objects.create(
+        image=existing,
+        content_type=content_type,
+        object_id=contact.pk,
+        order=7,
+        is_cover=True,
+    )
+    new_images = [
+        Image.objects.create(file=f"private/images/{i}.webp", organization=organization)
+        for i in range(20)
+    ]
+
+    with django_assert_max_num_queries(10):
+        result = attach_images_to_object(
+            organization_id=organization.pk,
+            target=contact,
+            content_type=content_type,
+            image_ids=[existing.pk, *(image.pk for image in new_images)],
+        )
+
+    assert result.attached_image_ids == [image.pk for image in new_images]
+    assert [relation.image_id for relation in result.relations][0] == existing.pk
+    relations = PolymorphicImageRelation.objects.filter(
+        content_type=content_type, object_id=contact.pk
+    ).order_by("order")
+    assert [relation.order for relation in relations] == list(
+        range(7, 7 + 21 * ORDER_GAP, ORDER_GAP)
+    )
+    assert [relation.is_cover for relation in relations].count(True) == 1
+
+
+@pytest.mark.django_db
+def test_attach_to_many_objects_in_one_call(api_client, make_auth_headers):
+    user = User.objects.create_user(email="image-many@example.com", password="pw")
+    organization = create_test_group(name="Many", slug="many-targets", owner=user)
+    first, second = (
+        Contact.objects.create(
+            display_name=name,
+            slug=name.lower(),
+            organization=organization,
+            creator=user,
+        )
+        for name in ("First", "Second")
+    )
+    content_type = ContentType.objects.get_for_model(first)
+    shared = Image.objects.create(
+        file="private/images/s.webp", organization=organization
+    )
+    fresh = Image.objects.create(
+        file="private/images/f.webp", organization=organization
+    )
+    PolymorphicImageRelation.objects.create(
+        image=shared,
+        content_type=content_type,
+        object_id=first.pk,
+        order=0,
+        is_cover=True,
+    )
+
+    response = api_client.post(
+        f"/orgs/{organization.slug}/image-attachments/",
+        json={
+            "app_label": "contacts",
+            "model": "contact",
+            "object_ids": [first.pk, second.pk],
+            "image_ids": [shared.pk, fresh.pk],
+        },
+        headers=make_auth_headers(api_client, user, password="pw"),
+    )
+
+    assert response.status_code == 200, response.content
+    assert response.json() == [
+        {"object_id": first.pk, "attached": [fresh.pk]},
+        {"object_id": second.pk, "attached": [shared.pk, fresh.pk]},
+    ]
+    second_relations = PolymorphicImageRelation.objects.filter(
+        content_type=content_type, object_id=second.pk
+    ).order_by("order")
+    assert [(r.image_id, r.order, r.is_cover) for r in second_relations] == [
+        (shared.pk, 0, True),
+        (fresh.pk, ORDER_GAP, False),
+    ]
+    assert (
+        PolymorphicImageRelation.objects.get(object_id=first.pk, image=fresh).order
+        == ORDER_GAP
+    )
+
+
+@pytest.mark.django_db
+def test_attach_to_many_objects_rejects_foreign_objects(api_client, make_auth_headers):
+    user = User.objects.create_user(email="image-foreign@example.com", password="pw")
+    organization = create_test_group(name="Mine", slug="mine-targets", owner=user)
+    other = create_test_group(name="Theirs", slug="their-targets")
+    foreign = Contact.objects.create(display_name="Foreign", organization=other)
+    image = Image.objects.create(
+        file="private/images/m.webp", organization=organization
+    )
+
+    response = api_client.post(
+        f"/orgs/{organization.slug}/image-attachments/",
+        json={
+            "app_label": "contacts",
+            "model": "contact",
+            "object_ids": [foreign.pk],
+            "image_ids": [image.pk],
+        },
+        headers=make_auth_headers(api_client, user, password="pw"),
+    )
+
+    assert response.status_code == 404
+    assert not PolymorphicImageRelation.objects.exists()
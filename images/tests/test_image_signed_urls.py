@@ -4,6 +4,7 @@ from django.test import Client
 from django.utils import timezone
 
 from images.models import Image, ImageShareLink, hash_share_token
+from images.services import delete_image_record
 from organizations.models import Membership, Organization
 from organizations.tests.utils import create_test_group
 
@@ -171,3 +172,164 @@ def test_expired_share_link_cannot_get_signed_urls(monkeypatch):
     )
 
     assert response.status_code == 404
+
+
+def _signed_url_member(email, slug):
+    User = get_user_model()
+    user = User.objects.create_user(email=email, password="pw", email_verified=True)
+    org = Organization.objects.create(name=slug, slug=slug)
+    Membership.objects.create(user=user, organization=org, role="member")
+    return org, {"HTTP_AUTHORIZATION": f"Bearer {get_access_token(email, 'pw')}"}
+
+
+@pytest.fixture
+def presign_calls(monkeypatch):
+    calls = []
+
+    def fake_presign(key, **kwargs):
+        calls.append(key)
+        return f"https://r2.example/{key}?sig={len(calls)}"
+
+    monkeypatch.setattr(
+        "images.services.generate_private_presigned_storage_url", fake_presign
+    )
+    return calls
+
+
+@pytest.mark.django_db
+def test_batch_sign_returns_selected_variants_for_org_images(presign_calls):
+    org, headers = _signed_url_member("batch@example.com", "batch-sign")
+    other = create_test_group(name="Other", slug="batch-other")
+    first = Image.objects.create(file="images/first.jpg", organization=org)
+    second = Image.objects.create(file="images/second.jpg", organization=org)
+    foreign = Image.objects.create(file="images/foreign.jpg", organization=other)
+
+    response = Client().post(
+        f"/api/v1/orgs/{org.slug}/image-urls/",
+        data={
+            "image_ids": [second.id, foreign.id, first.id],
+            "variants": ["thumb", "sm"],
+        },
+        content_type="application/json",
+        **headers,
+    )
+
+    assert response.status_code == 200, response.content
+    data = response.json()
+    assert [item["image_id"] for item in data] == [second.id, first.id]
+    assert data[0]["urls"]["thumb"].startswith(
+        "https://r2.example/images/second_thumb.webp"
+    )
+    assert data[0]["urls"]["original"] is None
+    assert sorted(presign_calls) == [
+        "images/first_sm.webp",
+        "images/first_thumb.webp",
+        "images/second_sm.webp",
+        "images/second_thumb.webp",
+    ]
+
+
+@pytest.mark.django_db
+def test_repeated_signing_reuses_cached_urls(presign_calls):
+    org, headers = _signed_url_member("reuse@example.com", "reuse-sign")
+    image = Image.objects.create(file="images/reuse.jpg", organization=org)
+    client = Client()
+
+    first = client.get(f"/api/v1/orgs/{org.slug}/images/{image.id}/urls", **headers)
+    second = client.get(f"/api/v1/orgs/{org.slug}/images/{image.id}/urls", **headers)
+
+    assert first.status_code == 200, first.content
+    assert first.json() == second.json()
+    assert len(presign_calls) == 5
+
+
+@pytest.mark.django_db
+def test_signing_cache_can_be_disabled(presign_calls, settings):
+    settings.IMAGE_SIGNED_URL_CACHE_SECONDS = 0
+    org, headers = _signed_url_member("nocache@example.com", "nocache-sign")
+    image = Image.objects.create(file="images/nocache.jpg", organization=org)
+    client = Client()
+
+    client.get(f"/api/v1/orgs/{org.slug}/images/{image.id}/urls", **headers)
+    client.get(f"/api/v1/orgs/{org.slug}/images/{image.id}/urls", **headers)
+
+    assert len(presign_calls) == 10
+
+
+@pytest.mark.django_db
+def test_image_list_signs_only_the_requested_page(presign_calls):
+    org, headers = _signed_url_member("inline@example.com", "inline-sign")
+    for name in ("a", "b", "c"):
+        Image.objects.create(file=f"images/{name}.jpg", organization=org, title=name)
+
+    response = Client().get(
+        f"/api/v1/orgs/{org.slug}/images/?ordering=title&limit=2&sign=thumb,sm",
+        **headers,
+    )
+
+    assert response.status_code == 200, response.content
+    data = response.json()
+    assert data["count"] == 3
+    assert [item["title"] for item in data["items"]] == ["a", "b"]
+    assert data["items"][0]["signed_urls"]["thumb"].startswith(
+        "https://r2.example/images/a_thumb.webp"
+    )
+    assert data["items"][0]["signed_urls"]["lg"] is None
+    assert data["items"][0]["signed_urls_expires_at"]
+    assert len(presign_calls) == 4
+
+
+@pytest.mark.django_db
+def test_image_list_rejects_unknown_sign_variants(presign_calls):
+    org, headers = _signed_url_member("badsign@example.com", "bad-sign")
+
+    response = Client().get(
+        f"/api/v1/orgs/{org.slug}/images/?sign=thumb,huge", **headers
+    )
+
+    assert response.status_code == 400
+    assert presign_calls == []
+
+
+@pytest.mark.django_db
+def test_share_link_resolution_is_cached_and_purged(
+    presign_calls, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    org = create_test_group(name="Cached Share", slug="cached-share")
+    image = Image.objects.create(file="images/cached-share.jpg", organization=org)
+    share_link = ImageShareLink.objects.create(
+        image=image,
+        token_hash=hash_share_token("cached-share-token-value"),
+        expires_at=timezone.now() + timezone.timedelta(hours=1),
+    )
+    client = Client()
+
+    def resolve(token="cached-share-token-value"):
+        return client.post(
+            "/api/v1/shared/images/resolve/",
+            data={"token": token},
+            content_type="application/json",
+        )
+
+    first = resolve()
+    assert first.status_code == 200, first.content
+    with django_assert_num_queries(0):
+        second = resolve()
+    assert second.json() == first.json()
+
+    assert resolve("unknown-share-token-value").status_code == 404
+    with django_assert_num_queries(0):
+        assert resolve("unknown-share-token-value").status_code == 404
+
+    with django_capture_on_commit_callbacks(execute=True):
+        share_link.revoke()
+    assert resolve().status_code == 404
+
+    other = Image.objects.create(file="images/cached-other.jpg", organization=org)
+    ImageShareLink.objects.create(
+        image=other, token_hash=hash_share_token("cached-other-token-value")
+    )
+    assert resolve("cached-other-token-value").status_code == 200
+    with django_capture_on_commit_callbacks(execute=True):
+        delete_image_record(other)
+    assert resolve("cached-other-token-value").status_code == 404
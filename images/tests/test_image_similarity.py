@@ -0,0 +1,118 @@
+import io
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from PIL import Image as PilImage
+
+from accounts.tests.utils import create_test_user
+from images.models import Image
+from images.services import upload_image_file
+from images.similarity import chunk_neighbourhood, phash_fields, unsigned_phash
+from organizations.models import Membership
+from organizations.tests.utils import create_test_group
+
+TARGET = 0xF0F0_1234_ABCD_0FF0
+
+
+def flip_bits(value: int, *bits: int) -> int:
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+
+def hashed_image(org, value, title=""):
+    return Image.objects.create(
+        file=f"private/images/{org.pk}/{title}.webp",
+        organization=org,
+        title=title,
+        **phash_fields(value),
+    )
+
+
+@pytest.fixture
+def member_context(api_client, make_auth_headers):
+    user = create_test_user(email="similar@example.com")
+    org = create_test_group(name="Similar Library", slug="similar-library")
+    Membership.objects.create(user=user, organization=org, role="member")
+    return org, make_auth_headers(api_client, user)
+
+
+def test_phash_fields_round_trip_through_signed_storage():
+    fields = phash_fields(0xFFFF_0000_FFFF_0001)
+
+    assert fields["phash"] < 0
+    assert unsigned_phash(fields["phash"]) == 0xFFFF_0000_FFFF_0001
+    assert [fields[f"phash_{i}"] for i in range(4)] == [0xFFFF, 0, 0xFFFF, 1]
+    assert len(chunk_neighbourhood(0, 2)) == 1 + 16 + 120
+
+
+@pytest.mark.django_db
+def test_similar_images_are_ranked_by_hamming_distance(api_client, member_context):
+    org, headers = member_context
+    target = hashed_image(org, TARGET, "target")
+    # Seven bits spread 2/2/2/1 over the chunks: only one chunk is within the
+    # per-chunk radius of 1, which is exactly what multi-index lookup relies on.
+    spread = hashed_image(org, flip_bits(TARGET, 63, 62, 47, 46, 31, 30, 15), "spread")
+    close = hashed_image(org, flip_bits(TARGET, 0, 20), "close")
+    hashed_image(org, TARGET ^ 0xFFFF_FFFF, "far")
+    other_org = create_test_group(name="Elsewhere", slug="elsewhere")
+    hashed_image(other_org, TARGET, "foreign")
+
+    response = api_client.get(
+        f"/orgs/{org.slug}/images/{target.id}/similar/?max_distance=7",
+        headers=headers,
+    )
+
+    assert response.status_code == 200, response.content
+    assert [(item["distance"], item["image"]["id"]) for item in response.json()] == [
+        (2, close.id),
+        (7, spread.id),
+    ]
+
+
+@pytest.mark.django_db
+def test_similar_images_require_a_hash_and_bounded_distance(api_client, member_context):
+    org, headers = member_context
+    unhashed = Image.objects.create(file="images/unhashed.jpg", organization=org)
+
+    response = api_client.get(
+        f"/orgs/{org.slug}/images/{unhashed.id}/similar/", headers=headers
+    )
+    assert response.status_code == 409
+
+    response = api_client.get(
+        f"/orgs/{org.slug}/images/{unhashed.id}/similar/?max_distance=11",
+        headers=headers,
+    )
+    assert response.status_code == 400
+
+
+def png_bytes(color) -> bytes:
+    image = PilImage.new("RGB", (96, 64), color)
+    for x in range(0, 96, 8):
+        for y in range(64):
+            image.putpixel((x, y), (255, 255, 255))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.mark.django_db
+def test_upload_stores_hash_and_backfill_fills_missing_ones():
+    org = create_test_group(name="Hash Upload", slug="hash-upload")
+    uploaded = upload_image_file(png_bytes((20, 40, 60)), org)
+    assert uploaded.phash is not None
+    assert uploaded.phash_0 == phash_fields(unsigned_phash(uploaded.phash))["phash_0"]
+
+    default_storage.save(
+        "private/images/legacy.webp", ContentFile(png_bytes((0, 0, 0)))
+    )
+    legacy = Image.objects.create(file="private/images/legacy.webp", organization=org)
+
+    call_command("backfill_image_hashes", stdout=io.StringIO())
+
+    legacy.refresh_from_db()
+    assert legacy.phash is not None
+    assert legacy.phash_3 is not None
@@ -0,0 +1,144 @@
+import io
+import shutil
+from datetime import timedelta
+
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.storage import default_storage
+from PIL import Image as PilImage
+
+from accounts.tests.utils import create_test_user
+from core.models import StorageDeletion
+from images.models import PolymorphicImageRelation
+from images.services import upload_image_file
+from images.sprites import SPRITE_PREFIX, delete_stale_sprite_sheets
+from organizations.tests.utils import create_test_group
+
+
+def png_bytes(size, color) -> bytes:
+    buffer = io.BytesIO()
+    PilImage.new("RGB", size, color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def sprite_context(api_client, make_auth_headers, monkeypatch):
+    monkeypatch.setattr(
+        "images.services.generate_private_presigned_storage_url",
+        lambda key, **kwargs: f"https://r2.example/{key}?signed=1",
+    )
+    shutil.rmtree(default_storage.path(SPRITE_PREFIX), ignore_errors=True)
+    user = create_test_user(email="sprites@example.com")
+    org = create_test_group(name="Sprites", slug="sprites-org", owner=user)
+    images = [
+        upload_image_file(png_bytes(size, color), org, original_name=f"{index}.png")
+        for index, (size, color) in enumerate(
+            [
+                ((320, 160), (200, 0, 0)),
+                ((100, 200), (0, 200, 0)),
+                ((64, 64), (0, 0, 200)),
+            ]
+        )
+    ]
+    return org, images, make_auth_headers(api_client, user)
+
+
+@pytest.mark.django_db
+def test_org_sprite_packs_thumbnails_and_reuses_the_stored_sheet(
+    api_client, sprite_context
+):
+    org, images, headers = sprite_context
+    url = f"/orgs/{org.slug}/image-sprite/?ordering=created_at"
+
+    response = api_client.get(url, headers=headers)
+
+    assert response.status_code == 200, response.content
+    data = response.json()
+    assert data["url"]
+    assert (data["cell_width"], data["cell_height"]) == (160, 160)
+    assert (data["width"], data["height"]) == (480, 160)
+    tiles = {tile["image_id"]: tile for tile in data["tiles"]}
+    assert [tile["image_id"] for tile in data["tiles"]] == [i.pk for i in images]
+    assert tiles[images[0].pk] == {
+        "image_id": images[0].pk,
+        "x": 0,
+        "y": 0,
+        "width": 160,
+        "height": 80,
+    }
+    assert (tiles[images[1].pk]["x"], tiles[images[1].pk]["height"]) == (160, 160)
+    assert tiles[images[2].pk]["x"] == 320
+    _dirs, stored = default_storage.listdir(f"{SPRITE_PREFIX}{org.pk}")
+    assert len(stored) == 2
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(
+            "images.sprites.compose_sprite_sheet",
+            lambda *args: pytest.fail("sheet rebuilt"),
+        )
+        again = api_client.get(url, headers=headers)
+    assert again.json()["tiles"] == data["tiles"]
+
+
+@pytest.mark.django_db
+def test_sprite_key_changes_when_an_image_is_updated(api_client, sprite_context):
+    org, images, headers = sprite_context
+    url = f"/orgs/{org.slug}/image-sprite/?ordering=created_at&limit=2"
+    first = api_client.get(url, headers=headers).json()
+
+    images[1].title = "renamed"
+    images[1].save()
+    second = api_client.get(url, headers=headers).json()
+
+    assert len(first["tiles"]) == 2
+    assert first["url"] != second["url"]
+    _dirs, stored = default_storage.listdir(f"{SPRITE_PREFIX}{org.pk}")
+    assert len(stored) == 4
+
+
+@pytest.mark.django_db
+def test_object_gallery_sprite_follows_gallery_order(api_client, sprite_context):
+    org, images, headers = sprite_context
+    content_type = ContentType.objects.get_for_model(org)
+    for order, image in enumerate(reversed(images)):
+        PolymorphicImageRelation.objects.create(
+            image=image, content_type=content_type, object_id=org.pk, order=order
+        )
+
+    response = api_client.get(
+        f"/orgs/{org.slug}/image-sprite/organizations/organization/{org.pk}/",
+        headers=headers,
+    )
+    empty = api_client.get(f"/orgs/{org.slug}/image-sprite/?offset=10", headers=headers)
+    invalid = api_client.get(f"/orgs/{org.slug}/image-sprite/?limit=0", headers=headers)
+
+    assert response.status_code == 200, response.content
+    assert [tile["image_id"] for tile in response.json()["tiles"]] == [
+        image.pk for image in reversed(images)
+    ]
+    assert empty.json() == {
+        "url": None,
+        "expires_at": None,
+        "width": 0,
+        "height": 0,
+        "cell_width": 0,
+        "cell_height": 0,
+        "tiles": [],
+    }
+    assert invalid.status_code == 400
+
+
+@pytest.mark.django_db
+def test_stale_sprite_sheets_are_deleted_synchronously(api_client, sprite_context):
+    org, _images, headers = sprite_context
+    url = f"/orgs/{org.slug}/image-sprite/"
+    api_client.get(url, headers=headers)
+
+    assert delete_stale_sprite_sheets(older_than=timedelta(days=1)) == 0
+    assert delete_stale_sprite_sheets(older_than=-timedelta(seconds=5)) == 2
+    # Nothing is left on the outbox to delete a sheet rebuilt under the same key.
+    assert not StorageDeletion.objects.exists()
+    assert default_storage.listdir(f"{SPRITE_PREFIX}{org.pk}")[1] == []
+
+    assert api_client.get(url, headers=headers).status_code == 200
+    assert len(default_storage.listdir(f"{SPRITE_PREFIX}{org.pk}")[1]) == 2
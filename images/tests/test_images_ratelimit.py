@@ -2,6 +2,7 @@ import io
 
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client
 from PIL import Image as PilImage
@@ -89,6 +90,7 @@ def test_single_upload_rate_limited(monkeypatch):
     file2 = create_test_image_file(name="b.png")
     r2 = client.post(url, {"file": file2}, HTTP_AUTHORIZATION=f"Bearer {access}")
     assert r2.status_code == 429, r2.content
+    assert r2["Retry-After"] == "60"
 
 
 @pytest.mark.django_db
@@ -114,3 +116,29 @@ def test_bulk_upload_rate_limited(monkeypatch):
     files2 = {"files": [create_test_image_file(name="c2.png")]}
     r2 = client.post(url, files2, HTTP_AUTHORIZATION=f"Bearer {access}")
     assert r2.status_code == 429, r2.content
+
+
+@pytest.mark.django_db
+def test_uploads_are_weighted_by_decoded_pixels(settings):
+    cache.clear()
+    settings.UPLOAD_QUOTA_ORG_MEGAPIXELS_PER_HOUR = 1
+    org = Organization.objects.create(name="RLPixels", slug="rlpixels")
+    user = User.objects.create_user(
+        email="rlpixels@example.com", password="pw", email_verified=True
+    )
+    Membership.objects.create(user=user, organization=org, role="owner")
+    client = Client()
+    headers = {"HTTP_AUTHORIZATION": f"Bearer {get_access_token(user.email, 'pw')}"}
+    url = f"/api/v1/orgs/{org.slug}/bulk-upload/"
+
+    def upload(*names):
+        files = [create_test_image_file(size=(600, 500), name=name) for name in names]
+        return client.post(url, {"files": files}, **headers)
+
+    first = upload("p1.png", "p2.png", "p3.png")
+    refused = upload("p4.png")
+
+    assert first.status_code == 200, first.content
+    assert refused.status_code == 429, refused.content
+    # 0.9 MP spent of 1 MP refilling over an hour: 0.2 MP short is 720 s.
+    assert 700 <= int(refused["Retry-After"]) <= 720
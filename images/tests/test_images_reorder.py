@@ -8,6 +8,7 @@ from django.test import Client
 from PIL import Image as PilImage
 
 from images.models import Image, PolymorphicImageRelation
+from images.operations import ORDER_GAP
 from organizations.models import Membership, Organization
 
 User = get_user_model()
@@ -91,7 +92,7 @@ def test_attach_defaults_primary_and_order():
     assert rels[0].order == 0
     assert rels[1].image_id == img2.id
     assert rels[1].is_cover is False
-    assert rels[1].order == 1
+    assert rels[1].order == ORDER_GAP
 
 
 @pytest.mark.django_db
@@ -0,0 +1,78 @@
+import io
+from typing import get_args
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from PIL import Image as PilImage
+
+from core.utils.image import VARIANT_PROFILES
+from images.schemas import ImageVariantName
+from images.serializers import serialize_image
+from images.services import (
+    SIGNABLE_VARIANTS,
+    generate_lazy_variant,
+    sign_images,
+    upload_image_file,
+)
+from organizations.tests.utils import create_test_group
+
+
+@pytest.fixture(autouse=True)
+def fake_presign(monkeypatch):
+    cache.clear()
+    monkeypatch.setattr(
+        "images.services.generate_private_presigned_storage_url",
+        lambda key, **kwargs: f"https://r2.example/{key}",
+    )
+
+
+def jpeg_bytes() -> bytes:
+    buffer = io.BytesIO()
+    PilImage.new("RGB", (3600, 1200), (40, 90, 160)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def test_variant_names_match_the_profile_registry():
+    assert set(get_args(ImageVariantName)) == set(SIGNABLE_VARIANTS)
+    assert set(SIGNABLE_VARIANTS) == {"original", *VARIANT_PROFILES}
+
+
+@pytest.mark.django_db
+def test_lazy_variant_is_queued_once_and_served_as_fallback_meanwhile():
+    org = create_test_group(name="Lazy", slug="lazy-variants")
+    image = upload_image_file(jpeg_bytes(), org)
+    xl_key = VARIANT_PROFILES["xl"].key_for(str(image.file))
+    assert not default_storage.exists(xl_key)
+    assert serialize_image(image).variant_keys.xl is None
+
+    with patch("images.tasks.generate_image_variant.delay") as delay:
+        first = sign_images([image], variants=("xl",))[image.id]
+        sign_images([image], variants=("xl", "thumb"))
+
+    delay.assert_called_once_with(image.pk, "xl")
+    assert (
+        first.urls.xl
+        == f"https://r2.example/{VARIANT_PROFILES['lg'].key_for(str(image.file))}"
+    )
+
+
+@pytest.mark.django_db
+def test_generated_lazy_variant_is_recorded_for_shared_blob():
+    org = create_test_group(name="Lazy Shared", slug="lazy-shared")
+    image = upload_image_file(jpeg_bytes(), org)
+    sibling = upload_image_file(jpeg_bytes(), org)
+    xl_key = VARIANT_PROFILES["xl"].key_for(str(image.file))
+
+    assert generate_lazy_variant(image.pk, "xl") is True
+    assert generate_lazy_variant(image.pk, "xl") is False
+
+    sibling.refresh_from_db()
+    assert sibling.variant_metadata["xl"]["width"] == 3072
+    assert default_storage.exists(xl_key)
+    with patch("images.tasks.generate_image_variant.delay") as delay:
+        signed = sign_images([sibling], variants=("xl",))[sibling.id]
+    delay.assert_not_called()
+    assert signed.urls.xl == f"https://r2.example/{xl_key}"
+    assert serialize_image(sibling).variant_keys.xl == xl_key
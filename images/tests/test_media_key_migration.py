@@ -0,0 +1,89 @@
+import hashlib
+import io
+
+import pytest
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from PIL import Image as PilImage
+
+from accounts.tests.utils import create_test_user
+from core.models import StorageDeletion
+from core.utils.image import resize_avatar_images, resize_images
+from core.utils.storage import is_hashed_media_key, upload_to_storage
+from images.models import Image, ImageBlob, ImageShareLink, hash_share_token
+from images.services import original_storage_keys, resolve_share_link
+from organizations.tests.utils import create_test_group
+
+
+def webp_bytes(size=(320, 200)) -> bytes:
+    buffer = io.BytesIO()
+    PilImage.new("RGB", size, (90, 30, 160)).save(buffer, format="WEBP")
+    return buffer.getvalue()
+
+
+def store(key: str, content: bytes) -> None:
+    if default_storage.exists(key):
+        default_storage.delete(key)
+    upload_to_storage(key, content)
+
+
+@pytest.mark.django_db
+def test_legacy_image_keys_move_to_hashed_keys():
+    org = create_test_group(name="Legacy Keys", slug="legacy-keys")
+    original = f"private/images/{org.pk}/legacy.webp"
+    data = webp_bytes()
+    store(original, data)
+    thumb = resize_images(data)["thumb"]
+    store(f"private/images/{org.pk}/legacy_thumb.webp", thumb)
+    content_hash = hashlib.sha256(data).hexdigest()
+    blob = ImageBlob.objects.create(
+        organization=org, content_hash=content_hash, source_hash="s", file=original
+    )
+    for _ in range(2):
+        image = Image.objects.create(file=original, blob=blob, organization=org)
+    ImageShareLink.objects.create(
+        image=image, token_hash=hash_share_token("legacy-share-token")
+    )
+    assert str(resolve_share_link("legacy-share-token").file) == original
+    out = io.StringIO()
+
+    call_command("migrate_media_keys", "--only", "images", stdout=out)
+
+    migrated = f"private/images/{org.pk}/legacy.{content_hash[:16]}.webp"
+    assert "originals=1 avatars=0 copied_objects=2" in out.getvalue()
+    blob.refresh_from_db()
+    assert blob.file == migrated
+    assert {str(image.file) for image in Image.objects.filter(blob=blob)} == {migrated}
+    assert str(resolve_share_link("legacy-share-token").file) == migrated
+    new_thumb = original_storage_keys(migrated)[1]
+    with default_storage.open(new_thumb, "rb") as stored:
+        assert stored.read() == thumb
+    assert set(StorageDeletion.objects.values_list("key", flat=True)) == {
+        original,
+        f"private/images/{org.pk}/legacy_thumb.webp",
+    }
+
+    again = io.StringIO()
+    call_command("migrate_media_keys", "--only", "images", stdout=again)
+    assert "originals=0" in again.getvalue()
+
+
+@pytest.mark.django_db
+def test_legacy_avatar_keys_move_to_hashed_keys():
+    user = create_test_user(email="legacy-avatar@example.com")
+    small, large = resize_avatar_images(webp_bytes())
+    store("public/avatars/users/legacy.webp", small)
+    store("public/avatars/users/legacy_lg.webp", large)
+    user.avatar_path = "public/avatars/users/legacy.webp"
+    user.save(update_fields=["avatar_path"])
+
+    call_command("migrate_media_keys", "--only", "avatars", stdout=io.StringIO())
+
+    user.refresh_from_db()
+    digest = hashlib.sha256(small).hexdigest()[:16]
+    assert user.avatar_path == f"public/avatars/users/legacy.{digest}.webp"
+    assert is_hashed_media_key(user.avatar_path)
+    assert default_storage.exists(f"public/avatars/users/legacy.{digest}_lg.webp")
+    assert set(
+        StorageDeletion.objects.filter(target="public").values_list("key", flat=True)
+    ) == {"public/avatars/users/legacy.webp", "public/avatars/users/legacy_lg.webp"}
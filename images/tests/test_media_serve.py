@@ -1,6 +1,8 @@
 import io
 
 import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.http import Http404
 from django.test import RequestFactory, override_settings
 
@@ -28,3 +30,164 @@ def test_media_serve_can_be_enabled_for_local_proxy(monkeypatch):
     assert response.status_code == 200
     assert response["Cache-Control"] == "private, max-age=300"
     assert b"".join(response.streaming_content) == b"image-bytes"
+
+
+@pytest.fixture
+def stored_media():
+    key = default_storage.save("images/serve/range.txt", ContentFile(b"0123456789"))
+    yield key
+    default_storage.delete(key)
+
+
+@override_settings(ALLOW_UNAUTHENTICATED_MEDIA_SERVE=True)
+def test_media_serve_sends_validators_and_honours_conditional_get(stored_media):
+    response = media_serve(RequestFactory().get("/media/x"), stored_media)
+
+    assert response.status_code == 200
+    assert response["Accept-Ranges"] == "bytes"
+    assert response["Content-Length"] == "10"
+    assert b"".join(response.streaming_content) == b"0123456789"
+
+    by_etag = media_serve(
+        RequestFactory().get("/media/x", HTTP_IF_NONE_MATCH=response["ETag"]),
+        stored_media,
+    )
+    by_date = media_serve(
+        RequestFactory().get(
+            "/media/x", HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        ),
+        stored_media,
+    )
+
+    assert by_etag.status_code == 304
+    assert by_date.status_code == 304
+    assert by_etag["ETag"] == response["ETag"]
+
+
+@override_settings(ALLOW_UNAUTHENTICATED_MEDIA_SERVE=True)
+@pytest.mark.parametrize(
+    "header, content_range, body",
+    [
+        ("bytes=2-5", "bytes 2-5/10", b"2345"),
+        ("bytes=7-", "bytes 7-9/10", b"789"),
+        ("bytes=-3", "bytes 7-9/10", b"789"),
+        ("bytes=8-100", "bytes 8-9/10", b"89"),
+    ],
+)
+def test_media_serve_returns_single_byte_ranges(
+    stored_media, header, content_range, body
+):
+    request = RequestFactory().get("/media/x", HTTP_RANGE=header)
+
+    response = media_serve(request, stored_media)
+
+    assert response.status_code == 206
+    assert response["Content-Range"] == content_range
+    assert response["Content-Length"] == str(len(body))
+    assert b"".join(response.streaming_content) == body
+
+
+@override_settings(ALLOW_UNAUTHENTICATED_MEDIA_SERVE=True)
+def test_media_serve_range_edge_cases(stored_media):
+    unsatisfiable = media_serve(
+        RequestFactory().get("/media/x", HTTP_RANGE="bytes=10-"), stored_media
+    )
+    multi = media_serve(
+        RequestFactory().get("/media/x", HTTP_RANGE="bytes=0-1,4-5"), stored_media
+    )
+    stale = media_serve(
+        RequestFactory().get(
+            "/media/x", HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE='"stale"'
+        ),
+        stored_media,
+    )
+    invalid = media_serve(
+        RequestFactory().get("/media/x", HTTP_RANGE="bytes=5-3"), stored_media
+    )
+
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable["Content-Range"] == "bytes */10"
+    assert multi.status_code == 200
+    assert stale.status_code == 200
+    assert b"".join(stale.streaming_content) == b"0123456789"
+    assert invalid.status_code == 200
+    assert b"".join(invalid.streaming_content) == b"0123456789"
+
+
+@override_settings(ALLOW_UNAUTHENTICATED_MEDIA_SERVE=True)
+def test_media_serve_head_and_suffix_ranges_on_missing_or_empty_objects():
+    empty = default_storage.save("images/serve/empty.txt", ContentFile(b""))
+    try:
+        suffix = media_serve(
+            RequestFactory().get("/media/x", HTTP_RANGE="bytes=-5"), empty
+        )
+    finally:
+        default_storage.delete(empty)
+
+    assert suffix.status_code == 416
+    assert suffix["Content-Range"] == "bytes */0"
+    with pytest.raises(Http404):
+        media_serve(RequestFactory().head("/media/x"), "images/serve/missing.txt")
+
+
+@override_settings(ALLOW_UNAUTHENTICATED_MEDIA_SERVE=True)
+def test_media_serve_sends_no_validators_without_a_modified_time(
+    stored_media, monkeypatch
+):
+    def no_mtime(key):
+        raise NotImplementedError
+
+    monkeypatch.setattr("images.views.default_storage.get_modified_time", no_mtime)
+
+    response = media_serve(
+        RequestFactory().get("/media/x", HTTP_IF_NONE_MATCH='"0-a"'), stored_media
+    )
+    ranged = media_serve(
+        RequestFactory().get("/media/x", HTTP_RANGE="bytes=2-5"), stored_media
+    )
+
+    assert response.status_code == 200
+    assert "ETag" not in response
+    assert "Last-Modified" not in response
+    assert response["Content-Length"] == "10"
+    assert ranged.status_code == 206
+    assert b"".join(ranged.streaming_content) == b"2345"
+
+
+@override_settings(
+    ALLOW_UNAUTHENTICATED_MEDIA_SERVE=True,
+    MEDIA_SERVE_OFFLOAD="x-accel-redirect",
+    MEDIA_SERVE_ACCEL_PREFIX="/protected-media/",
+)
+def test_media_serve_offloads_to_proxy_without_touching_storage(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("storage must not be read when offloading")
+
+    monkeypatch.setattr("images.views.default_storage.open", fail)
+    monkeypatch.setattr("images.views.default_storage.size", fail)
+
+    response = media_serve(RequestFactory().get("/media/x"), "images/1/photo one.jpg")
+
+    assert response.status_code == 200
+    assert response["X-Accel-Redirect"] == "/protected-media/images/1/photo%20one.jpg"
+    assert response["Content-Type"] == "image/jpeg"
+    assert response.content == b""
+
+
+@override_settings(ALLOW_UNAUTHENTICATED_MEDIA_SERVE=True)
+def test_media_serve_rejects_traversal_keys():
+    with pytest.raises(Http404):
+        media_serve(RequestFactory().get("/media/x"), "images/../secret.txt")
+
+
+@override_settings(ALLOW_UNAUTHENTICATED_MEDIA_SERVE=True)
+def test_media_serve_marks_write_once_media_immutable():
+    key = default_storage.save(
+        "public/avatars/users/t.0123abcd0123abcd.webp", ContentFile(b"avatar")
+    )
+    try:
+        response = media_serve(RequestFactory().get("/media/x"), key)
+    finally:
+        default_storage.delete(key)
+
+    assert response["Cache-Control"] == "public, max-age=31536000, immutable"
@@ -9,7 +9,11 @@ from django.db import close_old_connections, connection
 
 from accounts.models import User
 from images.models import Image, PolymorphicImageRelation
-from images.operations import attach_images_to_object, reorder_object_images
+from images.operations import (
+    ORDER_GAP,
+    attach_images_to_object,
+    reorder_object_images,
+)
 from organizations.models import Organization
 
 pytestmark = [
@@ -87,7 +91,7 @@ def test_concurrent_attaches_preserve_unique_order_and_cover():
             object_id=organization.pk,
         ).order_by("order")
     )
-    assert {relation.order for relation in relations} == {0, 1}
+    assert {relation.order for relation in relations} == {0, ORDER_GAP}
     assert sum(relation.is_cover for relation in relations) == 1
 
 
@@ -127,6 +131,10 @@ def test_concurrent_reorders_finish_in_one_complete_valid_order():
     )
     final_order = [relation.image_id for relation in relations]
     assert final_order in (first_order, second_order)
-    assert [relation.order for relation in relations] == [0, 1, 2]
+    assert [relation.order for relation in relations] == [
+        0,
+        ORDER_GAP,
+        2 * ORDER_GAP,
+    ]
     assert relations[0].is_cover is True
     assert sum(relation.is_cover for relation in relations) == 1
@@ -0,0 +1,302 @@
+import base64
+import io
+from datetime import timedelta
+
+import pytest
+from django.core.files.storage import default_storage
+from django.test import Client
+from django.utils import timezone
+from PIL import Image as PilImage
+
+from accounts.tests.utils import create_test_user
+from core.models import StorageDeletion
+from images.models import Image, ImageUploadIntent
+from images.resumable import (
+    ResumableUploadConflict,
+    append_resumable_chunk,
+    create_resumable_upload,
+)
+from images.tasks import cleanup_expired_upload_intents
+from organizations.models import Membership
+from organizations.tests.utils import create_test_group
+
+TUS = {"Tus-Resumable": "1.0.0"}
+
+
+def png_bytes(size=(64, 48)) -> bytes:
+    buffer = io.BytesIO()
+    PilImage.new("RGB", size, (10, 120, 200)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def metadata(**values) -> str:
+    return ",".join(
+        f"{key} {base64.b64encode(value.encode()).decode()}"
+        for key, value in values.items()
+    )
+
+
+@pytest.fixture
+def resumable_context(api_client, make_auth_headers):
+    user = create_test_user(email="resumable@example.com")
+    org = create_test_group(name="Resumable Org", slug="resumable-org")
+    Membership.objects.create(user=user, organization=org, role="member")
+    headers = {**make_auth_headers(api_client, user), **TUS}
+    return org, user, headers
+
+
+def create_upload(org, headers, length, **meta):
+    return Client().post(
+        f"/api/v1/orgs/{org.slug}/resumable-uploads/",
+        headers={
+            **headers,
+            "Upload-Length": str(length),
+            "Upload-Metadata": metadata(
+                **({"filename": "photo.png", "filetype": "image/png"} | meta)
+            ),
+        },
+    )
+
+
+def patch_chunk(url, headers, offset, chunk):
+    return Client().patch(
+        url,
+        chunk,
+        content_type="application/offset+octet-stream",
+        headers={**headers, "Upload-Offset": str(offset)},
+    )
+
+
+@pytest.mark.django_db
+def test_resumable_upload_resumes_and_finalizes_into_an_image(
+    resumable_context, django_capture_on_commit_callbacks
+):
+    org, user, headers = resumable_context
+    data = png_bytes()
+    created = create_upload(org, headers, len(data))
+
+    assert created.status_code == 201, created.content
+    url = created["Location"]
+    assert created.json()["upload_offset"] == 0
+    assert created.json()["upload_length"] == len(data)
+    half = len(data) // 2
+    first = patch_chunk(url, headers, 0, data[:half])
+    assert first.status_code == 204
+    assert first["Upload-Offset"] == str(half)
+
+    # A retry from a stale offset is refused; HEAD reports where to resume.
+    stale = patch_chunk(url, headers, 0, data[:half])
+    assert stale.status_code == 409
+    head = Client().head(url, headers=headers)
+    assert head.status_code == 200
+    assert head["Upload-Offset"] == str(half)
+    assert head["Upload-Length"] == str(len(data))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        last = patch_chunk(url, headers, half, data[half:])
+
+    assert last.status_code == 204, last.content
+    intent = ImageUploadIntent.objects.get(pk=created.json()["id"])
+    assert intent.status == ImageUploadIntent.Status.FINALIZED
+    image = Image.objects.get(pk=intent.image_id)
+    assert image.organization == org
+    assert image.creator == user
+    assert image.title == "photo.png"
+    assert not default_storage.exists(intent.object_key)
+
+
+@pytest.mark.django_db
+def test_resumable_upload_validates_the_declaration_and_first_chunk(
+    resumable_context, settings
+):
+    org, _user, headers = resumable_context
+    settings.UPLOAD_IMAGE_MAX_BYTES = 1024
+
+    too_large = create_upload(org, headers, 2048)
+    not_image = create_upload(org, headers, 10, filetype="application/pdf")
+    no_version = create_upload(
+        org, {k: v for k, v in headers.items() if k not in TUS}, 10
+    )
+    created = create_upload(org, headers, 20)
+    overflow = patch_chunk(created["Location"], headers, 0, b"x" * 21)
+    wrong_type = Client().patch(
+        created["Location"],
+        b"x",
+        content_type="application/octet-stream",
+        headers={**headers, "Upload-Offset": "0"},
+    )
+
+    assert too_large.status_code == 413
+    assert not_image.status_code == 400
+    assert no_version.status_code == 412
+    assert overflow.status_code == 409
+    assert wrong_type.status_code == 415
+    assert ImageUploadIntent.objects.get().upload_offset == 0
+
+
+@pytest.mark.django_db
+def test_resumable_upload_rejects_non_image_first_chunk(resumable_context):
+    org, _user, headers = resumable_context
+    body = b"%PDF-1.7 not an image"
+    created = create_upload(org, headers, len(body))
+
+    response = patch_chunk(created["Location"], headers, 0, body)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Uploaded file is not a valid image."
+
+
+@pytest.mark.django_db
+def test_expired_resumable_upload_is_gone(resumable_context):
+    org, _user, headers = resumable_context
+    data = png_bytes()
+    created = create_upload(org, headers, len(data))
+    url = created["Location"]
+    ImageUploadIntent.objects.filter(pk=created.json()["id"]).update(
+        expires_at=timezone.now() - timedelta(seconds=1)
+    )
+
+    patched = patch_chunk(url, headers, 0, data)
+    head = Client().head(url, headers=headers)
+
+    assert patched.status_code == 410, patched.content
+    assert head.status_code == 410
+    intent = ImageUploadIntent.objects.get(pk=created.json()["id"])
+    assert (intent.status, intent.upload_offset) == (
+        ImageUploadIntent.Status.PENDING,
+        0,
+    )
+    assert not default_storage.exists(intent.object_key)
+
+
+@pytest.mark.django_db
+def test_resumable_upload_termination_and_tenancy(
+    resumable_context, make_auth_headers, api_client
+):
+    org, _user, headers = resumable_context
+    created = create_upload(org, headers, 100)
+    url = created["Location"]
+    outsider = create_test_user(email="resumable-outsider@example.com")
+    outsider_headers = {**make_auth_headers(api_client, outsider), **TUS}
+
+    assert Client().head(url, headers=outsider_headers).status_code == 404
+    deleted = Client().delete(url, headers=headers)
+
+    assert deleted.status_code == 204
+    assert not ImageUploadIntent.objects.exists()
+    assert StorageDeletion.objects.filter(
+        key=f"private/uploads/{org.pk}/{created.json()['id']}"
+    ).exists()
+
+
+class FakeMultipartClient:
+    def __init__(self):
+        self.objects = {}
+        self.parts = []
+        self.completed = None
+        self.aborted = []
+
+    def create_multipart_upload(self, **kwargs):
+        return {"UploadId": "upload-1"}
+
+    def upload_part(self, *, PartNumber, Body, **kwargs):
+        self.parts.append((PartNumber, Body))
+        return {"ETag": f'"etag-{PartNumber}"'}
+
+    def complete_multipart_upload(self, *, MultipartUpload, **kwargs):
+        self.completed = MultipartUpload["Parts"]
+
+    def abort_multipart_upload(self, *, UploadId, **kwargs):
+        self.aborted.append(UploadId)
+
+    def put_object(self, *, Key, Body, **kwargs):
+        self.objects[Key] = Body
+
+    def get_object(self, *, Key, **kwargs):
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+    def delete_object(self, *, Key, **kwargs):
+        self.objects.pop(Key, None)
+
+
+@pytest.mark.django_db
+def test_bucket_chunks_are_buffered_into_minimum_size_parts(monkeypatch):
+    org = create_test_group(name="Multipart", slug="resumable-multipart")
+    client = FakeMultipartClient()
+    monkeypatch.setattr(
+        "images.resumable.private_bucket_client", lambda: (client, "bucket")
+    )
+    monkeypatch.setattr("images.resumable.MULTIPART_PART_BYTES", 8)
+    data = png_bytes()[:20]
+    intent = create_resumable_upload(
+        org, original_name="a.png", content_type="image/png", length=len(data)
+    )
+    tail_key = f"{intent.object_key}.tail/"
+
+    intent = append_resumable_chunk(intent, offset=0, data=data[:10])
+    assert client.parts == [(1, data[:8])]
+    assert client.objects == {f"{tail_key}10": data[8:10]}
+    intent = append_resumable_chunk(intent, offset=10, data=data[10:18])
+    assert client.parts == [(1, data[:8]), (2, data[8:16])]
+    assert client.objects == {f"{tail_key}18": data[16:18]}
+    intent = append_resumable_chunk(intent, offset=18, data=data[18:])
+
+    assert client.parts[-1] == (3, data[16:])
+    assert [part["PartNumber"] for part in client.completed] == [1, 2, 3]
+    assert client.objects == {}
+    assert intent.upload_offset == len(data)
+    assert intent.status == ImageUploadIntent.Status.PROCESSING
+
+
+@pytest.mark.django_db
+def test_chunk_that_loses_its_offset_update_keeps_the_recorded_tail(monkeypatch):
+    org = create_test_group(name="Tail Race", slug="resumable-tail-race")
+    client = FakeMultipartClient()
+    monkeypatch.setattr(
+        "images.resumable.private_bucket_client", lambda: (client, "bucket")
+    )
+    monkeypatch.setattr("images.resumable.MULTIPART_PART_BYTES", 8)
+    data = png_bytes()[:20]
+    intent = create_resumable_upload(
+        org, original_name="a.png", content_type="image/png", length=len(data)
+    )
+    intent = append_resumable_chunk(intent, offset=0, data=data[:10])
+    # The row expires while this request still holds the unexpired copy.
+    ImageUploadIntent.objects.filter(pk=intent.pk).update(
+        expires_at=timezone.now() - timedelta(seconds=1)
+    )
+
+    with pytest.raises(ResumableUploadConflict):
+        append_resumable_chunk(intent, offset=10, data=b"XXXXXXXX")
+
+    tail_key = f"{intent.object_key}.tail/"
+    assert client.objects == {f"{tail_key}10": data[8:10]}
+    ImageUploadIntent.objects.filter(pk=intent.pk).update(
+        expires_at=timezone.now() + timedelta(hours=1)
+    )
+    client.parts.clear()
+    intent = append_resumable_chunk(intent, offset=10, data=data[10:])
+    assert client.parts == [(2, data[8:16]), (3, data[16:])]
+
+
+@pytest.mark.django_db
+def test_cleanup_aborts_abandoned_multipart_uploads(monkeypatch):
+    org = create_test_group(name="Abandoned", slug="resumable-abandoned")
+    client = FakeMultipartClient()
+    monkeypatch.setattr(
+        "images.resumable.private_bucket_client", lambda: (client, "bucket")
+    )
+    intent = create_resumable_upload(
+        org, original_name="a.png", content_type="image/png", length=100
+    )
+    ImageUploadIntent.objects.filter(pk=intent.pk).update(
+        expires_at=timezone.now() - timedelta(days=1)
+    )
+
+    assert cleanup_expired_upload_intents() == 1
+
+    assert client.aborted == ["upload-1"]
+    assert set(StorageDeletion.objects.values_list("key", flat=True)) >= {
+        intent.object_key,
+        f"{intent.object_key}.tail/0",
+    }
@@ -0,0 +1,293 @@
+import io
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image as PilImage
+
+from accounts.tests.utils import create_test_user
+from images.models import Image, ImageUploadIntent
+from images.services import finalize_upload_intent
+from images.tasks import cleanup_expired_upload_intents, finalize_image_upload_intent
+from organizations.models import Membership
+from organizations.tests.utils import create_test_group
+
+
+def png_bytes(size=(64, 48)) -> bytes:
+    buffer = io.BytesIO()
+    PilImage.new("RGB", size, (10, 120, 200)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def fake_presigned_post(monkeypatch):
+    calls = []
+
+    def fake(key, **kwargs):
+        calls.append((key, kwargs))
+        return {
+            "url": "https://bucket.example/",
+            "fields": {"key": key, "Content-Type": kwargs["content_type"]},
+        }
+
+    monkeypatch.setattr("images.services.generate_private_presigned_upload", fake)
+    return calls
+
+
+@pytest.fixture
+def member_context(api_client, make_auth_headers):
+    user = create_test_user(email="intent-member@example.com")
+    org = create_test_group(name="Intent Org", slug="intent-org")
+    Membership.objects.create(user=user, organization=org, role="member")
+    return org, user, make_auth_headers(api_client, user)
+
+
+def create_intent(api_client, org, headers, **overrides):
+    payload = {"name": "photo.png", "content_type": "image/png", "size": 1024}
+    payload.update(overrides)
+    return api_client.post(
+        f"/orgs/{org.slug}/upload-intents/", json=payload, headers=headers
+    )
+
+
+@pytest.mark.django_db
+def test_upload_intent_returns_size_bounded_presigned_post(
+    api_client, member_context, fake_presigned_post, settings
+):
+    org, user, headers = member_context
+    settings.UPLOAD_IMAGE_MAX_BYTES = 4096
+
+    response = create_intent(api_client, org, headers)
+
+    assert response.status_code == 201, response.content
+    data = response.json()
+    intent = ImageUploadIntent.objects.get(pk=data["id"])
+    assert intent.organization == org
+    assert intent.creator == user
+    assert intent.status == ImageUploadIntent.Status.PENDING
+    assert intent.object_key == f"private/uploads/{org.pk}/{intent.pk}"
+    assert data["upload_url"] == "https://bucket.example/"
+    assert data["upload_fields"]["key"] == intent.object_key
+    # The policy caps the upload at the declared (and charged) size.
+    assert data["max_bytes"] == 1024
+    key, kwargs = fake_presigned_post[0]
+    assert key == intent.object_key
+    assert kwargs["content_type"] == "image/png"
+    assert kwargs["max_bytes"] == 1024
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "overrides",
+    [{"size": 11 * 1024 * 1024}, {"content_type": "application/pdf"}],
+)
+def test_upload_intent_rejects_declared_oversize_and_non_images(
+    api_client, member_context, fake_presigned_post, overrides
+):
+    org, _user, headers = member_context
+
+    response = create_intent(api_client, org, headers, **overrides)
+
+    assert response.status_code == 400
+    assert not ImageUploadIntent.objects.exists()
+    assert fake_presigned_post == []
+
+
+@pytest.mark.django_db
+def test_finalize_processes_the_staged_object_into_an_image(
+    api_client, member_context, fake_presigned_post, django_capture_on_commit_callbacks
+):
+    org, user, headers = member_context
+    intent_id = create_intent(api_client, org, headers).json()["id"]
+    intent = ImageUploadIntent.objects.get(pk=intent_id)
+    default_storage.save(intent.object_key, ContentFile(png_bytes()))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = api_client.post(
+            f"/orgs/{org.slug}/upload-intents/{intent_id}/finalize/",
+            headers=headers,
+        )
+
+    assert response.status_code == 202, response.content
+    data = response.json()
+    assert data["status"] == "finalized"
+    image = Image.objects.get(pk=data["image"]["id"])
+    assert image.organization == org
+    assert image.creator == user
+    assert image.title == "photo.png"
+    assert default_storage.exists(str(image.file))
+    assert not default_storage.exists(intent.object_key)
+
+    poll = api_client.get(
+        f"/orgs/{org.slug}/upload-intents/{intent_id}/", headers=headers
+    )
+    assert poll.json()["image"]["id"] == image.pk
+
+
+@pytest.mark.django_db
+def test_finalize_requires_the_object_to_be_uploaded(
+    api_client, member_context, fake_presigned_post
+):
+    org, _user, headers = member_context
+    intent_id = create_intent(api_client, org, headers).json()["id"]
+
+    response = api_client.post(
+        f"/orgs/{org.slug}/upload-intents/{intent_id}/finalize/",
+        headers=headers,
+    )
+
+    assert response.status_code == 409
+    assert ImageUploadIntent.objects.get(pk=intent_id).status == "pending"
+
+
+@pytest.mark.django_db
+def test_finalize_marks_invalid_content_as_failed(
+    api_client, member_context, fake_presigned_post, django_capture_on_commit_callbacks
+):
+    org, _user, headers = member_context
+    intent_id = create_intent(api_client, org, headers).json()["id"]
+    intent = ImageUploadIntent.objects.get(pk=intent_id)
+    default_storage.save(intent.object_key, ContentFile(b"not an image"))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = api_client.post(
+            f"/orgs/{org.slug}/upload-intents/{intent_id}/finalize/",
+            headers=headers,
+        )
+
+    assert response.status_code == 202
+    assert response.json()["status"] == "failed"
+    assert response.json()["error_message"] == "Uploaded file is not a valid image."
+    assert not Image.objects.filter(organization=org).exists()
+    assert not default_storage.exists(intent.object_key)
+
+
+@pytest.mark.django_db
+def test_finalize_charges_decoded_pixels_against_the_quota(
+    api_client,
+    member_context,
+    fake_presigned_post,
+    django_capture_on_commit_callbacks,
+    settings,
+):
+    cache.clear()
+    settings.UPLOAD_QUOTA_ORG_MEGAPIXELS_PER_HOUR = 1
+    org, _user, headers = member_context
+    data = png_bytes((800, 800))
+    intent_ids = []
+    for _ in range(2):
+        intent_id = create_intent(api_client, org, headers, size=len(data)).json()["id"]
+        intent = ImageUploadIntent.objects.get(pk=intent_id)
+        default_storage.save(intent.object_key, ContentFile(data))
+        intent_ids.append(intent_id)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        statuses = [
+            api_client.post(
+                f"/orgs/{org.slug}/upload-intents/{intent_id}/finalize/",
+                headers=headers,
+            ).json()
+            for intent_id in intent_ids
+        ]
+
+    assert statuses[0]["status"] == "finalized"
+    assert statuses[1]["status"] == "failed"
+    assert statuses[1]["error_message"].startswith("Upload quota exceeded.")
+    assert Image.objects.filter(organization=org).count() == 1
+
+
+@pytest.mark.django_db
+def test_finalize_releases_its_claim_after_an_unexpected_error(
+    api_client, member_context, fake_presigned_post, monkeypatch
+):
+    org, _user, headers = member_context
+    intent_id = create_intent(api_client, org, headers).json()["id"]
+    intent = ImageUploadIntent.objects.get(pk=intent_id)
+    default_storage.save(intent.object_key, ContentFile(png_bytes()))
+    intent.status = ImageUploadIntent.Status.PROCESSING
+    intent.save(update_fields=["status"])
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr("images.services.upload_image_file", fail)
+    with pytest.raises(RuntimeError):
+        finalize_upload_intent(intent_id)
+
+    intent.refresh_from_db()
+    assert intent.status == ImageUploadIntent.Status.FAILED
+    assert intent.error_message == "Image upload failed."
+    assert cache.get(f"images:upload-intent:{intent_id}") is None
+
+
+@pytest.mark.django_db
+def test_expired_intents_cannot_be_finalized(
+    api_client, member_context, fake_presigned_post
+):
+    org, _user, headers = member_context
+    intent_id = create_intent(api_client, org, headers).json()["id"]
+    intent = ImageUploadIntent.objects.get(pk=intent_id)
+    default_storage.save(intent.object_key, ContentFile(png_bytes()))
+    ImageUploadIntent.objects.filter(pk=intent_id).update(
+        expires_at=timezone.now() - timedelta(seconds=1)
+    )
+
+    response = api_client.post(
+        f"/orgs/{org.slug}/upload-intents/{intent_id}/finalize/",
+        headers=headers,
+    )
+
+    assert response.status_code == 410
+    assert ImageUploadIntent.objects.get(pk=intent_id).status == "pending"
+    # A task queued before cleanup removed its intent simply finishes.
+    ImageUploadIntent.objects.filter(pk=intent_id).delete()
+    assert finalize_image_upload_intent(intent_id) is None
+
+
+@pytest.mark.django_db
+def test_upload_intents_are_hidden_across_tenants(
+    api_client, member_context, fake_presigned_post, make_auth_headers
+):
+    org, _user, headers = member_context
+    intent_id = create_intent(api_client, org, headers).json()["id"]
+    outsider = create_test_user(email="intent-outsider@example.com")
+    other = create_test_group(name="Other", slug="intent-other", owner=outsider)
+
+    response = api_client.post(
+        f"/orgs/{other.slug}/upload-intents/{intent_id}/finalize/",
+        headers=make_auth_headers(api_client, outsider),
+    )
+
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_cleanup_removes_expired_intents_and_staged_objects(
+    django_capture_on_commit_callbacks,
+):
+    org = create_test_group(name="Cleanup", slug="intent-cleanup")
+    stale = ImageUploadIntent.objects.create(
+        organization=org,
+        object_key=f"private/uploads/{org.pk}/stale",
+        content_type="image/png",
+        max_bytes=1024,
+        expires_at=timezone.now() - timedelta(days=1),
+    )
+    fresh = ImageUploadIntent.objects.create(
+        organization=org,
+        object_key=f"private/uploads/{org.pk}/fresh",
+        content_type="image/png",
+        max_bytes=1024,
+        expires_at=timezone.now() + timedelta(minutes=5),
+    )
+    default_storage.save(stale.object_key, ContentFile(b"staged"))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert cleanup_expired_upload_intents() == 1
+
+    assert not ImageUploadIntent.objects.filter(pk=stale.pk).exists()
+    assert ImageUploadIntent.objects.filter(pk=fresh.pk).exists()
+    assert not default_storage.exists(stale.object_key)
@@ -1,8 +1,14 @@
+import io
 import os
 from unittest.mock import patch
 
 import pytest
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from PIL import Image as PilImage
 
+from images.models import Image
+from images.serializers import serialize_image
 from images.services import ImageUploadFailed, upload_image_file
 from organizations.tests.utils import create_test_group
 
@@ -14,7 +20,7 @@ def test_database_failure_compensates_all_uploaded_objects():
     with (
         patch("images.services.normalize_image_bytes", return_value=b"normalized"),
         patch(
-            "images.services.resize_images",
+            "core.utils.image.resize_images",
             return_value={"thumb": b"thumb", "sm": b"small"},
         ),
         patch("images.services.upload_to_storage") as upload,
@@ -44,7 +50,7 @@ def test_successful_upload_persists_image_after_all_variants():
 
     with (
         patch("images.services.normalize_image_bytes", return_value=b"normalized"),
-        patch("images.services.resize_images", return_value=variants),
+        patch("core.utils.image.resize_images", return_value=variants),
         patch("images.services.upload_to_storage") as upload,
     ):
         image = upload_image_file(
@@ -66,3 +72,142 @@ def test_successful_upload_persists_image_after_all_variants():
         f"{base}_md.webp",
         f"{base}_lg.webp",
     ]
+
+
+@pytest.mark.django_db
+def test_identical_reupload_reuses_blob_without_processing():
+    organization = create_test_group(name="Dedup", slug="dedup")
+    variants = {"thumb": b"t", "sm": b"s", "md": b"m", "lg": b"l"}
+
+    with (
+        patch(
+            "images.services.normalize_image_bytes", return_value=b"normalized"
+        ) as normalize,
+        patch("core.utils.image.resize_images", return_value=variants),
+        patch("images.services.upload_to_storage") as upload,
+    ):
+        first = upload_image_file(b"same", organization, original_name="a.png")
+        second = upload_image_file(b"same", organization, original_name="b.png")
+
+    assert normalize.call_count == 1
+    assert upload.call_count == 5
+    assert second.pk != first.pk
+    assert second.blob_id == first.blob_id
+    assert str(second.file) == str(first.file)
+    assert second.title == "b.png"
+
+
+@pytest.mark.django_db
+def test_different_source_with_same_normalized_content_skips_storage_writes():
+    organization = create_test_group(name="Dedup Norm", slug="dedup-norm")
+
+    with (
+        patch("images.services.normalize_image_bytes", return_value=b"normalized"),
+        patch("core.utils.image.resize_images", return_value={"thumb": b"t"}) as resize,
+        patch("images.services.upload_to_storage") as upload,
+    ):
+        first = upload_image_file(b"with-exif", organization)
+        second = upload_image_file(b"without-exif", organization)
+
+    assert resize.call_count == 1
+    assert upload.call_count == 2
+    assert second.blob_id == first.blob_id
+
+
+@pytest.mark.django_db
+def test_blobs_are_not_shared_across_organizations():
+    first_org = create_test_group(name="Dedup A", slug="dedup-a")
+    second_org = create_test_group(name="Dedup B", slug="dedup-b")
+
+    with (
+        patch("images.services.normalize_image_bytes", return_value=b"normalized"),
+        patch("core.utils.image.resize_images", return_value={}),
+        patch("images.services.upload_to_storage") as upload,
+    ):
+        first = upload_image_file(b"same", first_org)
+        second = upload_image_file(b"same", second_org)
+
+    assert upload.call_count == 2
+    assert first.blob_id != second.blob_id
+    assert str(second.file).startswith(f"private/images/{second_org.pk}/")
+
+
+def jpeg_bytes(size=(1200, 800), color=(200, 120, 40)) -> bytes:
+    buffer = io.BytesIO()
+    PilImage.new("RGB", size, color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+@pytest.mark.django_db
+def test_upload_records_intrinsic_metadata_for_layout():
+    organization = create_test_group(name="Layout", slug="layout")
+
+    image = upload_image_file(jpeg_bytes(), organization)
+    out = serialize_image(image)
+
+    assert (out.width, out.height) == (1200, 800)
+    assert out.variant_metadata is not None
+    assert (
+        out.variant_metadata["thumb"].width,
+        out.variant_metadata["thumb"].height,
+    ) == (
+        160,
+        107,
+    )
+    assert out.variant_metadata["lg"].width == 1200
+    assert all(item.bytes > 0 for item in out.variant_metadata.values())
+    assert out.blurhash and len(out.blurhash) == 28
+    assert out.dominant_color is not None and out.dominant_color.startswith("#")
+
+    reused = upload_image_file(jpeg_bytes(), organization)
+    assert reused.variant_metadata == image.variant_metadata
+    assert reused.blurhash == image.blurhash
+
+
+@pytest.mark.django_db
+def test_backfill_fills_metadata_for_existing_images():
+    organization = create_test_group(name="Backfill", slug="backfill-meta")
+    image = upload_image_file(jpeg_bytes(size=(900, 300)), organization)
+    expected = dict(image.variant_metadata)
+    Image.objects.filter(pk=image.pk).update(
+        variant_metadata={}, blurhash="", dominant_color=""
+    )
+
+    call_command("backfill_image_metadata", stdout=io.StringIO())
+
+    image.refresh_from_db()
+    assert image.variant_metadata == expected
+    assert image.blurhash
+    assert image.dominant_color
+
+
+@pytest.mark.django_db
+def test_upload_over_the_decode_budget_fails_before_decoding(settings):
+    organization = create_test_group(name="Budget", slug="budget")
+    settings.IMAGE_DECODE_BUDGET_WAIT_SECONDS = 0
+    buf = io.BytesIO()
+    PilImage.new("RGB", (64, 64)).save(buf, format="PNG")
+
+    with (
+        patch("core.utils.decode_budget.DecodeBudget.acquire", return_value=False),
+        patch("images.services.normalize_image_bytes") as normalize,
+    ):
+        with pytest.raises(ImageUploadFailed):
+            upload_image_file(buf.getvalue(), organization, original_name="big.png")
+
+    normalize.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_web_friendly_original_keeps_its_format(settings):
+    organization = create_test_group(name="Passthrough", slug="passthrough")
+    settings.IMAGE_ORIGINAL_PASSTHROUGH_MAX_BYTES = 1024 * 1024
+
+    image = upload_image_file(jpeg_bytes(), organization)
+
+    assert str(image.file).endswith(".jpg")
+    with default_storage.open(str(image.file), "rb") as stored:
+        assert stored.read(2) == b"\xff\xd8"
+    thumb = str(image.file).removesuffix(".jpg") + "_thumb.webp"
+    assert default_storage.exists(thumb)
+    assert image.variant_metadata["original"]["width"] == 1200
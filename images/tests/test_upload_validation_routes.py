@@ -1,10 +1,15 @@
+import hashlib
+import io
 from unittest.mock import patch
 
 import pytest
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client
+from PIL import Image as PilImage
 
 from accounts.models import User
 from accounts.services import issue_token_pair
+from images.services import upload_image_file
 from organizations.models import Membership, Organization
 
 
@@ -136,3 +141,67 @@ def test_bulk_upload_rejects_multipart_aggregate_size_before_processing(
     assert response.status_code == 400
     assert "aggregate size" in response.json()["detail"]
     upload.assert_not_called()
+
+
+def png_bytes(size=(24, 24)) -> bytes:
+    buf = io.BytesIO()
+    PilImage.new("RGB", size, (120, 40, 200)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@pytest.mark.django_db
+def test_streamed_bulk_upload_reports_sniffed_non_images_per_file(
+    upload_route_context,
+):
+    organization, headers = upload_route_context
+    files = [
+        uploaded_file("good.png", png_bytes(), "image/png"),
+        uploaded_file("fake.png", b"%PDF-1.7 not an image", "image/png"),
+    ]
+
+    with patch(
+        "images.api.uploads.upload_image_file", wraps=upload_image_file
+    ) as upload:
+        response = Client().post(
+            f"/api/v1/orgs/{organization.slug}/bulk-upload/",
+            {"files": files},
+            headers=headers,
+        )
+
+    assert response.status_code == 200, response.content
+    results = response.json()
+    assert [item["status"] for item in results] == ["success", "error"]
+    assert results[1]["error"] == "Uploaded file is not a valid image."
+    assert upload.call_count == 1
+    assert (
+        upload.call_args.kwargs["source_hash"]
+        == hashlib.sha256(png_bytes()).hexdigest()
+    )
+
+
+@pytest.mark.django_db
+def test_streamed_single_upload_rejects_oversized_body_and_header(
+    upload_route_context, settings
+):
+    organization, headers = upload_route_context
+    settings.UPLOAD_IMAGE_MAX_DIMENSION = 16
+    url = f"/api/v1/orgs/{organization.slug}/images/"
+
+    with patch("images.api.uploads.upload_image_file") as upload:
+        too_wide = Client().post(
+            url,
+            {"file": uploaded_file("wide.png", png_bytes((32, 8)), "image/png")},
+            headers=headers,
+        )
+        settings.UPLOAD_IMAGE_MAX_BYTES = 64
+        too_big = Client().post(
+            url,
+            {"file": uploaded_file("big.png", png_bytes(), "image/png")},
+            headers=headers,
+        )
+
+    assert too_wide.status_code == 400
+    assert too_wide.json()["detail"] == "Image dimensions exceed the allowed limit."
+    assert too_big.status_code == 400
+    assert "File too large" in too_big.json()["detail"]
+    upload.assert_not_called()
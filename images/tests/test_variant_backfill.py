@@ -0,0 +1,127 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from PIL import Image as PilImage
+
+from core.utils.image import VARIANT_PROFILES
+from core.utils.storage import list_storage_keys
+from images.backfill import VariantBackfill
+from images.models import VariantBackfillCheckpoint
+from images.services import upload_image_file
+from organizations.tests.utils import create_test_group
+
+
+def png_bytes(color) -> bytes:
+    buffer = io.BytesIO()
+    PilImage.new("RGB", (320, 240), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def drop_variants(image, *names):
+    keys = [VARIANT_PROFILES[name].key_for(str(image.file)) for name in names]
+    for key in keys:
+        default_storage.delete(key)
+    return keys
+
+
+@pytest.mark.django_db
+def test_backfill_lists_each_prefix_once_and_renders_missing_variants():
+    org = create_test_group(name="Backfill", slug="backfill")
+    first = upload_image_file(png_bytes((10, 20, 30)), org)
+    second = upload_image_file(png_bytes((200, 20, 30)), org)
+    dropped = drop_variants(first, "sm", "md") + drop_variants(second, "thumb")
+
+    with patch(
+        "images.backfill.list_storage_keys", side_effect=list_storage_keys
+    ) as listing:
+        out = io.StringIO()
+        call_command("backfill_image_variants", stdout=out)
+
+    assert listing.call_count == 1
+    assert all(default_storage.exists(key) for key in dropped)
+    assert "created_files=3" in out.getvalue()
+    checkpoint = VariantBackfillCheckpoint.objects.get(name="default")
+    assert checkpoint.last_image_id == second.pk
+    assert checkpoint.completed_at is not None
+
+
+@pytest.mark.django_db
+def test_backfill_resumes_from_checkpoint_after_interruption():
+    org = create_test_group(name="Resume", slug="backfill-resume")
+    images = [upload_image_file(png_bytes((i * 60, 0, 0)), org) for i in range(3)]
+    dropped = [drop_variants(image, "lg")[0] for image in images]
+
+    call_command(
+        "backfill_image_variants", "--chunk-size=1", "--limit=1", stdout=io.StringIO()
+    )
+    assert default_storage.exists(dropped[0])
+    assert not default_storage.exists(dropped[1])
+    assert VariantBackfillCheckpoint.objects.get().last_image_id == images[0].pk
+
+    with patch("images.backfill.render_missing_variants", return_value=1) as render:
+        VariantBackfill(chunk_size=1).run_chunk()
+    render.assert_called_once_with(str(images[1].file), ("lg",))
+    assert VariantBackfillCheckpoint.objects.get().last_image_id == images[1].pk
+
+
+@pytest.mark.django_db
+def test_backfill_chunks_run_through_an_executor_and_as_celery_chain():
+    org = create_test_group(name="Pool", slug="backfill-pool")
+    images = [upload_image_file(png_bytes((0, i * 60, 0)), org) for i in range(3)]
+    dropped = [drop_variants(image, "thumb")[0] for image in images]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        stats = VariantBackfill(name="pool", executor=executor).run_chunk()
+    assert stats.files_rendered == 3
+    assert all(default_storage.exists(key) for key in dropped)
+
+    drop_variants(images[2], "sm")
+    call_command(
+        "backfill_image_variants", "--celery", "--chunk-size=2", stdout=io.StringIO()
+    )
+    checkpoint = VariantBackfillCheckpoint.objects.get(name="default")
+    assert checkpoint.completed_at is not None
+    assert checkpoint.images_scanned == 3
+    assert checkpoint.variants_created == 1
+
+
+@pytest.mark.django_db
+def test_filtered_backfill_keeps_its_own_checkpoint():
+    first_org = create_test_group(name="Filtered A", slug="backfill-filtered-a")
+    second_org = create_test_group(name="Filtered B", slug="backfill-filtered-b")
+    first = upload_image_file(png_bytes((1, 2, 3)), first_org)
+    later = [upload_image_file(png_bytes((4, i, 6)), second_org) for i in range(2)]
+    dropped = drop_variants(first, "lg")[0]
+
+    # An interrupted filtered run leaves its cursor in the second organization.
+    call_command(
+        "backfill_image_variants",
+        f"--org={second_org.pk}",
+        "--chunk-size=1",
+        "--limit=1",
+        stdout=io.StringIO(),
+    )
+    call_command("backfill_image_variants", stdout=io.StringIO())
+
+    filtered = VariantBackfillCheckpoint.objects.get(name=f"default@org{second_org.pk}")
+    assert (filtered.last_image_id, filtered.completed_at) == (later[0].pk, None)
+    assert VariantBackfillCheckpoint.objects.get(name="default").images_scanned == 3
+    assert default_storage.exists(dropped)
+    ids_run = VariantBackfill(image_ids=[later[1].pk, later[0].pk])
+    assert ids_run.checkpoint_name.startswith("default@ids-")
+    assert (
+        ids_run.checkpoint_name
+        == VariantBackfill(image_ids=[later[0].pk, later[1].pk]).checkpoint_name
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("flag", ["--ids=1", "--workers=4", "--limit=10", "--dry-run"])
+def test_celery_backfill_refuses_options_it_cannot_honour(flag):
+    with pytest.raises(CommandError, match="cannot be combined with --celery"):
+        call_command("backfill_image_variants", "--celery", flag)
+    assert not VariantBackfillCheckpoint.objects.exists()
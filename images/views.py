@@ -1,10 +1,98 @@
 import mimetypes
+import re
+from urllib.parse import quote
 
 from django.conf import settings
 from django.core.files.storage import default_storage
-from django.http import Http404, StreamingHttpResponse
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+from core.utils.storage import media_cache_control
 
 CHUNK_SIZE = 64 * 1024
+CACHE_CONTROL = "private, max-age=300"
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+OFFLOAD_HEADERS = {"x-accel-redirect": "X-Accel-Redirect", "x-sendfile": "X-Sendfile"}
+
+
+def _offload_response(key: str, content_type: str, mode: str) -> HttpResponse:
+    """Hand the transfer to the front proxy; it handles ranges and validators."""
+    if mode == "x-accel-redirect":
+        prefix = getattr(settings, "MEDIA_SERVE_ACCEL_PREFIX", "/protected-media/")
+        target = f"{prefix.rstrip('/')}/{quote(key)}"
+    else:
+        # Filesystem storage only; the proxy reads the path directly.
+        target = default_storage.path(key)
+    response = HttpResponse(content_type=content_type)
+    response[OFFLOAD_HEADERS[mode]] = target
+    response["Cache-Control"] = _cache_control(key)
+    return response
+
+
+def _cache_control(key: str) -> str:
+    return media_cache_control(key) or CACHE_CONTROL
+
+
+def _object_metadata(key: str) -> tuple[int | None, int | None]:
+    """
+    (size, mtime) from storage; either may be None when the backend cannot
+    report it, in which case the object is streamed without validators.
+    """
+    try:
+        size = default_storage.size(key)
+    except Exception:
+        return None, None
+    try:
+        modified = default_storage.get_modified_time(key)
+    except NotImplementedError, OSError:
+        return size, None
+    return size, int(modified.timestamp())
+
+
+def _with_validators(response, key: str, etag: str, last_modified: int | None):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = _cache_control(key)
+    return response
+
+
+def _requested_range(request, size, etag: str | None, last_modified: int | None):
+    """
+    (start, end) of a single satisfiable byte range, "unsatisfiable", or None
+    to send the whole object. Multi-range and invalid ranges (last < first)
+    get the whole object, as RFC 9110 asks.
+    """
+    header = request.headers.get("Range")
+    if not header or request.method not in ("GET", "HEAD"):
+        return None
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range != etag:
+        if_range_date = parse_http_date_safe(if_range)
+        if if_range_date is None or last_modified is None:
+            return None
+        if if_range_date != last_modified:
+            return None
+    match = RANGE_RE.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the final N bytes.
+        length = int(last)
+        if length == 0 or size == 0:
+            return "unsatisfiable"
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        return "unsatisfiable"
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
 
 
 def media_serve(request, key: str):
@@ -12,31 +100,87 @@ def media_serve(request, key: str):
     Optional local/dev storage proxy.
 
     Private production images should be fetched through signed URL endpoints,
-    not by stable unauthenticated storage keys.
+    not by stable unauthenticated storage keys. Supports conditional GET and
+    single byte ranges from storage metadata; with MEDIA_SERVE_OFFLOAD set,
+    the front proxy sends the bytes instead of this worker.
     """
     if not getattr(settings, "ALLOW_UNAUTHENTICATED_MEDIA_SERVE", False):
         raise Http404()
-
-    try:
-        f = default_storage.open(key, mode="rb")
-    except Exception:
+    if key.startswith("/") or ".." in key.split("/"):
         raise Http404()
 
     content_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+    offload = (getattr(settings, "MEDIA_SERVE_OFFLOAD", None) or "").lower()
+    if offload in OFFLOAD_HEADERS:
+        return _offload_response(key, content_type, offload)
 
-    def file_iterator():
+    size, last_modified = _object_metadata(key)
+    # Size alone does not tell two versions apart: no mtime, no validators.
+    etag = (
+        f'"{last_modified:x}-{size:x}"'
+        if size is not None and last_modified is not None
+        else None
+    )
+    if etag is not None:
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            return _with_validators(not_modified, key, etag, last_modified)
+
+    byte_range = (
+        _requested_range(request, size, etag, last_modified)
+        if size is not None
+        else None
+    )
+    if byte_range == "unsatisfiable":
+        return HttpResponse(status=416, headers={"Content-Range": f"bytes */{size}"})
+    if byte_range:
+        start, end = byte_range
+        length: int | None = end - start + 1
+    else:
+        start, length = 0, size
+
+    response: HttpResponse | StreamingHttpResponse
+    if request.method == "HEAD":
+        # GET finds a missing object on open; HEAD never opens it.
+        if size is None and not default_storage.exists(key):
+            raise Http404()
+        response = HttpResponse(content_type=content_type)
+    else:
         try:
-            while True:
-                chunk = f.read(CHUNK_SIZE)
-                if not chunk:
-                    break
-                yield chunk
-        finally:
+            f = default_storage.open(key, mode="rb")
+        except Exception:
+            raise Http404()
+
+        def file_iterator():
             try:
-                f.close()
-            except Exception:
-                pass
+                if start:
+                    f.seek(start)
+                remaining = length
+                while remaining is None or remaining > 0:
+                    chunk = f.read(
+                        CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining)
+                    )
+                    if not chunk:
+                        break
+                    if remaining is not None:
+                        remaining -= len(chunk)
+                    yield chunk
+            finally:
+                try:
+                    f.close()
+                except Exception:
+                    pass
 
-    resp = StreamingHttpResponse(file_iterator(), content_type=content_type)
-    resp["Cache-Control"] = "private, max-age=300"
-    return resp
+        response = StreamingHttpResponse(file_iterator(), content_type=content_type)
+    if byte_range:
+        response.status_code = 206
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    if size is not None:
+        response["Content-Length"] = str(length)
+        response["Accept-Ranges"] = "bytes"
+    if etag is None:
+        response["Cache-Control"] = _cache_control(key)
+        return response
+    return _with_validators(response, key, etag, last_modified)
@@ -16,6 +16,7 @@ from django.db.models import Q
 from django.utils import timezone
 
 from core.tasks import send_email_task
+from core.utils.storage import enqueue_storage_deletions
 from organizations.export_archive import build_export_archive
 from organizations.models import ExportJob
 
@@ -306,14 +307,10 @@ def cleanup_expired_exports() -> int:
     )
     expired = 0
     for job in jobs.iterator():
-        if job.object_key:
-            try:
-                default_storage.delete(job.object_key)
-            except Exception:
-                logger.exception("exports:retention_delete_failed job=%s", job.pk)
-                continue
-        job.status = ExportJob.Status.EXPIRED
-        job.object_key = ""
-        job.save(update_fields=["status", "object_key"])
+        with transaction.atomic():
+            enqueue_storage_deletions([job.object_key])
+            job.status = ExportJob.Status.EXPIRED
+            job.object_key = ""
+            job.save(update_fields=["status", "object_key"])
         expired += 1
     return expired
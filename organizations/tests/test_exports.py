@@ -279,7 +279,9 @@ def test_export_list_does_not_generate_download_credentials(
 
 
 @pytest.mark.django_db
-def test_expired_export_cleanup_removes_object(settings, monkeypatch):
+def test_expired_export_cleanup_removes_object(
+    settings, monkeypatch, django_capture_on_commit_callbacks
+):
     org = create_test_group(name="Expired Export", slug="expired-export")
     job = ExportJob.objects.create(
         organization=org,
@@ -288,11 +290,10 @@ def test_expired_export_cleanup_removes_object(settings, monkeypatch):
         expires_at=timezone.now() - timedelta(minutes=1),
     )
     deleted = []
-    monkeypatch.setattr(
-        "organizations.export_tasks.default_storage.delete", deleted.append
-    )
+    monkeypatch.setattr("core.utils.storage.default_storage.delete", deleted.append)
 
-    assert cleanup_expired_exports() == 1
+    with django_capture_on_commit_callbacks(execute=True):
+        assert cleanup_expired_exports() == 1
     job.refresh_from_db()
     assert job.status == ExportJob.Status.EXPIRED
     assert job.object_key == ""
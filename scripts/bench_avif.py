@@ -0,0 +1,79 @@
+"""Benchmark: encode time vs. bytes of the WebP variants and their AVIF siblings.
+
+Pass image paths to measure a real corpus; without arguments a synthetic one
+(photographic gradients with noise and a flat screenshot-like image) is used.
+"""
+
+import sys
+import time
+from dataclasses import replace
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import django
+from django.conf import settings
+
+settings.configure()
+django.setup()
+
+from PIL import Image, ImageDraw, ImageOps
+
+from core.utils.image import AVIF_SIBLINGS, VARIANT_PROFILES, avif_supported
+
+SPEEDS = (6, 8, 10)
+
+
+def synthetic_corpus() -> dict[str, Image.Image]:
+    photo = Image.linear_gradient("L").resize((2400, 1600)).convert("RGB")
+    noise = Image.effect_noise((2400, 1600), 48).convert("RGB")
+    photo = Image.blend(photo, noise, 0.35)
+    screenshot = Image.new("RGB", (2400, 1600), (248, 248, 250))
+    draw = ImageDraw.Draw(screenshot)
+    for y in range(40, 1600, 60):
+        draw.rectangle((80, y, 80 + (y * 7) % 1800, y + 24), fill=(60, 64, 80))
+    return {"photo": photo, "screenshot": screenshot}
+
+
+def load_corpus(paths: list[str]) -> dict[str, Image.Image]:
+    corpus = {}
+    for path in paths:
+        with Image.open(path) as source:
+            corpus[Path(path).name] = ImageOps.exif_transpose(source).convert("RGB")
+    return corpus
+
+
+def measure(profile, image: Image.Image) -> tuple[float, int]:
+    started = time.perf_counter()
+    content = profile.render(image)
+    return time.perf_counter() - started, len(content)
+
+
+def main() -> None:
+    if not avif_supported():
+        sys.exit("This Pillow build has no AVIF encoder.")
+    corpus = load_corpus(sys.argv[1:]) if sys.argv[1:] else synthetic_corpus()
+    print(f"{'variant':<8} {'encoder':<10} {'ms':>8} {'bytes':>10} {'saved':>7}")
+    for name, sibling in AVIF_SIBLINGS.items():
+        webp_time = webp_bytes = 0.0
+        for image in corpus.values():
+            elapsed, size = measure(VARIANT_PROFILES[name], image)
+            webp_time += elapsed
+            webp_bytes += size
+        print(f"{name:<8} {'webp':<10} {webp_time * 1000:8.1f} {webp_bytes:10.0f}")
+        for speed in SPEEDS:
+            profile = replace(sibling, speed=speed)
+            avif_time = avif_bytes = 0.0
+            for image in corpus.values():
+                elapsed, size = measure(profile, image)
+                avif_time += elapsed
+                avif_bytes += size
+            saved = 1 - avif_bytes / webp_bytes
+            print(
+                f"{name:<8} {f'avif s={speed}':<10} {avif_time * 1000:8.1f}"
+                f" {avif_bytes:10.0f} {saved:7.1%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
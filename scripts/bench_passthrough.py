@@ -0,0 +1,74 @@
+"""Benchmark: normalizing uploads by re-encoding vs. metadata-stripping passthrough.
+
+Pass JPEG/WebP paths to measure a real corpus; without arguments a synthetic
+one (camera-sized JPEGs and a WebP, each carrying EXIF and an ICC profile) is
+used. Reports uploads per second and stored bytes for both paths.
+"""
+
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import django
+from django.conf import settings
+
+settings.configure()
+django.setup()
+
+from PIL import Image, ImageCms
+
+from core.utils.image import normalize_image_bytes
+
+ROUNDS = 5
+
+
+def synthetic_corpus() -> dict[str, bytes]:
+    photo = Image.linear_gradient("L").resize((4000, 3000)).convert("RGB")
+    noise = Image.effect_noise((4000, 3000), 48).convert("RGB")
+    photo = Image.blend(photo, noise, 0.35)
+    icc = ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB")).tobytes()
+    exif = Image.Exif()
+    exif[0x010F] = "Camera"
+    corpus = {}
+    for name, size, fmt in (
+        ("12mp.jpg", (4000, 3000), "JPEG"),
+        ("4mp.jpg", (2400, 1600), "JPEG"),
+        ("4mp.webp", (2400, 1600), "WEBP"),
+    ):
+        buffer = BytesIO()
+        photo.resize(size).save(
+            buffer, format=fmt, quality=85, exif=exif, icc_profile=icc
+        )
+        corpus[name] = buffer.getvalue()
+    return corpus
+
+
+def measure(corpus: dict[str, bytes], limit: int) -> tuple[float, int]:
+    settings.IMAGE_ORIGINAL_PASSTHROUGH_MAX_BYTES = limit
+    stored = 0
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        stored = sum(len(normalize_image_bytes(data)) for data in corpus.values())
+    elapsed = time.perf_counter() - started
+    return ROUNDS * len(corpus) / elapsed, stored
+
+
+def main() -> None:
+    corpus = (
+        {Path(path).name: Path(path).read_bytes() for path in sys.argv[1:]}
+        if sys.argv[1:]
+        else synthetic_corpus()
+    )
+    source = sum(len(data) for data in corpus.values())
+    print(f"{len(corpus)} files, {source} bytes")
+    print(f"{'path':<12} {'uploads/s':>10} {'stored bytes':>13}")
+    for label, limit in (("re-encode", 0), ("passthrough", 1 << 40)):
+        rate, stored = measure(corpus, limit)
+        print(f"{label:<12} {rate:10.2f} {stored:13d}")
+
+
+if __name__ == "__main__":
+    main()
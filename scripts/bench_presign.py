@@ -0,0 +1,63 @@
+"""Microbenchmark: per-URL cost of botocore vs. the in-process SigV4 presigner."""
+
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import boto3
+from botocore.config import Config
+
+from core.utils.sigv4 import presign_get_object_url
+
+ENDPOINT = "https://account.r2.cloudflarestorage.com"
+KEY = "private/images/42/3f1c9f7e-8d1e-4b7e-9a55-0c6f2f4c9d11_thumb.webp"
+ROUNDS = 2000
+
+
+def main() -> None:
+    client = boto3.client(
+        "s3",
+        endpoint_url=ENDPOINT,
+        aws_access_key_id="access",
+        aws_secret_access_key="secret",
+        region_name="auto",
+        config=Config(signature_version="s3v4"),
+    )
+
+    def botocore_presign():
+        client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": "media",
+                "Key": KEY,
+                "ResponseContentType": "image/webp",
+                "ResponseCacheControl": "private, max-age=900",
+            },
+            ExpiresIn=900,
+        )
+
+    def fast_presign():
+        presign_get_object_url(
+            endpoint_url=ENDPOINT,
+            bucket="media",
+            key=KEY,
+            access_key="access",
+            secret_key="secret",
+            region="auto",
+            expires_in=900,
+            params={
+                "response-content-type": "image/webp",
+                "response-cache-control": "private, max-age=900",
+            },
+        )
+
+    for name, func in (("botocore", botocore_presign), ("sigv4", fast_presign)):
+        func()
+        best = min(timeit.repeat(func, number=ROUNDS, repeat=5)) / ROUNDS
+        print(f"{name:>8}: {best * 1_000_000:8.1f} us/url")
+
+
+if __name__ == "__main__":
+    main()